@@ -0,0 +1,163 @@
+"""
+Interval-index blocking for candidate pair generation.
+
+Instead of cross-joining every MP against every UP in a (sex, state) block
+and throwing most rows away with the age and temporal masks, the UPs of a
+block are indexed once by age range and found date. Each MP then looks up
+only the UPs that pass both hard filters:
+
+1. Age ranges overlap (unknown ages on either side always pass)
+2. found_days >= last_seen_days - 7 (unknown dates always pass)
+
+Work and peak memory therefore grow with the number of surviving pairs,
+not with |MP| x |UP| per state.
+"""
+
+import numpy as np
+import pandas as pd
+
+TEMPORAL_TOLERANCE_DAYS = 7
+
+# Ordinal days fit comfortably below 2**21; unknown found dates are pushed
+# past every real date so they always satisfy the temporal filter.
+_UNKNOWN_DAY = 1 << 21
+_BUCKET_SHIFT = 22
+
+# Upper bounds on (MP x age bucket) lookup cells and on pairs per batch
+MAX_LOOKUP_CELLS = 2_000_000
+BATCH_PAIRS = 500_000
+
+
+def _as_float(values):
+    """Coerce a Series/array of possibly missing numbers to float64."""
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+
+
+class UPIntervalIndex:
+    """
+    Index over one block of UPs for age-overlap + temporal lookups.
+
+    UPs are grouped into buckets of identical (age_min, age_max) ranges and
+    sorted by found date inside each bucket. For a given MP the qualifying
+    buckets follow from one interval comparison per bucket, and within a
+    bucket the temporally valid UPs are a contiguous suffix found with
+    searchsorted.
+    """
+
+    def __init__(self, age_min, age_max, found_days):
+        age_min = _as_float(age_min)
+        age_max = _as_float(age_max)
+        found = _as_float(found_days)
+
+        unknown_age = np.isnan(age_min) | np.isnan(age_max)
+        lo = np.where(unknown_age, -np.inf, age_min)
+        hi = np.where(unknown_age, np.inf, age_max)
+
+        ranges, bucket = np.unique(np.column_stack([lo, hi]), axis=0, return_inverse=True)
+        bucket = bucket.reshape(-1).astype(np.int64)
+
+        days = np.where(np.isnan(found), _UNKNOWN_DAY, np.clip(found, 0, _UNKNOWN_DAY))
+        days = days.astype(np.int64)
+
+        order = np.lexsort((days, bucket))
+        self.order = order
+        self.keys = (bucket[order] << _BUCKET_SHIFT) + days[order]
+        self.bucket_lo = ranges[:, 0]
+        self.bucket_hi = ranges[:, 1]
+        self.bucket_end = np.searchsorted(bucket[order], np.arange(len(ranges)), side='right')
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def n_buckets(self):
+        return len(self.bucket_lo)
+
+    def _ranges(self, age_min, age_max, last_seen_days):
+        """Return (mp_pos, start, count) of the surviving UP runs for these MPs."""
+        unknown_age = np.isnan(age_min) | np.isnan(age_max)
+        mp_max = np.where(unknown_age, np.inf, age_max)
+        mp_min = np.where(unknown_age, -np.inf, age_min)
+
+        earliest = np.ceil(last_seen_days - TEMPORAL_TOLERANCE_DAYS)
+        earliest = np.where(np.isnan(earliest), 0, np.clip(earliest, 0, _UNKNOWN_DAY))
+        earliest = earliest.astype(np.int64)
+
+        overlap = (
+            (self.bucket_lo[None, :] <= mp_max[:, None]) &
+            (self.bucket_hi[None, :] >= mp_min[:, None])
+        )
+        mp_pos, bucket = np.nonzero(overlap)
+
+        start = np.searchsorted(self.keys, (bucket << _BUCKET_SHIFT) + earliest[mp_pos], side='left')
+        count = self.bucket_end[bucket] - start
+
+        keep = count > 0
+        return mp_pos[keep], start[keep], count[keep]
+
+    def _expand(self, mp_pos, start, count):
+        """Expand (mp, run) descriptors into sorted (mp_pos, up_pos) pairs."""
+        total = int(count.sum())
+        run_offset = np.repeat(np.cumsum(count) - count, count)
+        sorted_pos = np.repeat(start, count) + (np.arange(total) - run_offset)
+
+        mp_idx = np.repeat(mp_pos, count)
+        up_idx = self.order[sorted_pos]
+
+        # Same row order a cross join of the block would produce
+        order = np.lexsort((up_idx, mp_idx))
+        return mp_idx[order], up_idx[order]
+
+    def iter_candidates(self, age_min, age_max, last_seen_days, batch_pairs=BATCH_PAIRS):
+        """
+        Yield (mp_idx, up_idx) position arrays of pairs passing both filters.
+
+        Positions refer to the order of the MP arrays passed in and the UP
+        arrays the index was built from. Batches hold at most `batch_pairs`
+        pairs unless a single MP alone exceeds that.
+        """
+        age_min = _as_float(age_min)
+        age_max = _as_float(age_max)
+        last_seen = _as_float(last_seen_days)
+
+        if len(age_min) == 0 or len(self) == 0:
+            return
+
+        chunk = max(1, MAX_LOOKUP_CELLS // max(1, self.n_buckets))
+
+        for chunk_start in range(0, len(age_min), chunk):
+            chunk_end = min(chunk_start + chunk, len(age_min))
+            mp_pos, start, count = self._ranges(
+                age_min[chunk_start:chunk_end],
+                age_max[chunk_start:chunk_end],
+                last_seen[chunk_start:chunk_end],
+            )
+            if len(mp_pos) == 0:
+                continue
+            mp_pos = mp_pos + chunk_start
+
+            # Split on MP boundaries so each batch stays near batch_pairs
+            per_mp = np.bincount(mp_pos - chunk_start, weights=count, minlength=chunk_end - chunk_start)
+            batch_of_mp = (np.cumsum(per_mp) - per_mp) // batch_pairs
+            batch_of_run = batch_of_mp[mp_pos - chunk_start].astype(np.int64)
+            bounds = np.searchsorted(batch_of_run, np.unique(batch_of_run), side='left')
+            bounds = np.append(bounds, len(batch_of_run))
+
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                yield self._expand(mp_pos[lo:hi], start[lo:hi], count[lo:hi])
+
+
+def block_candidates(mp_block, up_block, batch_pairs=BATCH_PAIRS):
+    """
+    Yield (mp_idx, up_idx) positional pairs for one (sex, state) block.
+
+    Args:
+        mp_block: DataFrame with age_min, age_max, last_seen_days
+        up_block: DataFrame with age_min, age_max, found_days
+        batch_pairs: Approximate maximum number of pairs per batch
+    """
+    index = UPIntervalIndex(up_block['age_min'], up_block['age_max'], up_block['found_days'])
+    yield from index.iter_candidates(
+        mp_block['age_min'], mp_block['age_max'], mp_block['last_seen_days'],
+        batch_pairs=batch_pairs,
+    )
@@ -0,0 +1,132 @@
+"""
+Case snapshots and deltas for incremental candidate generation.
+
+Every v2 build stores a small snapshot next to the pair dataset with one
+row per case: the case number, NamUs 'date_modified' and a hash of the
+attributes pair generation reads. The next incremental build diffs the new
+masters against it:
+
+- added:    ids only in the new masters
+- removed:  ids only in the snapshot (includes newly excluded UPs)
+- modified: ids in both whose date_modified or matching attributes changed
+
+Only pairs touching these ids have to be regenerated.
+
+    out/candidate_pairs_snapshot/mp.parquet
+    out/candidate_pairs_snapshot/up.parquet
+    out/candidate_pairs_snapshot/meta.json
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+from pair_store import ID_PREFIXES, encode_case_ids
+
+SNAPSHOT_DIR = 'candidate_pairs_snapshot'
+
+# Bump when pair generation changes in a way that invalidates stored pairs
+SNAPSHOT_VERSION = 1
+
+# Attributes pair generation depends on, per side
+MATCH_COLUMNS = {
+    'mp': ['sex', 'race', 'age_min', 'age_max', 'last_seen_date', 'state', 'county', 'city'],
+    'up': ['sex', 'race', 'age_min', 'age_max', 'found_date', 'state', 'county', 'city'],
+}
+ID_COLUMNS = {'mp': 'mp_id', 'up': 'up_id'}
+
+
+def snapshot_path(out_dir):
+    return os.path.join(out_dir, SNAPSHOT_DIR)
+
+
+def file_digest(path):
+    """SHA-256 of a file, or None if it does not exist."""
+    if path is None or not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def case_fingerprints(df, side):
+    """
+    One row per case: int32 case number, date_modified and attribute hash.
+
+    Args:
+        df: MP or UP master DataFrame
+        side: 'mp' or 'up'
+    """
+    columns = MATCH_COLUMNS[side]
+    attributes = df[columns].astype(object).where(df[columns].notna(), None).astype(str)
+    date_modified = df['date_modified'] if 'date_modified' in df.columns else pd.Series('', index=df.index)
+    return pd.DataFrame({
+        'id': encode_case_ids(df['id'], ID_PREFIXES[ID_COLUMNS[side]]),
+        'date_modified': date_modified.fillna('').astype(str).to_numpy(),
+        'row_hash': pd.util.hash_pandas_object(attributes, index=False).to_numpy(),
+    })
+
+
+def write_snapshot(out_dir, mp, up, meta):
+    """Store case fingerprints of the masters a pair set was built from."""
+    path = snapshot_path(out_dir)
+    os.makedirs(path, exist_ok=True)
+    for side, df in (('mp', mp), ('up', up)):
+        case_fingerprints(df, side).to_parquet(os.path.join(path, f'{side}.parquet'), index=False)
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(dict(meta, version=SNAPSHOT_VERSION), f, indent=2)
+
+
+def invalidate_snapshot(out_dir):
+    """
+    Drop the snapshot before the pair set is patched, so an interrupted
+    update forces the next incremental run back to a full build.
+    """
+    meta_path = os.path.join(snapshot_path(out_dir), 'meta.json')
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+
+def load_snapshot(out_dir):
+    """
+    Load the last build's snapshot.
+
+    Returns:
+        (mp_fingerprints, up_fingerprints, meta), or None if there is no
+        usable snapshot
+    """
+    path = snapshot_path(out_dir)
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != SNAPSHOT_VERSION:
+        return None
+    return (pd.read_parquet(os.path.join(path, 'mp.parquet')),
+            pd.read_parquet(os.path.join(path, 'up.parquet')),
+            meta)
+
+
+def diff_cases(old, new):
+    """
+    Compare two case_fingerprints() frames.
+
+    Returns:
+        Dict of int32 case number arrays: added, removed, modified
+    """
+    merged = old.merge(new, on='id', how='outer', suffixes=('_old', '_new'), indicator=True)
+    both = merged['_merge'] == 'both'
+    changed = both & (
+        (merged['date_modified_old'] != merged['date_modified_new']) |
+        (merged['row_hash_old'] != merged['row_hash_new'])
+    )
+    return {
+        'added': merged.loc[merged['_merge'] == 'right_only', 'id'].to_numpy(dtype=np.int32),
+        'removed': merged.loc[merged['_merge'] == 'left_only', 'id'].to_numpy(dtype=np.int32),
+        'modified': merged.loc[changed, 'id'].to_numpy(dtype=np.int32),
+    }
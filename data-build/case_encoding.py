@@ -0,0 +1,157 @@
+"""
+Numeric encoding of MP/UP master data for pair generation.
+
+Pair generation only needs a handful of attributes per case. They are
+encoded once into flat NumPy arrays (ages, ordinal days, race bitmask and
+integer codes for sex/state/county/city) so blocks of pairs can be
+computed with integer comparisons and shared with worker processes
+without pickling DataFrames.
+
+Location codes preserve the string comparisons of the original pandas
+implementation:
+- state:  strip/upper equality, missing never matches
+- county/city: strip/upper equality, missing never matches and an empty
+  MP value never matches
+- county_node (optional): node of the case's county in a CountyGraph, -1
+  when unresolved
+
+build_dimension_tables() does the same for the attributes compared while
+scoring (sex, state, county, city, race): each value is normalized once per
+case into an integer code so pair rows only carry integers, and the value
+tables turn codes back into strings for human-facing output.
+"""
+
+import numpy as np
+import pandas as pd
+
+from race_encoding import build_race_bits, encode_races
+from state_normalizer import normalize_state
+
+SEX_CODES = {'M': 0, 'F': 1, 'Unknown': 2}
+
+# Dimension codes shared by every dimension table
+MISSING_CODE = -1   # NaN / non-string value, never equal to anything
+EMPTY_CODE = 0      # '' after normalization
+
+
+def _normalized(values):
+    """strip().upper() the way pandas .str does (non-strings become NaN)."""
+    values = pd.Series(values)
+    if values.dtype != object:
+        values = values.astype(object)
+    return values.str.strip().str.upper()
+
+
+def _shared_codes(mp_values, up_values):
+    """Factorize two Series over a shared vocabulary (missing -> -1)."""
+    codes, uniques = pd.factorize(pd.concat([mp_values, up_values], ignore_index=True))
+    codes = codes.astype(np.int32)
+    return codes[:len(mp_values)], codes[len(mp_values):], uniques
+
+
+def _location_codes(mp_col, up_col):
+    """County/city codes; an empty MP value is treated like a missing one."""
+    mp_codes, up_codes, _ = _shared_codes(_normalized(mp_col), _normalized(up_col))
+    mp_codes = np.where(pd.Series(mp_col).eq('').to_numpy(), -1, mp_codes).astype(np.int32)
+    return mp_codes, up_codes
+
+
+def encode_cases(mp, up, mp_days_col='last_seen_days', up_days_col='found_days', race_bits=None,
+                 county_graph=None):
+    """
+    Encode MP and UP frames into dicts of equally long NumPy arrays.
+
+    Args:
+        mp: MP DataFrame with age_min, age_max, sex, race, state, county,
+            city and the ordinal day column
+        up: UP DataFrame with the same fields
+        mp_days_col / up_days_col: Ordinal day columns
+        race_bits: Optional race category bits (built from both sides if omitted)
+        county_graph: Optional county_graph.CountyGraph; adds 'county_node'
+
+    Returns:
+        (mp_arrays, up_arrays, state_codes) where state_codes maps each
+        normalized 2-letter state to its code in the 'state_norm' array
+    """
+    if race_bits is None:
+        race_bits = build_race_bits(mp['race'], up['race'])
+
+    mp_arrays = {
+        'age_min': pd.to_numeric(mp['age_min'], errors='coerce').to_numpy(dtype=float),
+        'age_max': pd.to_numeric(mp['age_max'], errors='coerce').to_numpy(dtype=float),
+        'days': pd.to_numeric(mp[mp_days_col], errors='coerce').to_numpy(dtype=float),
+        'race_mask': encode_races(mp['race'], race_bits),
+        'sex': mp['sex'].map(SEX_CODES).fillna(-1).to_numpy(dtype=np.int8),
+    }
+    up_arrays = {
+        'age_min': pd.to_numeric(up['age_min'], errors='coerce').to_numpy(dtype=float),
+        'age_max': pd.to_numeric(up['age_max'], errors='coerce').to_numpy(dtype=float),
+        'days': pd.to_numeric(up[up_days_col], errors='coerce').to_numpy(dtype=float),
+        'race_mask': encode_races(up['race'], race_bits),
+        'sex': up['sex'].map(SEX_CODES).fillna(-1).to_numpy(dtype=np.int8),
+    }
+
+    # Grouping key (normalize_state) and the raw-state equality used for same_state
+    mp_state_norm = mp['state'].apply(normalize_state)
+    up_state_norm = up['state'].apply(normalize_state)
+    mp_arrays['state_norm'], up_arrays['state_norm'], states = _shared_codes(mp_state_norm, up_state_norm)
+    mp_arrays['state'], up_arrays['state'], _ = _shared_codes(_normalized(mp['state']), _normalized(up['state']))
+
+    for col in ('county', 'city'):
+        mp_arrays[col], up_arrays[col] = _location_codes(mp[col], up[col])
+
+    if county_graph is not None:
+        mp_arrays['county_node'] = county_graph.node_codes(mp['state'], mp['county'])
+        up_arrays['county_node'] = county_graph.node_codes(up['state'], up['county'])
+
+    state_codes = {state: code for code, state in enumerate(states)}
+
+    return mp_arrays, up_arrays, state_codes
+
+
+def _dimension_codes(values, dtype=np.int32):
+    """Factorize normalized values with '' fixed at EMPTY_CODE and missing at MISSING_CODE."""
+    codes, uniques = pd.factorize(pd.concat([pd.Series(['']), values], ignore_index=True))
+    return codes[1:].astype(dtype), pd.Index(uniques, dtype=object)
+
+
+def build_dimension_tables(mp, up):
+    """
+    Integer-code the categorical attributes compared when scoring pairs.
+
+    Values are strip()/upper() normalized (sex is kept as-is) over a
+    vocabulary shared by MPs and UPs, so equal codes mean equal strings.
+    County codes are int16 and only unique within a state: compare them
+    together with the state code.
+
+    Args:
+        mp / up: Case DataFrames with sex, state, county, city and race
+
+    Returns:
+        (mp_codes, up_codes, tables) where the code dicts hold one array per
+        dimension aligned with the frame rows, and tables maps each dimension
+        to the Index of values by code (county: {state code: Index})
+    """
+    n_mp = len(mp)
+    both = pd.concat([mp[['sex', 'state', 'county', 'city', 'race']],
+                      up[['sex', 'state', 'county', 'city', 'race']]], ignore_index=True)
+
+    codes, tables = {}, {}
+    codes['sex'], tables['sex'] = _dimension_codes(both['sex'].astype(object), np.int8)
+    for col in ('state', 'city', 'race'):
+        codes[col], tables[col] = _dimension_codes(_normalized(both[col]))
+
+    county = _normalized(both['county'])
+    codes['county'] = np.full(len(both), MISSING_CODE, dtype=np.int16)
+    tables['county'] = {}
+    for state_code, rows in pd.Series(np.arange(len(both))).groupby(codes['state']).groups.items():
+        rows = rows.to_numpy()
+        county_codes, values = _dimension_codes(county.iloc[rows].reset_index(drop=True))
+        if len(values) > np.iinfo(np.int16).max:
+            raise ValueError(f"Too many counties in state {tables['state'][state_code]!r} for int16 codes")
+        codes['county'][rows] = county_codes
+        tables['county'][state_code] = values
+
+    mp_codes = {col: values[:n_mp] for col, values in codes.items()}
+    up_codes = {col: values[n_mp:] for col, values in codes.items()}
+    return mp_codes, up_codes, tables
@@ -0,0 +1,170 @@
+"""
+Keyed case lookup shared by the review tools.
+
+CaseStore indexes the MP and UP masters by NamUs id once and answers
+details('MP153255') with a hash lookup plus a read of the needed column
+arrays, instead of scanning a whole DataFrame per case. Records are
+memoized, and prefetch() fills the cache for upcoming cases on a
+background thread so an interactive loop does not wait on lookups:
+
+    store = CaseStore.load()
+    store.prefetch(['MP1', 'UP2', ...])   # returns immediately
+    info = store.details('MP1')
+
+case_url() builds the NamUs page URL used by review_matches.py and the
+open_*_matches.py helpers.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, 'data', 'clean')
+
+CASE_URLS = {
+    'MP': 'https://www.namus.gov/MissingPersons/Case#/{number}',
+    'UP': 'https://www.namus.gov/UnidentifiedPersons/Case#/{number}/details?nav',
+}
+
+# Master columns read for display, with the value used when a column is absent
+DETAIL_COLUMNS = {
+    'MP': {'first_name': '', 'last_name': '', 'sex': 'Unknown', 'race': 'Unknown', 'age_min': '?',
+           'age_max': '?', 'last_seen_date': 'Unknown', 'city': '', 'county': '', 'state': ''},
+    'UP': {'mec_case': '', 'sex': 'Unknown', 'race': 'Unknown', 'age_min': '?', 'age_max': '?',
+           'found_date': 'Unknown', 'city': '', 'county': '', 'state': ''},
+}
+
+
+def case_url(case_id):
+    """NamUs page of an 'MP...'/'UP...' case."""
+    return CASE_URLS[case_id[:2]].format(number=case_id[2:])
+
+
+class CaseStore:
+    """
+    MP and UP case details keyed by NamUs id.
+
+    Args:
+        mp_df: MP master DataFrame
+        up_df: UP master DataFrame
+    """
+
+    def __init__(self, mp_df, up_df):
+        self._sides = {}
+        for prefix, df in (('MP', mp_df), ('UP', up_df)):
+            df = df.drop_duplicates('id', keep='first')  # the first row wins, as with a filtered frame
+            self._sides[prefix] = (
+                pd.Index(df['id']),
+                {col: (df[col].to_numpy() if col in df.columns else None) for col in DETAIL_COLUMNS[prefix]},
+            )
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR):
+        """Build a store from MP_master.csv and UP_master.csv."""
+        return cls(pd.read_csv(os.path.join(data_dir, 'MP_master.csv')),
+                   pd.read_csv(os.path.join(data_dir, 'UP_master.csv')))
+
+    def __contains__(self, case_id):
+        side = self._sides.get(str(case_id)[:2])
+        return side is not None and case_id in side[0]
+
+    def _record(self, case_id):
+        """Build the display record of one case (None if unknown)."""
+        prefix = case_id[:2]
+        if prefix not in self._sides or case_id not in self._sides[prefix][0]:
+            return None
+        ids, columns = self._sides[prefix]
+        position = ids.get_loc(case_id)
+
+        def value(col):
+            array = columns[col]
+            return DETAIL_COLUMNS[prefix][col] if array is None else array[position]
+
+        record = {'type': prefix, 'id': case_id}
+        if prefix == 'MP':
+            record['name'] = f"{value('first_name')} {value('last_name')}".strip()
+        else:
+            record['mec'] = value('mec_case')
+        record.update({
+            'sex': value('sex'),
+            'race': value('race'),
+            'age': f"{value('age_min')}-{value('age_max')}",
+            'date': value('last_seen_date' if prefix == 'MP' else 'found_date'),
+            'city': value('city'),
+            'county': value('county'),
+            'state': value('state'),
+        })
+        return record
+
+    def details(self, case_id):
+        """
+        Display record of a case.
+
+        Returns:
+            Dict with type, id, name (MP) or mec (UP), sex, race, age, date,
+            city, county and state; None if the id is not in the masters
+        """
+        if case_id in self._cache:
+            return self._cache[case_id]
+        record = self._record(case_id)
+        with self._lock:
+            self._cache[case_id] = record
+        return record
+
+    def prefetch(self, case_ids):
+        """Load details of case_ids on a background thread (returns immediately)."""
+        pending = [case_id for case_id in case_ids if case_id not in self._cache]
+        if not pending:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='case-prefetch')
+        return self._executor.submit(lambda: [self.details(case_id) for case_id in pending])
+
+    def close(self):
+        """Stop the prefetch thread."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def main():
+    """Compare lookups against filtering the master frames per case."""
+    import time
+    import numpy as np
+
+    mp = pd.read_csv(os.path.join(DATA_DIR, 'MP_master.csv'))
+    up = pd.read_csv(os.path.join(DATA_DIR, 'UP_master.csv'))
+    rng = np.random.default_rng(0)
+    ids = list(rng.choice(mp['id'], 200)) + list(rng.choice(up['id'], 200))
+
+    start = time.perf_counter()
+    store = CaseStore(mp, up)
+    print(f"Index {len(mp):,} MPs and {len(up):,} UPs: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    scanned = [(mp if case_id.startswith('MP') else up).query('id == @case_id').iloc[0] for case_id in ids]
+    per_scan = (time.perf_counter() - start) / len(ids)
+    start = time.perf_counter()
+    records = [store.details(case_id) for case_id in ids]
+    per_lookup = (time.perf_counter() - start) / len(ids)
+    print(f"Per case: {per_scan * 1000:.2f} ms scanning vs {per_lookup * 1e6:.0f} µs indexed")
+
+    for row, record in zip(scanned, records):
+        for col in ('sex', 'race', 'city', 'county', 'state'):
+            assert record[col] == row[col] or (pd.isna(record[col]) and pd.isna(row[col]))
+    assert store.details('MP0') is None
+
+    store = CaseStore(mp, up)
+    store.prefetch(ids).result()
+    assert all(case_id in store._cache for case_id in ids)
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
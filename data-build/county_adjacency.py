@@ -1,16 +1,53 @@
+#!/usr/bin/env python3
 """
 County adjacency scoring.
 People often cross county lines, so adjacent counties should score higher than distant counties.
 
-Since we don't have a complete adjacency database, we use heuristics:
+add_adjacency_to_pairs() scores a pair frame with the county graph
+(county_graph.py, built from the bundled Census-style edge list), so
+adjacency is exact:
 1. Same county = 1.0
-2. Adjacent county (estimated) = 0.6
+2. Adjacent county = 0.6 (bordering in the graph)
 3. Same state = 0.3
+
+Counties the graph cannot resolve fall back to the name heuristic, which
+scores estimated adjacency as 0.6 * confidence. The per-pair
+calculate_geographic_score_with_adjacency() (scoring.py) and
+CountyAdjacency.geo_scores() without a graph use only the heuristic.
+
+The heuristic only depends on the two county names, so it is evaluated once
+per state for every county pair (CountyAdjacency) and cached on disk keyed by
+the set of county names. Pair scoring is then an integer-coded table lookup.
+
+Run directly to check the vectorized scores against the per-pair function:
+
+    python3 data-build/county_adjacency.py
 """
 
+import os
+import hashlib
+import numpy as np
 import pandas as pd
 from difflib import SequenceMatcher
 
+from county_graph import DISTANCE_UNKNOWN, default_graph
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get('COUNTY_ADJACENCY_CACHE', os.path.join(ROOT, 'out', 'cache', 'county_adjacency'))
+
+# Bump when the adjacency heuristic changes to invalidate cached tables
+ADJACENCY_CACHE_VERSION = 1
+
+GEO_REASONS = [
+    "Different states",
+    "Same city and county",
+    "Same county",
+    "Adjacent counties (confidence: 0.5)",
+    "Adjacent counties (confidence: 0.8)",
+    "Same state, different counties",
+    "Adjacent counties (confidence: 1.0)",
+]
+
 
 def normalize_county(county_str):
     """Normalize county name for comparison."""
@@ -96,10 +133,192 @@ def calculate_geographic_score_with_adjacency(mp_state, mp_county, mp_city, up_s
     return 0.3, "Same state, different counties"
 
 
+def normalize_place(value):
+    """State/city normalization used by calculate_geographic_score_with_adjacency."""
+    return str(value).strip().upper()
+
+
+def _normalized_codes(values, normalize):
+    """
+    Apply a scalar normalizer once per distinct value.
+
+    Returns:
+        (codes, labels) where labels[codes] is the normalized column
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    labels = np.array([normalize(v) for v in uniques], dtype=object)
+    return codes, labels
+
+
+def _normalized(values, normalize):
+    codes, labels = _normalized_codes(values, normalize)
+    return labels[codes]
+
+
+def _table_key(counties):
+    digest = hashlib.sha1("\n".join(counties).encode('utf-8')).hexdigest()[:16]
+    return f"v{ADJACENCY_CACHE_VERSION}_{digest}"
+
+
+def build_state_adjacency(state, counties, cache_dir=CACHE_DIR):
+    """
+    Adjacency confidence for every ordered pair of counties in one state.
+
+    Args:
+        state: Normalized state
+        counties: Normalized county names (non-empty)
+        cache_dir: Directory for cached tables (None disables caching)
+
+    Returns:
+        (counties, confidence) with counties sorted and
+        confidence[i, j] = are_counties_adjacent_heuristic(counties[i], counties[j])
+    """
+    counties = sorted(set(counties))
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"{state}_{_table_key(counties)}.npz")
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                if list(cached['counties']) == counties:
+                    return counties, cached['confidence']
+
+    n = len(counties)
+    confidence = np.zeros((n, n))
+    for i, county1 in enumerate(counties):
+        for j, county2 in enumerate(counties):
+            confidence[i, j] = are_counties_adjacent_heuristic(county1, county2, state, state)[1]
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(cache_path, counties=np.array(counties, dtype=str), confidence=confidence)
+
+    return counties, confidence
+
+
+class CountyAdjacency:
+    """
+    Per-state county adjacency tables with integer-coded lookups.
+
+    All county pair confidences of all states live in one flat array; a
+    (state, county_a, county_b) lookup is offset[state] + a * n_state + b.
+    """
+
+    def __init__(self, state_counties, cache_dir=CACHE_DIR):
+        """
+        Args:
+            state_counties: Dict of normalized state -> normalized county names
+            cache_dir: Directory for cached tables (None disables caching)
+        """
+        self.codes = {}      # (state, county) -> local county code
+        self.offsets = {}    # state -> offset into confidence
+        self.sizes = {}      # state -> number of counties
+        blocks = []
+        offset = 0
+
+        for state in sorted(state_counties):
+            names = [c for c in state_counties[state] if c != ""]
+            if state == "" or not names:
+                continue
+            counties, confidence = build_state_adjacency(state, names, cache_dir)
+            for code, county in enumerate(counties):
+                self.codes[(state, county)] = code
+            self.offsets[state] = offset
+            self.sizes[state] = len(counties)
+            blocks.append(confidence.ravel())
+            offset += confidence.size
+
+        self.confidence = np.concatenate(blocks) if blocks else np.zeros(0)
+
+    @classmethod
+    def from_cases(cls, *frames, cache_dir=CACHE_DIR):
+        """Build tables covering every (state, county) in the given case frames."""
+        states = np.concatenate([_normalized(f['state'], normalize_place) for f in frames])
+        counties = np.concatenate([_normalized(f['county'], normalize_county) for f in frames])
+        locations = pd.DataFrame({'state': states, 'county': counties}).drop_duplicates()
+        state_counties = locations.groupby('state')['county'].apply(list).to_dict()
+        return cls(state_counties, cache_dir=cache_dir)
+
+    def lookup(self, state, county_a, county_b):
+        """
+        Vectorized adjacency confidence for normalized (state, county, county) arrays.
+
+        Unknown states/counties and empty names give 0.0.
+        """
+        state = np.asarray(state, dtype=object)
+        if len(state) == 0:
+            return np.zeros(0)
+        frame = pd.DataFrame({'state': state, 'a': np.asarray(county_a, dtype=object),
+                              'b': np.asarray(county_b, dtype=object)})
+        combo_codes, combos = pd.factorize(pd.MultiIndex.from_frame(frame))
+
+        # Resolve each distinct combination to a flat table index once
+        flat = np.full(len(combos) + 1, -1, dtype=np.int64)
+        for i, (st, a, b) in enumerate(combos):
+            code_a = self.codes.get((st, a))
+            code_b = self.codes.get((st, b))
+            if code_a is not None and code_b is not None:
+                flat[i] = self.offsets[st] + code_a * self.sizes[st] + code_b
+
+        index = flat[combo_codes]
+        table = np.append(self.confidence, 0.0)  # index -1 -> not adjacent
+        return table[index]
+
+    def geo_scores(self, mp_state, mp_county, mp_city, up_state, up_county, up_city, graph=None):
+        """
+        Vectorized calculate_geographic_score_with_adjacency().
+
+        With a county_graph.CountyGraph, counties it resolves are adjacent
+        exactly when they border (confidence 1.0); the heuristic table is
+        only used for the rest.
+
+        Returns:
+            (score, reason) where score is a float array and reason a
+            Categorical over GEO_REASONS
+        """
+        mp_s = _normalized(mp_state, normalize_place)
+        up_s = _normalized(up_state, normalize_place)
+        mp_co = _normalized(mp_county, normalize_county)
+        up_co = _normalized(up_county, normalize_county)
+        mp_ci = _normalized(mp_city, normalize_place)
+        up_ci = _normalized(up_city, normalize_place)
+
+        diff_state = (mp_s != up_s) | (mp_s == "")
+        same_county = (mp_co == up_co) & (mp_co != "")
+        same_city = same_county & (mp_ci == up_ci) & (mp_ci != "")
+
+        # Only pairs that reach the adjacency check need a table lookup
+        confidence = np.zeros(len(mp_s))
+        check = ~diff_state & ~same_county
+        if graph is not None:
+            hops = graph.county_distance(np.asarray(mp_state, dtype=object)[check],
+                                         np.asarray(mp_county, dtype=object)[check],
+                                         np.asarray(up_state, dtype=object)[check],
+                                         np.asarray(up_county, dtype=object)[check])
+            resolved = hops != DISTANCE_UNKNOWN
+            confidence[np.flatnonzero(check)[resolved]] = np.where(hops[resolved] == 1, 1.0, 0.0)
+            check[np.flatnonzero(check)[resolved]] = False
+        confidence[check] = self.lookup(mp_s[check], mp_co[check], up_co[check])
+
+        conditions = [
+            diff_state,
+            same_city,
+            same_county,
+            confidence == 0.5,
+            confidence == 0.8,
+            confidence == 1.0,
+        ]
+        score = np.select(conditions, [0.0, 1.0, 0.85, 0.6 * 0.5, 0.6 * 0.8, 0.6], default=0.3)
+        reason = np.select(conditions, [0, 1, 2, 3, 4, 6], default=5)
+        return score, pd.Categorical.from_codes(reason, categories=GEO_REASONS)
+
+
 def add_adjacency_to_pairs(pairs_df, mp_df, up_df):
     """
     Add county adjacency information to candidate pairs.
 
+    Counties the bundled county graph (default_graph()) resolves are
+    adjacent when they border; the rest use the name heuristic.
+
     Args:
         pairs_df: DataFrame with mp_id, up_id
         mp_df: Missing persons DataFrame
@@ -110,34 +329,25 @@ def add_adjacency_to_pairs(pairs_df, mp_df, up_df):
     """
     print("Calculating geographic scores with county adjacency...")
 
-    # Create lookup dicts for faster access
-    mp_geo = mp_df.set_index('id')[['state', 'county', 'city']].to_dict('index')
-    up_geo = up_df.set_index('id')[['state', 'county', 'city']].to_dict('index')
-
-    geo_scores = []
-    geo_reasons = []
+    geo_cols = ['state', 'county', 'city']
+    mp_geo = mp_df.set_index('id')[geo_cols]
+    up_geo = up_df.set_index('id')[geo_cols]
 
-    for _, row in pairs_df.iterrows():
-        mp_id = row['mp_id']
-        up_id = row['up_id']
-
-        mp_data = mp_geo.get(mp_id, {})
-        up_data = up_geo.get(up_id, {})
-
-        score, reason = calculate_geographic_score_with_adjacency(
-            mp_data.get('state', ''),
-            mp_data.get('county', ''),
-            mp_data.get('city', ''),
-            up_data.get('state', ''),
-            up_data.get('county', ''),
-            up_data.get('city', '')
-        )
+    # Unknown ids score like empty locations
+    mp_data = mp_geo.reindex(pairs_df['mp_id']).astype(object)
+    up_data = up_geo.reindex(pairs_df['up_id']).astype(object)
+    mp_data[~pairs_df['mp_id'].isin(mp_geo.index).to_numpy()] = ''
+    up_data[~pairs_df['up_id'].isin(up_geo.index).to_numpy()] = ''
 
-        geo_scores.append(score)
-        geo_reasons.append(reason)
+    adjacency = CountyAdjacency.from_cases(mp_df, up_df)
+    geo_scores, geo_reasons = adjacency.geo_scores(
+        mp_data['state'], mp_data['county'], mp_data['city'],
+        up_data['state'], up_data['county'], up_data['city'],
+        graph=default_graph()
+    )
 
     pairs_df['geo_score'] = geo_scores
-    pairs_df['geo_reason'] = geo_reasons
+    pairs_df['geo_reason'] = np.asarray(geo_reasons)
 
     # Stats
     print(f"  Same county: {len(pairs_df[pairs_df['geo_score'] >= 0.85]):,}")
@@ -145,3 +355,63 @@ def add_adjacency_to_pairs(pairs_df, mp_df, up_df):
     print(f"  Same state only: {len(pairs_df[pairs_df['geo_score'] < 0.5]):,}")
 
     return pairs_df
+
+
+def main():
+    """Check vectorized geo scores against the per-pair function on the master files."""
+    import time
+
+    data_dir = os.path.join(ROOT, 'data', 'clean')
+    mp = pd.read_csv(os.path.join(data_dir, 'MP_master.csv'))
+    up = pd.read_csv(os.path.join(data_dir, 'UP_master.csv'))
+
+    start = time.perf_counter()
+    adjacency = CountyAdjacency.from_cases(mp, up)
+    print(f"Adjacency tables: {len(adjacency.sizes)} states, {adjacency.confidence.size:,} county pairs "
+          f"({time.perf_counter() - start:.2f}s, cache: {CACHE_DIR})")
+
+    # Every same-state (MP location, UP location) combination plus a cross-state sample
+    mp_loc = mp[['state', 'county', 'city']].drop_duplicates()
+    up_loc = up[['state', 'county', 'city']].drop_duplicates()
+    combos = mp_loc.merge(up_loc, on='state', suffixes=('_mp', '_up'))
+    combos['state_up'] = combos['state']
+    combos = combos.rename(columns={'state': 'state_mp'})
+    cross = mp_loc.sample(200, random_state=0).merge(up_loc.sample(200, random_state=0), how='cross',
+                                                     suffixes=('_mp', '_up'))
+    combos = pd.concat([combos, cross], ignore_index=True)
+
+    start = time.perf_counter()
+    expected = [calculate_geographic_score_with_adjacency(*row) for row in combos[[
+        'state_mp', 'county_mp', 'city_mp', 'state_up', 'county_up', 'city_up']].itertuples(index=False)]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    score, reason = adjacency.geo_scores(
+        combos['state_mp'], combos['county_mp'], combos['city_mp'],
+        combos['state_up'], combos['county_up'], combos['city_up']
+    )
+    vec_time = time.perf_counter() - start
+
+    same = (np.array_equal(score, np.array([e[0] for e in expected])) and
+            list(reason) == [e[1] for e in expected])
+    print(f"Checked {len(combos):,} location combinations: per-pair {loop_time:.2f}s, "
+          f"vectorized {vec_time:.2f}s")
+    if not same:
+        print("FAILED: vectorized geo scores disagree with calculate_geographic_score_with_adjacency()")
+        raise SystemExit(1)
+    print("✓ Vectorized geo scores match the per-pair function")
+
+    graph = default_graph()
+    if graph is not None:
+        _, graph_reason = adjacency.geo_scores(
+            combos['state_mp'], combos['county_mp'], combos['city_mp'],
+            combos['state_up'], combos['county_up'], combos['city_up'], graph=graph
+        )
+        changed = pd.crosstab(pd.Series(np.asarray(reason), name='heuristic'),
+                              pd.Series(np.asarray(graph_reason), name='county graph'))
+        print("\nGeo reasons, heuristic vs county graph:")
+        print(changed.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+County adjacency graph from a Census-style edge list.
+
+The edge list (data/county_adjacency.txt) has one row per pair of bordering
+counties, identified by 5-digit FIPS codes:
+
+    County Name|County GEOID|Neighbor Name|Neighbor GEOID
+    Autauga County, AL|01001|Chilton County, AL|01021
+
+The official Census county adjacency file can be dropped in as-is: both the
+pipe-delimited format and the older tab-delimited format (county columns
+only filled on the first row of each group) are read.
+
+Counties become nodes of a compact CSR graph. Hop distances up to MAX_HOPS
+are precomputed with a bounded BFS from every county, so
+county_distance(state, county_a, state_b, county_b) is a vectorized lookup
+that also works across state lines.
+
+Run directly for graph statistics and NamUs county name coverage:
+
+    python3 data-build/county_graph.py
+"""
+
+import os
+import unicodedata
+import numpy as np
+import pandas as pd
+
+from state_normalizer import normalize_state
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EDGE_LIST_PATH = os.environ.get('COUNTY_ADJACENCY_PATH', os.path.join(ROOT, 'data', 'county_adjacency.txt'))
+
+MAX_HOPS = 3
+
+# county_distance() results besides 0..max_hops
+DISTANCE_UNKNOWN = -1   # county not found in the graph
+DISTANCE_FAR = 127      # further apart than max_hops
+
+# County-equivalent designators, longest first
+COUNTY_SUFFIXES = (
+    ' CITY AND BOROUGH', ' CENSUS AREA', ' MUNICIPALITY', ' MUNICIPIO',
+    ' COUNTY', ' PARISH', ' BOROUGH', ' CITY',
+)
+
+# Counties renamed or split after the edge list vintage -> (state, county_key) in the graph
+COUNTY_ALIASES = {
+    ('AK', 'KUSILVAK'): 'WADE HAMPTON',
+    ('AK', 'PRINCE OF WALES-OUTER KETCHIKAN'): 'PRINCE OF WALES-HYDER',
+    ('AK', 'WRANGELL PETERSBURG'): 'WRANGELL',
+    ('AK', 'WRANGELL-PETERSBURG'): 'WRANGELL',
+    ('AK', 'SKAGWAY YAKUTAT ANGOON'): 'SKAGWAY',
+    ('AK', 'SKAGWAY-HOONAH-ANGOON'): 'SKAGWAY',
+    ('SD', 'OGLALA LAKOTA'): 'SHANNON',
+}
+
+
+def county_key(name, strip_suffix=True):
+    """
+    Normalize a county name for matching NamUs values to graph nodes.
+
+    'St. Louis County' / 'Saint Louis' -> 'ST LOUIS', 'Valdez–Cordova' ->
+    'VALDEZ-CORDOVA', 'Doña Ana' -> 'DONA ANA'. Missing or empty names give ''.
+    """
+    if pd.isna(name) or str(name).strip() == "":
+        return ""
+    s = str(name).replace('–', '-').replace('—', '-')
+    s = unicodedata.normalize('NFKD', s).encode('ascii', 'ignore').decode('ascii')
+    s = s.upper().replace('.', '').replace("'", '')
+    s = ' '.join(s.replace('-', ' - ').split()).replace(' - ', '-')
+    if strip_suffix:
+        for suffix in COUNTY_SUFFIXES:
+            if s.endswith(suffix) and len(s) > len(suffix):
+                s = s[:-len(suffix)]
+                break
+    if s.startswith('SAINT '):
+        s = 'ST ' + s[len('SAINT '):]
+    return s.strip()
+
+
+def load_county_edges(path=EDGE_LIST_PATH):
+    """
+    Read a Census-style county adjacency edge list.
+
+    Returns:
+        DataFrame with county_name, county_geoid, neighbor_name, neighbor_geoid
+    """
+    with open(path, encoding='utf-8', errors='replace') as f:
+        first_line = f.readline()
+    sep = '|' if '|' in first_line else '\t'
+
+    edges = pd.read_csv(path, sep=sep, header=None, dtype=str, usecols=range(4),
+                        names=['county_name', 'county_geoid', 'neighbor_name', 'neighbor_geoid'],
+                        encoding='utf-8', encoding_errors='replace', keep_default_na=False)
+
+    # Drop a header row and forward-fill the grouped (tab-delimited) layout
+    edges = edges[edges['county_geoid'].str.strip().str.isdigit() | (edges['county_geoid'].str.strip() == '')]
+    edges = edges.apply(lambda col: col.str.strip().str.strip('"'))
+    edges[['county_name', 'county_geoid']] = edges[['county_name', 'county_geoid']].replace('', np.nan).ffill()
+    edges = edges.dropna()
+    return edges[edges['neighbor_geoid'].str.isdigit()].reset_index(drop=True)
+
+
+class CountyGraph:
+    """
+    Undirected county adjacency graph in CSR form with bounded hop distances.
+
+    Attributes:
+        geoids / names / states: Per-node FIPS code, Census name, state code
+        indptr / indices: CSR adjacency (neighbors of node i are
+            indices[indptr[i]:indptr[i + 1]])
+        pair_keys / pair_hops: Sorted a * n + b keys of every node pair
+            within max_hops (a != b) and their hop distance
+    """
+
+    def __init__(self, edges, max_hops=MAX_HOPS):
+        names = pd.concat([edges['county_name'], edges['neighbor_name']], ignore_index=True)
+        geoids = pd.concat([edges['county_geoid'], edges['neighbor_geoid']], ignore_index=True)
+        nodes = pd.DataFrame({'geoid': geoids.str.zfill(5), 'name': names})
+        nodes = nodes.drop_duplicates('geoid').sort_values('geoid').reset_index(drop=True)
+
+        self.geoids = nodes['geoid'].to_numpy()
+        self.names = nodes['name'].to_numpy()
+        self.states = np.array([normalize_state(n.rsplit(',', 1)[-1]) if ',' in n else ''
+                                for n in self.names], dtype=object)
+        self.max_hops = max_hops
+
+        node_of = pd.Series(np.arange(len(nodes)), index=self.geoids)
+        src = node_of[edges['county_geoid'].str.zfill(5)].to_numpy()
+        dst = node_of[edges['neighbor_geoid'].str.zfill(5)].to_numpy()
+
+        # Symmetrize, drop self loops and duplicates
+        src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+        keep = src != dst
+        pairs = np.unique(src[keep] * len(nodes) + dst[keep])
+        src, dst = pairs // len(nodes), pairs % len(nodes)
+
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=len(nodes)))]).astype(np.int64)
+        self.indices = dst.astype(np.int32)
+
+        self._build_name_index()
+        self.pair_keys, self.pair_hops = self._bounded_bfs(max_hops)
+
+    @classmethod
+    def from_edge_list(cls, path=EDGE_LIST_PATH, max_hops=MAX_HOPS):
+        return cls(load_county_edges(path), max_hops=max_hops)
+
+    def __len__(self):
+        return len(self.geoids)
+
+    @property
+    def n_edges(self):
+        return len(self.indices) // 2
+
+    def neighbors(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def _build_name_index(self):
+        """(state, county_key) -> node; a county wins over a same-named independent city."""
+        self.node_index = {}
+        is_city = np.array([n.split(',')[0].endswith(' city') for n in self.names])
+        for node in np.argsort(~is_city, kind='stable'):  # cities first, counties overwrite
+            key = county_key(self.names[node].rsplit(',', 1)[0])
+            self.node_index[(self.states[node], key)] = node
+            if is_city[node]:
+                self.node_index[(self.states[node], key + ' CITY')] = node
+
+    def _bounded_bfs(self, max_hops):
+        """Hop distances from every node to all nodes within max_hops."""
+        n = len(self)
+        keys, hops = [], []
+        for source in range(n):
+            seen = {source}
+            frontier = np.array([source])
+            for hop in range(1, max_hops + 1):
+                reached = np.unique(np.concatenate(
+                    [self.indices[self.indptr[v]:self.indptr[v + 1]] for v in frontier]
+                )) if len(frontier) else np.zeros(0, dtype=np.int32)
+                frontier = np.array([v for v in reached if v not in seen], dtype=np.int64)
+                if len(frontier) == 0:
+                    break
+                seen.update(frontier.tolist())
+                keys.append(source * n + frontier)
+                hops.append(np.full(len(frontier), hop, dtype=np.int8))
+
+        if not keys:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8)
+        keys, hops = np.concatenate(keys), np.concatenate(hops)
+        order = np.argsort(keys)
+        return keys[order], hops[order]
+
+    def node_codes(self, states, counties):
+        """
+        Vectorized graph node lookup for (state, county name) arrays.
+
+        States may be names or abbreviations. Names ending in a designator
+        that is part of the county name (e.g. 'James City') are retried
+        unstripped; renamed counties go through COUNTY_ALIASES. Unknown
+        counties give -1.
+        """
+        frame = pd.DataFrame({'state': pd.Series(states, dtype=object).to_numpy(),
+                              'county': pd.Series(counties, dtype=object).to_numpy()})
+        if frame.empty:
+            return np.empty(0, dtype=np.int32)
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(frame), use_na_sentinel=False)
+        table = np.array([self._node(s, c) for s, c in uniques] + [-1], dtype=np.int32)
+        return table[codes]
+
+    def _node(self, state, county):
+        state = normalize_state(state)
+        key = county_key(county)
+        node = self.node_index.get((state, COUNTY_ALIASES.get((state, key), key)))
+        if node is None:
+            node = self.node_index.get((state, county_key(county, strip_suffix=False)), -1)
+        return node
+
+    def hops_between(self, node_a, node_b):
+        """Vectorized hop distance between node arrays (see county_distance)."""
+        return lookup_hops(self.pair_keys, self.pair_hops, len(self), node_a, node_b)
+
+    def county_distance(self, state, county_a, state_b, county_b):
+        """Vectorized hop distance between counties given by state and name."""
+        return self.hops_between(self.node_codes(state, county_a), self.node_codes(state_b, county_b))
+
+    def lookup_arrays(self):
+        """Flat arrays needed by lookup_hops(), e.g. for sharing with workers."""
+        return {
+            'pair_keys': self.pair_keys,
+            'pair_hops': self.pair_hops,
+            'n_nodes': np.array([len(self)], dtype=np.int64),
+        }
+
+
+def lookup_hops(pair_keys, pair_hops, n_nodes, node_a, node_b):
+    """
+    Hop distances for node pairs from precomputed (pair_keys, pair_hops).
+
+    Returns:
+        int8 array: 0 for the same county, 1..max_hops, DISTANCE_FAR when
+        further apart, DISTANCE_UNKNOWN when either node is -1
+    """
+    node_a = np.asarray(node_a, dtype=np.int64)
+    node_b = np.asarray(node_b, dtype=np.int64)
+    keys = node_a * int(n_nodes) + node_b
+
+    pos = np.searchsorted(pair_keys, keys)
+    pos_ok = np.minimum(pos, max(len(pair_keys) - 1, 0))
+    found = (pos < len(pair_keys)) & (pair_keys[pos_ok] == keys) if len(pair_keys) else np.zeros(len(keys), bool)
+
+    hops = np.full(len(keys), DISTANCE_FAR, dtype=np.int8)
+    hops[found] = pair_hops[pos_ok[found]]
+    hops[node_a == node_b] = 0
+    hops[(node_a < 0) | (node_b < 0)] = DISTANCE_UNKNOWN
+    return hops
+
+
+_default_graph = None
+
+
+def default_graph():
+    """The graph built from EDGE_LIST_PATH (loaded once), or None if the file is missing."""
+    global _default_graph
+    if _default_graph is None and os.path.exists(EDGE_LIST_PATH):
+        _default_graph = CountyGraph.from_edge_list(EDGE_LIST_PATH)
+    return _default_graph
+
+
+def county_distance(state, county_a, state_b, county_b, graph=None):
+    """
+    Vectorized county hop distance, across state lines.
+
+    Args:
+        state, county_a: State and county name arrays of the first side
+        state_b, county_b: State and county name arrays of the second side
+        graph: CountyGraph (defaults to the bundled edge list)
+
+    Returns:
+        int8 array of hops (0 = same county, DISTANCE_FAR beyond MAX_HOPS,
+        DISTANCE_UNKNOWN if a county cannot be resolved)
+    """
+    graph = graph if graph is not None else default_graph()
+    if graph is None:
+        raise FileNotFoundError(f"County adjacency edge list not found: {EDGE_LIST_PATH}")
+    return graph.county_distance(state, county_a, state_b, county_b)
+
+
+def main():
+    """Print graph statistics and how many NamUs counties resolve to graph nodes."""
+    import time
+
+    start = time.perf_counter()
+    graph = CountyGraph.from_edge_list()
+    print(f"County graph: {len(graph):,} counties, {graph.n_edges:,} borders, "
+          f"{len(graph.pair_keys):,} pairs within {graph.max_hops} hops ({time.perf_counter() - start:.2f}s)")
+
+    data_dir = os.path.join(ROOT, 'data', 'clean')
+    for label in ('MP', 'UP'):
+        df = pd.read_csv(os.path.join(data_dir, f'{label}_master.csv'))
+        nodes = graph.node_codes(df['state'], df['county'])
+        has_county = df['county'].notna().to_numpy()
+        print(f"{label}: {(nodes >= 0).sum():,} of {has_county.sum():,} cases with a county resolved "
+              f"({100 * (nodes >= 0).sum() / max(has_county.sum(), 1):.1f}%)")
+        missing = df.loc[(nodes < 0) & has_county, ['state', 'county']].value_counts().head(8)
+        for (state, county), count in missing.items():
+            print(f"    unresolved: {county}, {state} ({count})")
+
+    # Symmetry and a cross-state example
+    a = graph.node_codes(['OR', 'WA'], ['Multnomah', 'Clark'])
+    b = graph.node_codes(['WA', 'OR'], ['Clark', 'Multnomah'])
+    print(f"Multnomah, OR <-> Clark, WA: {graph.hops_between(a, b).tolist()} hops")
+
+
+if __name__ == '__main__':
+    main()
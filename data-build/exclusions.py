@@ -0,0 +1,229 @@
+"""
+Exclusion index shared by every stage.
+
+data/exclusions.csv is the append-only record of excluded cases (id, type,
+reason, date_added, notes); a later row for the same id replaces the earlier
+one. ExclusionIndex reads it once in O(exclusions) into sorted int32 case
+number arrays per side with a reason code per case, and answers membership
+for whole id arrays with one vectorized lookup:
+
+    index = ExclusionIndex()
+    pairs = pairs[~index.pair_mask(pairs['mp_id'], pairs['up_id'])]
+
+Pair generation drops excluded cases up front; scoring, prioritization and
+review filter the pairs they read by mask, so a new exclusion takes effect
+in those stages without regenerating pairs. Long-running consumers call
+reload() to pick up rows appended since they loaded; only the new bytes are
+read. append_exclusion() writes a single row instead of rewriting the file.
+"""
+
+import os
+import csv
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXCLUSIONS_PATH = os.environ.get('EXCLUSIONS_PATH', os.path.join(ROOT, 'data', 'exclusions.csv'))
+
+COLUMNS = ['id', 'type', 'reason', 'date_added', 'notes']
+ID_PREFIXES = {'mp': 'MP', 'up': 'UP'}
+
+# Reasons offered by review_matches.py and documented in EXCLUSIONS.md;
+# other reasons are given codes after these as they appear
+REASONS = [
+    'INFANT', 'PARTIAL_REMAINS', 'HISTORICAL', 'OTHER',
+    'RESOLVED', 'DUPLICATE', 'DATA_QUALITY', 'OUT_OF_SCOPE', 'AGENCY_REQUEST', 'FALSE_POSITIVE',
+]
+
+
+def _case_side(case_id):
+    """('mp' | 'up', case number) for an 'MP123'/'UP123' id, or None."""
+    case_id = case_id.strip().upper()
+    for side, prefix in ID_PREFIXES.items():
+        number = case_id[len(prefix):]
+        if case_id.startswith(prefix) and number.isdigit():
+            return side, int(number)
+    return None
+
+
+def _as_case_numbers(ids, prefix):
+    """Integer case numbers from int codes or 'MP...'/'UP...' strings."""
+    ids = np.asarray(ids)
+    if ids.dtype.kind in 'iu':
+        return ids.astype(np.int64, copy=False)
+    uniques, inverse = np.unique(ids.astype(str), return_inverse=True)
+    numbers = np.array([int(u[len(prefix):]) if u.startswith(prefix) and u[len(prefix):].isdigit() else -1
+                        for u in uniques], dtype=np.int64)
+    return numbers[inverse]
+
+
+class ExclusionIndex:
+    """
+    Excluded case numbers and reason codes loaded from the exclusions file.
+
+    Args:
+        path: Exclusions CSV (default: EXCLUSIONS_PATH)
+    """
+
+    def __init__(self, path=EXCLUSIONS_PATH):
+        self.path = path
+        self.reasons = list(REASONS)
+        self._records = {'mp': {}, 'up': {}}  # case number -> reason code
+        self._offset = 0
+        self._signature = None
+        self._build()
+        self.reload()
+
+    def _reason_code(self, reason):
+        reason = (reason or 'OTHER').strip().upper() or 'OTHER'
+        if reason not in self.reasons:
+            self.reasons.append(reason)
+        return self.reasons.index(reason)
+
+    def _read_rows(self, start):
+        """Parse rows from byte offset start; returns the offset after the last full line."""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b'\n') + 1  # a partially written last line is left for the next reload
+        lines = data[:end].decode('utf-8-sig' if start == 0 else 'utf-8').splitlines()
+        rows = csv.reader(lines)
+        if start == 0:
+            next(rows, None)  # header
+        for row in rows:
+            if not row:
+                continue
+            parsed = _case_side(row[0])
+            if parsed is None:
+                continue
+            side, number = parsed
+            self._records[side][number] = self._reason_code(row[2] if len(row) > 2 else '')
+        return start + end
+
+    def _build(self):
+        """Rebuild the sorted lookup arrays from the records."""
+        for side, records in self._records.items():
+            numbers = np.fromiter(records, dtype=np.int64, count=len(records))
+            codes = np.fromiter(records.values(), dtype=np.int8, count=len(records))
+            order = np.argsort(numbers)
+            setattr(self, f'{side}_ids', numbers[order].astype(np.int32))
+            setattr(self, f'{side}_reasons', codes[order])
+
+    def reload(self):
+        """
+        Pick up changes to the exclusions file.
+
+        Appended rows are read from where the last load stopped; a file that
+        shrank or was replaced is read again from the start.
+
+        Returns:
+            True if the index changed
+        """
+        if not os.path.exists(self.path):
+            changed = self._signature is not None
+            self._records = {'mp': {}, 'up': {}}
+            self._offset, self._signature = 0, None
+            self._build()
+            return changed
+
+        stat = os.stat(self.path)
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if signature == self._signature:
+            return False
+        if self._signature is None or stat.st_ino != self._signature[0] or stat.st_size < self._offset:
+            self._records = {'mp': {}, 'up': {}}
+            self._offset = 0
+        self._offset = self._read_rows(self._offset)
+        self._signature = signature
+        self._build()
+        return True
+
+    def __len__(self):
+        return len(self.mp_ids) + len(self.up_ids)
+
+    def __contains__(self, case_id):
+        parsed = _case_side(str(case_id))
+        return parsed is not None and parsed[1] in self._records[parsed[0]]
+
+    def reason(self, case_id):
+        """Exclusion reason of a case, or None if it is not excluded."""
+        parsed = _case_side(str(case_id))
+        if parsed is None or parsed[1] not in self._records[parsed[0]]:
+            return None
+        return self.reasons[self._records[parsed[0]][parsed[1]]]
+
+    def ids(self, side):
+        """Excluded NamUs ids of one side ('mp' or 'up') as a set of strings."""
+        return {f'{ID_PREFIXES[side]}{number}' for number in getattr(self, f'{side}_ids')}
+
+    def mask(self, side, ids):
+        """Boolean array: which ids (int case numbers or 'MP...'/'UP...' strings) are excluded."""
+        excluded = getattr(self, f'{side}_ids')
+        if len(excluded) == 0:
+            return np.zeros(len(ids), dtype=bool)
+        return np.isin(_as_case_numbers(ids, ID_PREFIXES[side]), excluded)
+
+    def pair_mask(self, mp_ids, up_ids):
+        """Boolean array: which pairs involve an excluded MP or UP."""
+        return self.mask('mp', mp_ids) | self.mask('up', up_ids)
+
+    def reason_counts(self):
+        """Excluded cases per (type, reason)."""
+        rows = [(side.upper(), self.reasons[code]) for side in ('mp', 'up')
+                for code in getattr(self, f'{side}_reasons')]
+        return pd.DataFrame(rows, columns=['type', 'reason']).value_counts().sort_index()
+
+
+def append_exclusion(case_id, reason, notes='', path=EXCLUSIONS_PATH):
+    """
+    Append one exclusion row (the file is created with its header if needed).
+
+    Raises:
+        ValueError: If case_id is not an 'MP...'/'UP...' id
+    """
+    parsed = _case_side(case_id)
+    if parsed is None:
+        raise ValueError(f"Exclusion ids must look like 'MP<number>' or 'UP<number>', got {case_id!r}")
+    side, number = parsed
+
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    missing_newline = False
+    if not new_file:
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            missing_newline = f.read(1) != b'\n'
+
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)  # '\r\n' line endings, like the existing file
+        if new_file:
+            writer.writerow(COLUMNS)
+        elif missing_newline:
+            f.write('\r\n')
+        writer.writerow([f'{ID_PREFIXES[side]}{number}', side.upper(), reason, date.today().isoformat(), notes])
+
+
+def main():
+    """Summarize the exclusion index and benchmark loading and masking."""
+    import time
+
+    start = time.perf_counter()
+    index = ExclusionIndex()
+    load_time = time.perf_counter() - start
+    print(f"{EXCLUSIONS_PATH}: {len(index.mp_ids)} MP and {len(index.up_ids)} UP exclusions "
+          f"(loaded in {load_time * 1000:.1f} ms)")
+    for (case_type, reason), count in index.reason_counts().items():
+        print(f"  {case_type} {reason}: {count}")
+
+    rng = np.random.default_rng(0)
+    up_ids = np.concatenate([index.up_ids, rng.integers(1, 160_000, 10_000_000 - len(index.up_ids))])
+    mp_ids = rng.integers(1, 160_000, len(up_ids))
+    start = time.perf_counter()
+    mask = index.pair_mask(mp_ids, up_ids)
+    print(f"  Pair mask over {len(up_ids):,} pairs: {time.perf_counter() - start:.2f}s "
+          f"({mask.sum():,} excluded)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Export the scored matches as RAGnet graph shards for index.html.
+
+Reads all_matches_scored.csv in chunks, keeps only matches passing the
+score / tier / match-count filters, caps every node at its top-k edges by
+final_score (an edge is kept only if it is in the top k of both its MP and
+its UP) and writes one shard per MP state plus a small manifest:
+
+    out/ragnet/manifest.json     filters, totals, {state: {file, nodes, edges, max_score}}
+    out/ragnet/overview.json     best OVERVIEW_EDGES edges overall (initial view)
+    out/ragnet/state=OH.json     {"state", "nodes": [...], "edges": [...]}
+
+The front end loads the manifest and overview, then lazy-loads a state's
+shard when it is selected. Shards are written node by node and edge by
+edge rather than built as one JSON string.
+
+Nodes: {id, type ('MP'|'UP'), label, state, sex}
+Edges: {id, source (MP), target (UP), score, tier, mp_match_count, up_match_count}
+
+Usage:
+    python3 data-build/export_graph.py [--min-score 0.5] [--max-tier 2] [--max-count 10] [--top-k 10]
+"""
+
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from pair_store import encode_case_ids, pairs_exist, read_case_pairs
+from top_k import grouped_top_k
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.environ.get('OUT_DIR', os.path.join(ROOT, 'out'))
+GRAPH_DIR = 'ragnet'
+
+# Rows per chunk when streaming all_matches_scored.csv
+CHUNK_ROWS = 250_000
+
+# Edges per node kept for the cose layout
+DEFAULT_TOP_K = 10
+
+# Edges in the overview shown before a state is selected (index.html renders up to 2000)
+OVERVIEW_EDGES = 2000
+
+# Columns read from the scored matches
+EDGE_COLUMNS = ['mp_id', 'up_id', 'final_score', 'mp_match_count', 'up_match_count', 'state_mp']
+NODE_COLUMNS = {
+    'MP': {'id': 'mp_id', 'label': 'mp_name', 'state': 'state_mp', 'sex': 'sex_mp'},
+    'UP': {'id': 'up_id', 'label': 'mec_case', 'state': 'state_up', 'sex': 'sex_up'},
+}
+
+
+def read_filtered_matches(path, min_score=None, max_count=None):
+    """
+    Stream the scored matches, keeping the rows that pass the filters.
+
+    Returns:
+        (edges DataFrame, nodes DataFrame indexed by id with type/label/state/sex)
+    """
+    usecols = set(EDGE_COLUMNS)
+    for columns in NODE_COLUMNS.values():
+        usecols.update(columns.values())
+
+    edge_chunks, node_chunks = [], []
+    with tqdm(desc="   Reading matches", unit=' rows', unit_scale=True) as progress:
+        for chunk in pd.read_csv(path, usecols=lambda col: col in usecols, chunksize=CHUNK_ROWS,
+                                 low_memory=False):
+            progress.update(len(chunk))
+            keep = pd.Series(True, index=chunk.index)
+            if min_score is not None:
+                keep &= chunk['final_score'] >= min_score
+            if max_count is not None:
+                keep &= (chunk['mp_match_count'] <= max_count) & (chunk['up_match_count'] <= max_count)
+            chunk = chunk[keep]
+            if chunk.empty:
+                continue
+            edge_chunks.append(chunk[EDGE_COLUMNS])
+            for node_type, columns in NODE_COLUMNS.items():
+                nodes = chunk[[col for col in columns.values() if col in chunk.columns]]
+                nodes = nodes.rename(columns={col: key for key, col in columns.items()})
+                node_chunks.append(nodes.drop_duplicates('id').assign(type=node_type))
+
+    if not edge_chunks:
+        return pd.DataFrame(columns=EDGE_COLUMNS), pd.DataFrame(columns=['type', 'label', 'state', 'sex'])
+    nodes = pd.concat(node_chunks, ignore_index=True).drop_duplicates('id').set_index('id')
+    return pd.concat(edge_chunks, ignore_index=True), nodes
+
+
+def attach_tiers(edges, out_dir):
+    """
+    Add priority_tier from the candidate pair dataset (the scored CSV does
+    not carry it); pairs not found get tier 0.
+    """
+    if edges.empty or not pairs_exist(out_dir):
+        return edges.assign(priority_tier=0)
+    mp_codes = encode_case_ids(edges['mp_id'], 'MP')
+    up_codes = encode_case_ids(edges['up_id'], 'UP')
+    tiers = read_case_pairs(out_dir, mp_ids=np.unique(mp_codes), states=edges['state_mp'].dropna().unique(),
+                            columns=('mp_id', 'up_id', 'priority_tier'))
+    tiers = tiers[tiers['up_id'].isin(np.unique(up_codes))]
+    key = pd.MultiIndex.from_arrays([mp_codes, up_codes])
+    lookup = pd.Series(tiers['priority_tier'].to_numpy(),
+                       index=pd.MultiIndex.from_arrays([tiers['mp_id'], tiers['up_id']]))
+    lookup = lookup[~lookup.index.duplicated()]
+    return edges.assign(priority_tier=lookup.reindex(key).fillna(0).astype(np.int8).to_numpy())
+
+
+def cap_edges(edges, k):
+    """Edges in the top k (by final_score) of both their MP and their UP, best first."""
+    ranked = edges.sort_values('final_score', ascending=False, kind='stable')
+    keep = grouped_top_k(ranked, 'mp_id', k=k, sort_key=None).index.intersection(
+        grouped_top_k(ranked, 'up_id', k=k, sort_key=None).index)
+    return ranked[ranked.index.isin(keep)]
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ''
+
+
+def node_record(case_id, nodes):
+    row = nodes.loc[case_id]
+    return {
+        'id': case_id,
+        'type': row['type'],
+        'label': _text(row.get('label')) or case_id,
+        'state': _text(row.get('state')),
+        'sex': _text(row.get('sex')),
+    }
+
+
+def edge_records(edges):
+    for row in edges.itertuples(index=False):
+        yield {
+            'id': f'{row.mp_id}-{row.up_id}',
+            'source': row.mp_id,
+            'target': row.up_id,
+            'score': round(float(row.final_score), 4),
+            'tier': int(row.priority_tier),
+            'mp_match_count': int(row.mp_match_count),
+            'up_match_count': int(row.up_match_count),
+        }
+
+
+def write_shard(path, edges, nodes, header):
+    """Stream one graph file: header fields, then nodes and edges one per line."""
+    node_ids = pd.unique(np.concatenate([edges['mp_id'].to_numpy(), edges['up_id'].to_numpy()]))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header)[:-1] + ', "nodes": [\n')
+        for i, case_id in enumerate(node_ids):
+            f.write((',\n' if i else '') + json.dumps(node_record(case_id, nodes)))
+        f.write('\n], "edges": [\n')
+        for i, edge in enumerate(edge_records(edges)):
+            f.write((',\n' if i else '') + json.dumps(edge))
+        f.write('\n]}\n')
+    os.replace(tmp_path, path)
+    return len(node_ids)
+
+
+def export_graph(out_dir=OUT_DIR, min_score=None, max_tier=None, max_count=None, top_k=DEFAULT_TOP_K):
+    """
+    Write the graph shards and manifest.
+
+    Returns:
+        The manifest dict
+
+    Raises:
+        FileNotFoundError: If score_candidates.py has not been run
+    """
+    source = os.path.join(out_dir, 'all_matches_scored.csv')
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"{source} not found. Run score_candidates.py first.")
+
+    print("\n1. Reading and filtering scored matches...")
+    edges, nodes = read_filtered_matches(source, min_score, max_count)
+    edges = attach_tiers(edges, out_dir)
+    if max_tier is not None:
+        edges = edges[(edges['priority_tier'] >= 1) & (edges['priority_tier'] <= max_tier)]
+    print(f"   {len(edges):,} matches pass the filters")
+
+    print(f"\n2. Capping edges at top {top_k} per node...")
+    edges = cap_edges(edges, top_k)
+    print(f"   {len(edges):,} edges kept")
+
+    print("\n3. Writing shards...")
+    graph_dir = os.path.join(out_dir, GRAPH_DIR)
+    os.makedirs(graph_dir, exist_ok=True)
+    for name in os.listdir(graph_dir):
+        if name.startswith('state=') and name.endswith('.json'):
+            os.remove(os.path.join(graph_dir, name))
+
+    filters = {'min_score': min_score, 'max_tier': max_tier, 'max_count': max_count, 'top_k': top_k}
+    states = {}
+    for state, shard in tqdm(edges.groupby('state_mp', sort=True), desc="   States"):
+        filename = f'state={state}.json'
+        n_nodes = write_shard(os.path.join(graph_dir, filename), shard, nodes, {'state': state})
+        states[state] = {'file': filename, 'nodes': n_nodes, 'edges': len(shard),
+                         'max_score': round(float(shard['final_score'].max()), 4)}
+
+    overview = edges.head(OVERVIEW_EDGES)
+    overview_nodes = write_shard(os.path.join(graph_dir, 'overview.json'), overview, nodes, {'state': None})
+
+    manifest = {
+        'generated': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'source': 'all_matches_scored.csv',
+        'filters': filters,
+        'total_nodes': int(edges['mp_id'].nunique() + edges['up_id'].nunique()),
+        'total_edges': len(edges),
+        'overview': {'file': 'overview.json', 'nodes': overview_nodes, 'edges': len(overview)},
+        'states': states,
+    }
+    with open(os.path.join(graph_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export scored matches as RAGnet graph shards')
+    parser.add_argument('--min-score', type=float, help="Minimum final_score")
+    parser.add_argument('--max-tier', type=int, help="Highest priority tier to include (1 = best)")
+    parser.add_argument('--max-count', type=int, help="Maximum match count on both sides")
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help="Edges kept per node")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("RAGnet Graph Export")
+    print("=" * 60)
+    start = time.perf_counter()
+    manifest = export_graph(min_score=args.min_score, max_tier=args.max_tier,
+                            max_count=args.max_count, top_k=args.top_k)
+    print(f"\n✓ {len(manifest['states'])} state shards, {manifest['total_nodes']:,} nodes, "
+          f"{manifest['total_edges']:,} edges in {time.perf_counter() - start:.1f}s")
+    print(f"  {os.path.join(OUT_DIR, GRAPH_DIR, 'manifest.json')}")
+
+
+if __name__ == '__main__':
+    main()
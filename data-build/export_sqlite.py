@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Export cases, matches and review decisions to a local SQLite database.
+
+Loads the cleaned masters, the scored matches, the prioritized candidate
+pairs and the review log into out/maria.db with indexes on the columns
+ad-hoc questions filter by, so tools can pull just the rows they need
+(see match_db.py) instead of parsing multi-GB CSVs:
+
+    mp_cases            MP_master.csv                    id (primary key), state
+    up_cases            UP_master.csv                    id (primary key), state
+    scored_matches      all_matches_scored.csv           mp_id, up_id, state_mp, state_up,
+                                                         final_score, (mp_match_count, up_match_count)
+    prioritized_pairs   candidate_pairs_prioritized.csv  mp_id, up_id, (state, priority_tier),
+                        + state (of the MP)              priority_score, (mp_match_count, up_match_count)
+    reviews             review_log.jsonl                 (mp_id, up_id), action
+
+CSVs are streamed in chunks, and the database is built next to the old one
+and swapped in when complete, so readers never see a half-written file.
+
+Usage:
+    python3 data-build/export_sqlite.py
+    python3 data-build/export_sqlite.py --reviews-only   # refresh review decisions
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+import pandas as pd
+from tqdm import tqdm
+
+from review_log import REVIEW_LOG_PATH, ReviewLog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, 'data', 'clean')
+OUT_DIR = os.environ.get('OUT_DIR', os.path.join(ROOT, 'out'))
+DB_PATH = os.path.join(OUT_DIR, 'maria.db')
+
+# Rows per chunk when streaming CSVs into SQLite
+CHUNK_ROWS = 500_000
+
+# Table -> indexes (each a tuple of columns)
+INDEXES = {
+    'mp_cases': [('state',)],
+    'up_cases': [('state',)],
+    'scored_matches': [('mp_id',), ('up_id',), ('state_mp',), ('state_up',), ('final_score',),
+                       ('mp_match_count', 'up_match_count')],
+    'prioritized_pairs': [('mp_id',), ('up_id',), ('state', 'priority_tier'), ('priority_score',),
+                          ('mp_match_count', 'up_match_count')],
+    'reviews': [('mp_id', 'up_id'), ('action',)],
+}
+
+
+def create_indexes(conn, table):
+    """Create the INDEXES of a table."""
+    for columns in INDEXES[table]:
+        name = f"idx_{table}_{'_'.join(columns)}"
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+
+def load_cases(conn, data_dir):
+    """Load both masters with the NamUs id as primary key."""
+    for table, filename in (('mp_cases', 'MP_master.csv'), ('up_cases', 'UP_master.csv')):
+        df = pd.read_csv(os.path.join(data_dir, filename)).drop_duplicates('id')
+        columns = ', '.join(f'"{col}"' + (' TEXT PRIMARY KEY' if col == 'id' else '') for col in df.columns)
+        conn.execute(f"CREATE TABLE {table} ({columns}) WITHOUT ROWID")
+        df.to_sql(table, conn, if_exists='append', index=False)
+        create_indexes(conn, table)
+        print(f"   {table}: {len(df):,} cases")
+
+
+def load_csv(conn, table, path, transform=None):
+    """
+    Stream a CSV into a new table in CHUNK_ROWS chunks.
+
+    Args:
+        transform: Optional function applied to each chunk before insert
+
+    Returns:
+        Number of rows loaded
+    """
+    rows = 0
+    with tqdm(desc=f"   {table}", unit=' rows', unit_scale=True) as progress:
+        for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS, low_memory=False):
+            if transform is not None:
+                chunk = transform(chunk)
+            chunk.to_sql(table, conn, if_exists='append', index=False)
+            rows += len(chunk)
+            progress.update(len(chunk))
+    create_indexes(conn, table)
+    return rows
+
+
+def load_reviews(conn, review_log_path):
+    """(Re)load the review log; one row per logged action."""
+    conn.execute("DROP TABLE IF EXISTS reviews")
+    reviews = ReviewLog(review_log_path).to_frame()
+    reviews.astype(str).to_sql('reviews', conn, index=False)
+    create_indexes(conn, 'reviews')
+    return len(reviews)
+
+
+def export_database(db_path=DB_PATH, data_dir=DATA_DIR, out_dir=OUT_DIR, review_log_path=REVIEW_LOG_PATH):
+    """
+    Build the database from scratch and swap it in.
+
+    Match tables whose CSV does not exist are skipped.
+    """
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    # Bulk load: no journal, no fsync; the file is only used once complete
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    try:
+        print("\n1. Loading cases...")
+        load_cases(conn, data_dir)
+        mp_states = pd.read_sql_query("SELECT id, state FROM mp_cases", conn).set_index('id')['state']
+
+        print("\n2. Loading scored matches...")
+        scored_path = os.path.join(out_dir, 'all_matches_scored.csv')
+        if os.path.exists(scored_path):
+            rows = load_csv(conn, 'scored_matches', scored_path)
+            print(f"   scored_matches: {rows:,} matches")
+        else:
+            print(f"   Skipped: {scored_path} not found (run score_candidates.py)")
+
+        print("\n3. Loading prioritized pairs...")
+        prioritized_path = os.path.join(out_dir, 'candidate_pairs_prioritized.csv')
+        if os.path.exists(prioritized_path):
+            rows = load_csv(conn, 'prioritized_pairs', prioritized_path,
+                            transform=lambda chunk: chunk.assign(state=chunk['mp_id'].map(mp_states)))
+            print(f"   prioritized_pairs: {rows:,} pairs")
+        else:
+            print(f"   Skipped: {prioritized_path} not found (run prioritize_matches.py)")
+
+        print("\n4. Loading review decisions...")
+        print(f"   reviews: {load_reviews(conn, review_log_path):,} actions")
+
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export cases and matches to SQLite')
+    parser.add_argument('--db', default=DB_PATH, help=f"Database path (default: {DB_PATH})")
+    parser.add_argument('--reviews-only', action='store_true',
+                        help="Only refresh the reviews table of an existing database")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SQLite Export")
+    print("=" * 60)
+    start = time.perf_counter()
+
+    if args.reviews_only:
+        if not os.path.exists(args.db):
+            print(f"ERROR: {args.db} not found. Run without --reviews-only first.")
+            sys.exit(1)
+        with sqlite3.connect(args.db) as conn:
+            print(f"   reviews: {load_reviews(conn, REVIEW_LOG_PATH):,} actions")
+    else:
+        export_database(args.db)
+
+    size_mb = os.path.getsize(args.db) / 1e6
+    verb = 'Updated' if args.reviews_only else 'Wrote'
+    print(f"\n✓ {verb} {args.db} ({size_mb:,.0f} MB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,37 +10,8 @@ import pandas as pd
 import numpy as np
 from tqdm import tqdm
 from state_normalizer import normalize_state
-
-
-def parse_races(race_str):
-    """Parse a race string into a set of normalized race categories."""
-    if pd.isna(race_str) or str(race_str).strip() == '':
-        return set()
-    # Split by comma and normalize each part
-    races = set()
-    for part in str(race_str).split(','):
-        normalized = part.strip().upper()
-        if normalized and normalized not in ('UNCERTAIN', 'UNKNOWN', 'OTHER'):
-            races.add(normalized)
-    return races
-
-
-def races_overlap(race_mp, race_up):
-    """Check if two race strings have any overlapping categories.
-
-    Returns True if:
-    - Either race is empty/unknown (can't rule out match)
-    - There's at least one common race category
-    """
-    races_mp = parse_races(race_mp)
-    races_up = parse_races(race_up)
-
-    # If either is empty/unknown, allow the match (can't rule it out)
-    if not races_mp or not races_up:
-        return True
-
-    # Check for any overlap
-    return bool(races_mp & races_up)
+from case_encoding import encode_cases
+from race_encoding import build_race_bits, races_overlap_mask
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA_DIR = os.path.join(ROOT, 'data', 'clean')
@@ -64,6 +35,19 @@ up['found_days'] = pd.to_datetime(up['found_date'], errors='coerce').dt.date.map
     lambda d: d.toordinal() if pd.notna(d) else None
 )
 
+# Encode races (bitmasks) and locations (integer codes) once per case, so
+# pair rows only carry integers
+race_bits = build_race_bits(mp['race'], up['race'])
+mp_codes, up_codes, _ = encode_cases(mp, up, race_bits=race_bits)
+for df, codes in ((mp, mp_codes), (up, up_codes)):
+    df['race_mask'] = codes['race_mask']
+    df['state_code'] = codes['state']
+    df['county_code'] = codes['county']
+    df['city_code'] = codes['city']
+
+# A blank MP state never matches
+mp.loc[mp['state'].str.strip().eq('').fillna(False).to_numpy(), 'state_code'] = -1
+
 print(f"   Loaded {len(mp):,} missing persons and {len(up):,} unidentified persons")
 print(f"   Potential comparisons: {len(mp) * len(up):,}")
 
@@ -122,9 +106,9 @@ for mp_sex, up_sexes in sex_matching_rules:
 
         # Cross join this MP chunk with matching UPs
         pairs_chunk = mp_chunk[['id', 'sex', 'age_min', 'age_max', 'last_seen_days',
-                                 'county', 'city', 'state', 'race', '_merge_key']].merge(
+                                 'county_code', 'city_code', 'state_code', 'race_mask', '_merge_key']].merge(
             up_temp[['id', 'sex', 'age_min', 'age_max', 'found_days',
-                    'county', 'city', 'state', 'race', '_merge_key']],
+                    'county_code', 'city_code', 'state_code', 'race_mask', '_merge_key']],
             on='_merge_key',
             suffixes=('_mp', '_up')
         )
@@ -160,12 +144,9 @@ for mp_sex, up_sexes in sex_matching_rules:
             continue
 
         # Filter 4: Same state (critical for reducing pairs to manageable size)
-        pairs_chunk['state_mp_norm'] = pairs_chunk['state_mp'].str.strip().str.upper()
-        pairs_chunk['state_up_norm'] = pairs_chunk['state_up'].str.strip().str.upper()
         same_state_filter = (
-            (pairs_chunk['state_mp_norm'] == pairs_chunk['state_up_norm']) &
-            (pairs_chunk['state_mp_norm'] != '') &
-            (pairs_chunk['state_mp_norm'].notna())
+            (pairs_chunk['state_code_mp'] == pairs_chunk['state_code_up']) &
+            (pairs_chunk['state_code_mp'] >= 0)
         )
         pairs_chunk = pairs_chunk[same_state_filter]
 
@@ -173,10 +154,8 @@ for mp_sex, up_sexes in sex_matching_rules:
             continue
 
         # Filter 5: Race overlap (at least one common race category, or unknown)
-        race_overlap_mask = pairs_chunk.apply(
-            lambda row: races_overlap(row['race_mp'], row['race_up']), axis=1
-        )
-        pairs_chunk = pairs_chunk[race_overlap_mask]
+        race_ok = races_overlap_mask(pairs_chunk['race_mask_mp'], pairs_chunk['race_mask_up'])
+        pairs_chunk = pairs_chunk[race_ok]
 
         if len(pairs_chunk) == 0:
             continue
@@ -184,27 +163,13 @@ for mp_sex, up_sexes in sex_matching_rules:
         # Calculate days_gap
         pairs_chunk['days_gap'] = pairs_chunk['found_days'] - pairs_chunk['last_seen_days']
 
-        # Calculate geographic matches (same state, county, city)
-        pairs_chunk['same_state'] = (
-            (pairs_chunk['state_mp'].str.strip().str.upper() ==
-             pairs_chunk['state_up'].str.strip().str.upper()) &
-            (pairs_chunk['state_mp'].notna()) &
-            (pairs_chunk['state_mp'] != '')
-        )
-
-        pairs_chunk['same_county'] = (
-            (pairs_chunk['county_mp'].str.strip().str.upper() ==
-             pairs_chunk['county_up'].str.strip().str.upper()) &
-            (pairs_chunk['county_mp'].notna()) &
-            (pairs_chunk['county_mp'] != '')
-        )
-
-        pairs_chunk['same_city'] = (
-            (pairs_chunk['city_mp'].str.strip().str.upper() ==
-             pairs_chunk['city_up'].str.strip().str.upper()) &
-            (pairs_chunk['city_mp'].notna()) &
-            (pairs_chunk['city_mp'] != '')
-        )
+        # Calculate geographic matches (same state, county, city); missing
+        # and blank MP values have code -1 and never match
+        for col in ('state', 'county', 'city'):
+            pairs_chunk[f'same_{col}'] = (
+                (pairs_chunk[f'{col}_code_mp'] == pairs_chunk[f'{col}_code_up']) &
+                (pairs_chunk[f'{col}_code_mp'] >= 0)
+            )
 
         # Keep only needed columns
         pairs_final = pairs_chunk[[
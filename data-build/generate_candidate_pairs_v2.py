@@ -7,65 +7,85 @@ Key improvements based on manual review learnings:
 2. Creates priority tiers (same-city matches deprioritized)
 3. Supports cross-state matching for adjacent states
 4. Better scoring integration
+5. Cross-state pairs in bordering counties (county_graph.py) are tier 1
+
+State blocks can be processed on several cores; the output is identical
+to a serial run:
+
+    python3 data-build/generate_candidate_pairs_v2.py --workers 4
+
+Pairs are written to out/candidate_pairs/ as a Parquet dataset partitioned
+by state (see pair_store.py); pass --csv to also export the CSV files.
+
+After a NamUs refresh only a few hundred cases change. With --incremental
+the masters are diffed against the snapshot of the last build
+(case_delta.py), only pairs involving added or modified cases are
+regenerated, and the stored pair set and per-case match counts are patched:
+
+    python3 data-build/generate_candidate_pairs_v2.py --incremental
+
+--self-check only checks the vectorized priority tiers against
+calculate_priority_tier() and exits without building pairs.
 """
 
 import os
+import sys
 import json
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
-from state_normalizer import normalize_state
 from adjacent_states import are_states_adjacent, get_adjacent_states
+from blocking import UPIntervalIndex
+from case_delta import case_fingerprints, diff_cases, file_digest, invalidate_snapshot, load_snapshot, write_snapshot
+from case_encoding import SEX_CODES, encode_cases
+from county_graph import EDGE_LIST_PATH, default_graph, lookup_hops
+from exclusions import EXCLUSIONS_PATH, ExclusionIndex
+from pair_store import (count_matches, encode_case_ids, export_pairs_csv, pairs_exist, patch_pairs,
+                        read_match_counts, read_pairs, update_match_counts, write_match_counts, write_pairs)
+from race_encoding import races_overlap_mask
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA_DIR = os.path.join(ROOT, 'data', 'clean')
 OUT_DIR = os.environ.get('OUT_DIR', os.path.join(ROOT, 'out'))
-EXCLUSIONS_PATH = os.path.join(ROOT, 'data', 'exclusions.csv')
 os.makedirs(OUT_DIR, exist_ok=True)
 
+SEX_MATCHING_RULES = [
+    ('M', ['M', 'Unknown']),
+    ('F', ['F', 'Unknown']),
+    ('Unknown', ['M', 'F', 'Unknown'])
+]
 
-def parse_races(race_str):
-    """Parse a race string into a set of normalized race categories."""
-    if pd.isna(race_str) or str(race_str).strip() == '':
-        return set()
-    races = set()
-    for part in str(race_str).split(','):
-        normalized = part.strip().upper()
-        if normalized and normalized not in ('UNCERTAIN', 'UNKNOWN', 'OTHER'):
-            races.add(normalized)
-    return races
+TIER_REASONS = ['same_state_diff_county', 'adjacent_state', 'same_county_diff_city', 'same_city',
+                'adjacent_county']
 
+# Above this share of changed cases an incremental run rebuilds everything
+INCREMENTAL_MAX_CHANGED = 0.25
 
-def races_overlap(race_mp, race_up):
-    """Check if two race strings have any overlapping categories."""
-    races_mp = parse_races(race_mp)
-    races_up = parse_races(race_up)
-    if not races_mp or not races_up:
-        return True  # Can't rule it out
-    return bool(races_mp & races_up)
+# Encoded case arrays used by block workers: {'mp': {...}, 'up': {...}},
+# plus the county graph lookup arrays under 'graph' when available
+_BLOCK_ARRAYS = {}
+_SHARED_BLOCKS = []
 
 
 def load_exclusions():
-    """Load exclusions file and return set of excluded UP IDs."""
+    """Load the exclusion index (see exclusions.py); empty if there is no exclusions file."""
     if not os.path.exists(EXCLUSIONS_PATH):
         print(f"   Warning: No exclusions file found at {EXCLUSIONS_PATH}")
-        return set()
-
-    try:
-        exclusions_df = pd.read_csv(EXCLUSIONS_PATH)
-        excluded_ids = set(exclusions_df['id'].astype(str))
-        return excluded_ids
-    except Exception as e:
-        print(f"   Warning: Error loading exclusions: {e}")
-        return set()
+    return ExclusionIndex(EXCLUSIONS_PATH)
 
 
-def calculate_priority_tier(same_state, same_county, same_city, adjacent_state=False):
+def calculate_priority_tier(same_state, same_county, same_city, adjacent_state=False, adjacent_county=False):
     """
     Calculate priority tier based on geographic relationship.
 
-    Tier 1 (HIGHEST): Different county within same state - likely NOT already checked
-    Tier 2: Adjacent county (heuristic) or adjacent state
+    Tier 1 (HIGHEST): Different county within same state, or a bordering
+        county across a state line - likely NOT already checked
+    Tier 2: Adjacent state
     Tier 3: Same county, different city
     Tier 4 (LOWEST): Same city - authorities likely already checked
 
@@ -75,6 +95,8 @@ def calculate_priority_tier(same_state, same_county, same_city, adjacent_state=F
         return 4, "same_city"
     elif same_county:
         return 3, "same_county_diff_city"
+    elif adjacent_county and not same_state:
+        return 1, "adjacent_county"
     elif adjacent_state:
         return 2, "adjacent_state"
     elif same_state:
@@ -83,124 +105,350 @@ def calculate_priority_tier(same_state, same_county, same_city, adjacent_state=F
         return 2, "adjacent_state"  # Cross-state matches
 
 
+def priority_tiers(same_state, same_county, same_city, adjacent_state=False, adjacent_county=False):
+    """
+    Vectorized calculate_priority_tier() over boolean arrays (or scalars).
+
+    Returns:
+        (tier, reason_code): int8 arrays, reason_code indexing TIER_REASONS
+    """
+    same_state, same_county, same_city, adjacent_state, adjacent_county = np.broadcast_arrays(
+        *(np.asarray(flag, dtype=bool) for flag in
+          (same_state, same_county, same_city, adjacent_state, adjacent_county))
+    )
+    conditions = [
+        same_city,
+        same_county,
+        adjacent_county & ~same_state,
+        adjacent_state,
+        same_state,
+    ]
+    reasons = ['same_city', 'same_county_diff_city', 'adjacent_county', 'adjacent_state', 'same_state_diff_county']
+    tier = np.select(conditions, [4, 3, 1, 2, 1], default=2).astype(np.int8)
+    reason_code = np.select(conditions, [TIER_REASONS.index(r) for r in reasons],
+                            default=TIER_REASONS.index('adjacent_state')).astype(np.int8)
+    return tier, reason_code
+
+
+def check_priority_tiers():
+    """
+    Check priority_tiers() against calculate_priority_tier() for every
+    combination of the five flags.
+
+    Raises:
+        RuntimeError: If any combination disagrees
+    """
+    flags = np.array([[(combo >> bit) & 1 for bit in range(5)] for combo in range(32)], dtype=bool)
+    tier, reason_code = priority_tiers(*flags.T)
+    for row, got_tier, got_code in zip(flags, tier, reason_code):
+        expected = calculate_priority_tier(*(bool(flag) for flag in row))
+        if (int(got_tier), TIER_REASONS[got_code]) != expected:
+            raise RuntimeError(
+                f"priority_tiers{tuple(bool(flag) for flag in row)} gives "
+                f"{(int(got_tier), TIER_REASONS[got_code])}, calculate_priority_tier gives {expected}"
+            )
+
+
+def pair_block(mp_arrays, up_arrays, mp_rows, up_rows, is_adjacent_state=False, graph_arrays=None):
+    """
+    Generate candidate pairs between two row subsets of the encoded case arrays.
+
+    Args:
+        mp_arrays / up_arrays: Encoded arrays from case_encoding.encode_cases
+        mp_rows / up_rows: Row positions making up this block
+        is_adjacent_state: Whether the UPs come from an adjacent state
+        graph_arrays: Optional CountyGraph.lookup_arrays(); with 'county_node'
+            in the case arrays, bordering counties across the state line are
+            detected for adjacent-state blocks
+
+    Returns:
+        Dict of equally long arrays: mp_row, up_row, same_state, same_county,
+        same_city, priority_tier, tier_code
+    """
+    blocks = []
+    check_borders = is_adjacent_state and graph_arrays is not None and 'county_node' in mp_arrays
+
+    # Age and temporal filters are applied by the blocking index, so only
+    # surviving pairs are ever materialized
+    index = UPIntervalIndex(
+        up_arrays['age_min'][up_rows], up_arrays['age_max'][up_rows], up_arrays['days'][up_rows]
+    )
+    candidates = index.iter_candidates(
+        mp_arrays['age_min'][mp_rows], mp_arrays['age_max'][mp_rows], mp_arrays['days'][mp_rows]
+    )
+
+    for mp_idx, up_idx in candidates:
+        mp_idx, up_idx = mp_rows[mp_idx], up_rows[up_idx]
+
+        # Race filter
+        race_ok = races_overlap_mask(mp_arrays['race_mask'][mp_idx], up_arrays['race_mask'][up_idx])
+        mp_idx, up_idx = mp_idx[race_ok], up_idx[race_ok]
+
+        if len(mp_idx) == 0:
+            continue
+
+        same = {}
+        for col in ('state', 'county', 'city'):
+            mp_code = mp_arrays[col][mp_idx]
+            same[col] = (mp_code == up_arrays[col][up_idx]) & (mp_code >= 0)
+
+        adjacent_county = False
+        if check_borders:
+            hops = lookup_hops(graph_arrays['pair_keys'], graph_arrays['pair_hops'], graph_arrays['n_nodes'][0],
+                               mp_arrays['county_node'][mp_idx], up_arrays['county_node'][up_idx])
+            adjacent_county = hops == 1
+        tier, tier_code = priority_tiers(same['state'], same['county'], same['city'],
+                                         is_adjacent_state, adjacent_county)
+        blocks.append({
+            'mp_row': mp_idx,
+            'up_row': up_idx,
+            'same_state': same['state'],
+            'same_county': same['county'],
+            'same_city': same['city'],
+            'priority_tier': tier,
+            'tier_code': tier_code,
+        })
+
+    if not blocks:
+        return None
+    return {k: np.concatenate([b[k] for b in blocks]) for k in blocks[0]}
+
+
+def pairs_frame(mp, up, block):
+    """Build the candidate pair DataFrame for pair_block output."""
+    mp_row, up_row = block['mp_row'], block['up_row']
+    return pd.DataFrame({
+        'mp_id': mp['id'].to_numpy()[mp_row],
+        'up_id': up['id'].to_numpy()[up_row],
+        'days_gap': up['found_days'].to_numpy()[up_row] - mp['last_seen_days'].to_numpy()[mp_row],
+        'same_state': block['same_state'],
+        'same_county': block['same_county'],
+        'same_city': block['same_city'],
+        'priority_tier': block['priority_tier'].astype(np.int64),
+        'tier_reason': np.array(TIER_REASONS, dtype=object)[block['tier_code']],
+    })
+
+
+def compact_pairs_frame(mp_codes, up_codes, mp_days, up_days, block):
+    """Build the compact (integer id) pair frame stored by pair_store."""
+    mp_row, up_row = block['mp_row'], block['up_row']
+    return pd.DataFrame({
+        'mp_id': mp_codes[mp_row],
+        'up_id': up_codes[up_row],
+        'days_gap': pd.array(up_days[up_row] - mp_days[mp_row], dtype='Int32'),
+        'same_state': block['same_state'],
+        'same_county': block['same_county'],
+        'same_city': block['same_city'],
+        'priority_tier': block['priority_tier'],
+        'tier_reason': pd.Categorical.from_codes(block['tier_code'], categories=TIER_REASONS),
+    })
+
+
 def process_state_pair(mp_group, up_group, is_adjacent_state=False):
     """Process matching between MP and UP groups, returning candidate pairs."""
     if len(mp_group) == 0 or len(up_group) == 0:
         return pd.DataFrame()
 
-    CHUNK_SIZE = 200
-    all_pairs = []
-
-    for chunk_start in range(0, len(mp_group), CHUNK_SIZE):
-        chunk_end = min(chunk_start + CHUNK_SIZE, len(mp_group))
-        mp_chunk = mp_group.iloc[chunk_start:chunk_end].copy()
+    graph = default_graph()
+    mp_arrays, up_arrays, _ = encode_cases(mp_group, up_group, county_graph=graph)
+    block = pair_block(
+        mp_arrays, up_arrays,
+        np.arange(len(mp_group)), np.arange(len(up_group)),
+        is_adjacent_state, graph.lookup_arrays() if graph is not None else None,
+    )
+    if block is None:
+        return pd.DataFrame()
+    return pairs_frame(mp_group, up_group, block)
 
-        if len(mp_chunk) == 0:
-            continue
 
-        # Cross join
-        mp_chunk['_merge_key'] = 1
-        up_temp = up_group.copy()
-        up_temp['_merge_key'] = 1
+def build_block_tasks(states, state_codes):
+    """
+    List every (sex rule, MP state, UP state) block in processing order.
 
-        pairs_chunk = mp_chunk[['id', 'sex', 'age_min', 'age_max', 'last_seen_days',
-                                'county', 'city', 'state', 'race', '_merge_key']].merge(
-            up_temp[['id', 'sex', 'age_min', 'age_max', 'found_days',
-                    'county', 'city', 'state', 'race', '_merge_key']],
-            on='_merge_key',
-            suffixes=('_mp', '_up')
-        )
+    Same-state blocks for a sex rule come first, then its adjacent-state
+    blocks, matching the original serial loop.
+    """
+    tasks = []
+    for mp_sex, up_sexes in SEX_MATCHING_RULES:
+        for state in states:
+            tasks.append((mp_sex, tuple(up_sexes), state_codes[state], state_codes[state], False))
+        for state in states:
+            for adj_state in get_adjacent_states(state):
+                if adj_state in state_codes:
+                    tasks.append((mp_sex, tuple(up_sexes), state_codes[state], state_codes[adj_state], True))
+    return tasks
+
+
+def _block_rows(arrays, sexes, state_code):
+    """Row positions for one state, grouped by sex in the given order."""
+    in_state = arrays['state_norm'] == state_code
+    return np.concatenate([
+        np.flatnonzero(in_state & (arrays['sex'] == SEX_CODES[sex])) for sex in sexes
+    ])
+
+
+def run_block_task(task):
+    """
+    Generate the pairs for one block task using the worker's encoded arrays.
 
-        if len(pairs_chunk) == 0:
-            continue
+    When the case arrays carry a 'changed' mask (incremental runs), only
+    pairs with a changed MP or a changed UP are generated.
+    """
+    mp_sex, up_sexes, mp_state, up_state, is_adjacent_state = task
+    mp_arrays, up_arrays = _BLOCK_ARRAYS['mp'], _BLOCK_ARRAYS['up']
+    mp_rows = _block_rows(mp_arrays, [mp_sex], mp_state)
+    up_rows = _block_rows(up_arrays, up_sexes, up_state)
+
+    if 'changed' in mp_arrays:
+        mp_changed = mp_arrays['changed'][mp_rows]
+        row_sets = [(mp_rows[mp_changed], up_rows),
+                    (mp_rows[~mp_changed], up_rows[up_arrays['changed'][up_rows]])]
+    else:
+        row_sets = [(mp_rows, up_rows)]
 
-        # Age filter
-        age_overlap = (
-            pairs_chunk['age_min_mp'].isna() |
-            pairs_chunk['age_max_up'].isna() |
-            pairs_chunk['age_min_up'].isna() |
-            pairs_chunk['age_max_mp'].isna() |
-            ((pairs_chunk['age_min_mp'] <= pairs_chunk['age_max_up']) &
-             (pairs_chunk['age_min_up'] <= pairs_chunk['age_max_mp']))
-        )
-        pairs_chunk = pairs_chunk[age_overlap]
-
-        if len(pairs_chunk) == 0:
+    blocks = []
+    for block_mp_rows, block_up_rows in row_sets:
+        if len(block_mp_rows) == 0 or len(block_up_rows) == 0:
             continue
+        block = pair_block(mp_arrays, up_arrays, block_mp_rows, block_up_rows, is_adjacent_state,
+                           _BLOCK_ARRAYS.get('graph'))
+        if block is not None:
+            blocks.append(block)
+
+    if not blocks:
+        return None
+    if len(blocks) == 1:
+        return blocks[0]
+    return {k: np.concatenate([b[k] for b in blocks]) for k in blocks[0]}
+
+
+def _run_block_task_to_shard(args):
+    """Worker entry point: run one block and write it to its own shard file."""
+    task_id, task, shard_dir = args
+    block = run_block_task(task)
+    if block is None:
+        return None
+
+    shard_path = os.path.join(shard_dir, f'block_{task_id:05d}.npz')
+    np.savez(shard_path, **block)
+    return shard_path
+
+
+def _share_arrays(arrays):
+    """Copy encoded arrays into shared memory; returns (segments, specs)."""
+    segments, specs = [], {}
+    for side, side_arrays in arrays.items():
+        for name, values in side_arrays.items():
+            segment = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf)[:] = values
+            segments.append(segment)
+            specs[(side, name)] = (segment.name, values.shape, values.dtype.str)
+    return segments, specs
+
+
+def _attach_shared_arrays(specs):
+    """Pool initializer: map the parent's shared arrays without copying."""
+    _BLOCK_ARRAYS.clear()
+    for (side, name), (segment_name, shape, dtype) in specs.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _SHARED_BLOCKS.append(segment)  # keep the mapping alive
+        _BLOCK_ARRAYS.setdefault(side, {})[name] = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+
+
+def generate_blocks(mp_arrays, up_arrays, tasks, workers=1, graph_arrays=None):
+    """
+    Run all block tasks serially or on a process pool.
 
-        # Temporal filter (found >= last seen - 7 days tolerance)
-        temporal_valid = (
-            pairs_chunk['found_days'].isna() |
-            pairs_chunk['last_seen_days'].isna() |
-            (pairs_chunk['found_days'] >= pairs_chunk['last_seen_days'] - 7)
-        )
-        pairs_chunk = pairs_chunk[temporal_valid]
+    Parallel workers read the encoded arrays (and county graph lookup
+    arrays) from shared memory and write one shard per block; shards are
+    merged in task order so the result is identical to the serial run.
+    """
+    arrays = {'mp': mp_arrays, 'up': up_arrays}
+    if graph_arrays is not None:
+        arrays['graph'] = graph_arrays
 
-        if len(pairs_chunk) == 0:
-            continue
+    if workers <= 1:
+        _BLOCK_ARRAYS.clear()
+        _BLOCK_ARRAYS.update(arrays)
+        return [run_block_task(task) for task in tqdm(tasks, desc="   Blocks")]
 
-        # Race filter
-        race_overlap_mask = pairs_chunk.apply(
-            lambda row: races_overlap(row['race_mp'], row['race_up']), axis=1
-        )
-        pairs_chunk = pairs_chunk[race_overlap_mask]
+    segments, specs = _share_arrays(arrays)
+    shard_dir = tempfile.mkdtemp(prefix='pair_shards_', dir=OUT_DIR)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_arrays,
+                                 initargs=(specs,)) as pool:
+            jobs = [(task_id, task, shard_dir) for task_id, task in enumerate(tasks)]
+            shard_paths = list(tqdm(pool.map(_run_block_task_to_shard, jobs),
+                                    total=len(jobs), desc=f"   Blocks ({workers} workers)"))
+
+        blocks = []
+        for path in shard_paths:
+            if path is None:
+                blocks.append(None)
+                continue
+            with np.load(path) as shard:
+                blocks.append({k: shard[k] for k in shard.files})
+        return blocks
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        for segment in segments:
+            segment.close()
+            segment.unlink()
 
-        if len(pairs_chunk) == 0:
-            continue
 
-        # Calculate metrics
-        pairs_chunk['days_gap'] = pairs_chunk['found_days'] - pairs_chunk['last_seen_days']
-
-        pairs_chunk['same_state'] = (
-            pairs_chunk['state_mp'].str.strip().str.upper() ==
-            pairs_chunk['state_up'].str.strip().str.upper()
-        )
-
-        pairs_chunk['same_county'] = (
-            (pairs_chunk['county_mp'].str.strip().str.upper() ==
-             pairs_chunk['county_up'].str.strip().str.upper()) &
-            (pairs_chunk['county_mp'].notna()) &
-            (pairs_chunk['county_mp'] != '')
-        )
-
-        pairs_chunk['same_city'] = (
-            (pairs_chunk['city_mp'].str.strip().str.upper() ==
-             pairs_chunk['city_up'].str.strip().str.upper()) &
-            (pairs_chunk['city_mp'].notna()) &
-            (pairs_chunk['city_mp'] != '')
-        )
-
-        # Mark adjacent state matches
-        pairs_chunk['adjacent_state'] = is_adjacent_state and not pairs_chunk['same_state'].any()
-
-        # Calculate priority tier
-        pairs_chunk[['priority_tier', 'tier_reason']] = pairs_chunk.apply(
-            lambda r: pd.Series(calculate_priority_tier(
-                r['same_state'], r['same_county'], r['same_city'], is_adjacent_state
-            )), axis=1
-        )
-
-        pairs_final = pairs_chunk[[
-            'id_mp', 'id_up', 'days_gap', 'same_state', 'same_county', 'same_city',
-            'priority_tier', 'tier_reason'
-        ]].rename(columns={'id_mp': 'mp_id', 'id_up': 'up_id'})
-
-        all_pairs.append(pairs_final)
+def generation_digest():
+    """Digest of the pair generation code, so stored pairs from older code are not patched."""
+    modules = [__name__, 'adjacent_states', 'blocking', 'case_encoding', 'county_graph', 'race_encoding']
+    return ':'.join(file_digest(sys.modules[name].__file__) for name in modules)
 
-    if all_pairs:
-        return pd.concat(all_pairs, ignore_index=True)
-    return pd.DataFrame()
 
+def plan_incremental(mp, up, build_meta):
+    """
+    Diff the masters against the last build's snapshot.
 
-def main():
+    Returns:
+        Dict with int32 case number arrays changed_mp / changed_up (added or
+        modified: pairs regenerated) and drop_mp / drop_up (changed or
+        removed: stored pairs dropped), plus the match counts to patch; or
+        None with the reason a full build is needed
+    """
+    snapshot = load_snapshot(OUT_DIR)
+    if snapshot is None:
+        return None, "no snapshot of a previous build"
+    old_mp, old_up, meta = snapshot
+    if meta.get('county_graph') != build_meta['county_graph']:
+        return None, "county adjacency edge list changed"
+    if meta.get('code') != build_meta['code']:
+        return None, "pair generation code changed"
+    counts = read_match_counts(OUT_DIR)
+    if not pairs_exist(OUT_DIR) or counts is None:
+        return None, "no stored pair set"
+
+    plan = {'counts': counts}
+    for side, old, df in (('mp', old_mp, mp), ('up', old_up, up)):
+        delta = diff_cases(old, case_fingerprints(df, side))
+        changed = np.union1d(delta['added'], delta['modified'])
+        plan[f'changed_{side}'] = changed
+        plan[f'drop_{side}'] = np.union1d(changed, delta['removed'])
+        plan[f'{side}_delta'] = {k: len(v) for k, v in delta.items()}
+
+    changed_share = (len(plan['drop_mp']) + len(plan['drop_up'])) / max(1, len(mp) + len(up))
+    if changed_share > INCREMENTAL_MAX_CHANGED:
+        return None, f"{changed_share:.0%} of cases changed"
+    return plan, None
+
+
+def main(workers=1, export_csv=False, incremental=False):
     print("=" * 60)
     print("IMPROVED Candidate Pair Generation v2")
     print("=" * 60)
 
     # Load exclusions
     print("\n1. Loading exclusions...")
-    excluded_ups = load_exclusions()
-    print(f"   Loaded {len(excluded_ups)} excluded UP cases")
+    exclusions = load_exclusions()
+    print(f"   Loaded {len(exclusions.up_ids)} excluded UP cases")
+    if len(exclusions.mp_ids):
+        print(f"   Loaded {len(exclusions.mp_ids)} excluded MP cases")
 
     # Load data
     print("\n2. Loading data...")
@@ -208,10 +456,13 @@ def main():
     up = pd.read_csv(os.path.join(DATA_DIR, 'UP_master.csv'))
 
     # Apply exclusions
-    original_up_count = len(up)
-    up = up[~up['id'].astype(str).isin(excluded_ups)]
+    original_mp_count, original_up_count = len(mp), len(up)
+    mp = mp[~exclusions.mask('mp', mp['id'])]
+    up = up[~exclusions.mask('up', up['id'])]
     print(f"   Loaded {len(mp):,} MPs and {len(up):,} UPs")
     print(f"   Excluded {original_up_count - len(up)} UP cases")
+    if len(mp) < original_mp_count:
+        print(f"   Excluded {original_mp_count - len(mp)} MP cases")
 
     # Convert dates
     mp['last_seen_days'] = pd.to_datetime(mp['last_seen_date'], errors='coerce').dt.date.map(
@@ -221,80 +472,92 @@ def main():
         lambda d: d.toordinal() if pd.notna(d) else None
     )
 
-    # Normalize states
-    mp['state_norm'] = mp['state'].apply(normalize_state)
-    up['state_norm'] = up['state'].apply(normalize_state)
-
-    # Group by sex
-    sex_groups = ['M', 'F', 'Unknown']
-    mp_by_sex = {sex: mp[mp['sex'] == sex].copy() for sex in sex_groups}
-    up_by_sex = {sex: up[up['sex'] == sex].copy() for sex in sex_groups}
+    # Encode the matching attributes once as flat arrays
+    graph = default_graph()
+    if graph is None:
+        print("   Warning: No county adjacency edge list found, bordering counties not detected")
+    mp_arrays, up_arrays, state_codes = encode_cases(mp, up, county_graph=graph)
+    mp_codes = encode_case_ids(mp['id'], 'MP')
+    up_codes = encode_case_ids(up['id'], 'UP')
+    build_meta = {'county_graph': file_digest(EDGE_LIST_PATH) if graph is not None else None,
+                  'code': generation_digest()}
+
+    plan = None
+    if incremental:
+        plan, reason = plan_incremental(mp, up, build_meta)
+        if plan is None:
+            print(f"   Incremental: full rebuild ({reason})")
+        else:
+            for side in ('mp', 'up'):
+                delta = plan[f'{side}_delta']
+                print(f"   Incremental {side.upper()}: {delta['added']:,} added, "
+                      f"{delta['modified']:,} modified, {delta['removed']:,} removed")
+            mp_arrays['changed'] = np.isin(mp_codes, plan['changed_mp'])
+            up_arrays['changed'] = np.isin(up_codes, plan['changed_up'])
 
     print(f"\n3. Processing matches...")
-    print(f"   MP by sex: M={len(mp_by_sex['M'])}, F={len(mp_by_sex['F'])}, Unknown={len(mp_by_sex['Unknown'])}")
-    print(f"   UP by sex: M={len(up_by_sex['M'])}, F={len(up_by_sex['F'])}, Unknown={len(up_by_sex['Unknown'])}")
-
-    sex_matching_rules = [
-        ('M', ['M', 'Unknown']),
-        ('F', ['F', 'Unknown']),
-        ('Unknown', ['M', 'F', 'Unknown'])
-    ]
-
-    all_pairs = []
+    mp_sex_counts = mp['sex'].value_counts()
+    up_sex_counts = up['sex'].value_counts()
+    print(f"   MP by sex: M={mp_sex_counts.get('M', 0)}, F={mp_sex_counts.get('F', 0)}, Unknown={mp_sex_counts.get('Unknown', 0)}")
+    print(f"   UP by sex: M={up_sex_counts.get('M', 0)}, F={up_sex_counts.get('F', 0)}, Unknown={up_sex_counts.get('Unknown', 0)}")
 
-    # Get all unique states
-    all_states = set(mp['state_norm'].dropna().unique()) | set(up['state_norm'].dropna().unique())
-    all_states = {s for s in all_states if s and len(s) == 2}
+    # Get all unique states (sorted so block order is deterministic)
+    all_states = sorted(s for s in state_codes if isinstance(s, str) and len(s) == 2)
 
     print(f"\n   Found {len(all_states)} states to process")
 
-    for mp_sex, up_sexes in sex_matching_rules:
-        mp_sex_group = mp_by_sex[mp_sex]
-        if len(mp_sex_group) == 0:
-            continue
-
-        up_matches = pd.concat([up_by_sex[s] for s in up_sexes if len(up_by_sex[s]) > 0], ignore_index=True)
-        if len(up_matches) == 0:
-            continue
+    tasks = build_block_tasks(all_states, state_codes)
+    print(f"   {len(tasks)} state blocks, {workers} worker(s)")
 
-        print(f"\n   Processing {mp_sex} MPs ({len(mp_sex_group):,} cases)...")
+    blocks = generate_blocks(mp_arrays, up_arrays, tasks, workers=workers,
+                             graph_arrays=graph.lookup_arrays() if graph is not None else None)
 
-        # Process same-state matches
-        for state in tqdm(all_states, desc=f"   {mp_sex} same-state"):
-            mp_state = mp_sex_group[mp_sex_group['state_norm'] == state]
-            up_state = up_matches[up_matches['state_norm'] == state]
+    # Compact frames tagged with the MP state used as the storage partition
+    mp_days = mp['last_seen_days'].to_numpy(dtype=float)
+    up_days = up['found_days'].to_numpy(dtype=float)
+    state_names = {code: state for state, code in state_codes.items()}
 
-            if len(mp_state) > 0 and len(up_state) > 0:
-                pairs = process_state_pair(mp_state, up_state, is_adjacent_state=False)
-                if len(pairs) > 0:
-                    all_pairs.append(pairs)
-
-        # Process adjacent-state matches
-        print(f"   Processing {mp_sex} cross-state matches...")
-        for state in tqdm(all_states, desc=f"   {mp_sex} cross-state"):
-            mp_state = mp_sex_group[mp_sex_group['state_norm'] == state]
-            if len(mp_state) == 0:
-                continue
-
-            adjacent = get_adjacent_states(state)
-            for adj_state in adjacent:
-                up_adj = up_matches[up_matches['state_norm'] == adj_state]
-                if len(up_adj) > 0:
-                    pairs = process_state_pair(mp_state, up_adj, is_adjacent_state=True)
-                    if len(pairs) > 0:
-                        all_pairs.append(pairs)
+    all_pairs = []
+    for task, block in zip(tasks, blocks):
+        if block is None:
+            continue
+        frame = compact_pairs_frame(mp_codes, up_codes, mp_days, up_days, block)
+        frame['state'] = state_names[task[2]]
+        all_pairs.append(frame)
 
     # Combine all
     print("\n4. Combining results...")
     if all_pairs:
         pairs_df = pd.concat(all_pairs, ignore_index=True)
+        pairs_df['state'] = pairs_df['state'].astype('category')
         # Remove duplicates (same MP-UP pair from different processing paths)
         pairs_df = pairs_df.drop_duplicates(subset=['mp_id', 'up_id'])
         print(f"   Generated {len(pairs_df):,} candidate matches")
+    elif plan is not None:
+        pairs_df = compact_pairs_frame(mp_codes, up_codes, mp_days, up_days, {
+            'mp_row': np.zeros(0, np.int64), 'up_row': np.zeros(0, np.int64),
+            'same_state': np.zeros(0, bool), 'same_county': np.zeros(0, bool), 'same_city': np.zeros(0, bool),
+            'priority_tier': np.zeros(0, np.int8), 'tier_code': np.zeros(0, np.int8),
+        })
+        pairs_df['state'] = pd.Categorical([])
+        print("   No pairs involve the changed cases")
     else:
         print("   ERROR: No candidate pairs generated!")
         return
 
+    if plan is not None:
+        # Patch the stored pair set, then reload it for the statistics and exports
+        invalidate_snapshot(OUT_DIR)
+        removed = patch_pairs(OUT_DIR, plan['drop_mp'], plan['drop_up'], pairs_df)
+        mp_counts, up_counts = plan['counts']
+        mp_counts, mp_affected = update_match_counts(mp_counts, removed['mp_id'], pairs_df['mp_id'])
+        up_counts, up_affected = update_match_counts(up_counts, removed['up_id'], pairs_df['up_id'])
+        print(f"   Patched pair set: -{len(removed):,} / +{len(pairs_df):,} pairs")
+        print(f"   Match counts changed for {len(mp_affected):,} MPs and {len(up_affected):,} UPs")
+        pairs_df = read_pairs(OUT_DIR, decode_ids=False)
+    else:
+        mp_counts, up_counts = count_matches(pairs_df['mp_id']), count_matches(pairs_df['up_id'])
+
     # Statistics by tier
     print("\n5. Priority tier breakdown:")
     tier_counts = pairs_df['priority_tier'].value_counts().sort_index()
@@ -303,26 +566,37 @@ def main():
     for tier, count in tier_counts.items():
         pct = 100 * count / len(pairs_df)
         print(f"   {tier_names.get(tier, f'Tier {tier}')}: {count:,} ({pct:.1f}%)")
+    border_pairs = (pairs_df['tier_reason'] == 'adjacent_county').sum()
+    print(f"   Bordering counties across state lines (in tier 1): {border_pairs:,}")
 
     # Save outputs
     print("\n6. Saving output files...")
 
-    # Full pairs file (all tiers)
-    pairs_path = os.path.join(OUT_DIR, 'candidate_pairs.csv')
-    pairs_df.to_csv(pairs_path, index=False)
-    print(f"   All pairs: {pairs_path}")
+    # Full pairs dataset (all tiers), partitioned by MP state
+    if plan is None:
+        dataset_path = write_pairs(pairs_df, OUT_DIR)
+        print(f"   All pairs: {dataset_path}/ (Parquet, partitioned by state)")
+    else:
+        print(f"   All pairs: {os.path.join(OUT_DIR, 'candidate_pairs')}/ (patched in place)")
+    write_match_counts(OUT_DIR, mp_counts, up_counts)
 
-    # High priority only (Tier 1-2)
     high_priority = pairs_df[pairs_df['priority_tier'] <= 2]
-    hp_path = os.path.join(OUT_DIR, 'candidate_pairs_high_priority.csv')
-    high_priority.to_csv(hp_path, index=False)
-    print(f"   High priority (Tier 1-2): {hp_path} ({len(high_priority):,} pairs)")
-
-    # Tier 1 only (best for manual review)
     tier1 = pairs_df[pairs_df['priority_tier'] == 1]
-    t1_path = os.path.join(OUT_DIR, 'candidate_pairs_tier1.csv')
-    tier1.to_csv(t1_path, index=False)
-    print(f"   Tier 1 only: {t1_path} ({len(tier1):,} pairs)")
+
+    if export_csv:
+        pairs_path = os.path.join(OUT_DIR, 'candidate_pairs.csv')
+        export_pairs_csv(pairs_df, pairs_path)
+        print(f"   All pairs (CSV): {pairs_path}")
+
+        # High priority only (Tier 1-2)
+        hp_path = os.path.join(OUT_DIR, 'candidate_pairs_high_priority.csv')
+        export_pairs_csv(high_priority, hp_path)
+        print(f"   High priority (Tier 1-2): {hp_path} ({len(high_priority):,} pairs)")
+
+        # Tier 1 only (best for manual review)
+        t1_path = os.path.join(OUT_DIR, 'candidate_pairs_tier1.csv')
+        export_pairs_csv(tier1, t1_path)
+        print(f"   Tier 1 only: {t1_path} ({len(tier1):,} pairs)")
 
     # Export case JSONs
     mp_cases = mp[[
@@ -348,6 +622,9 @@ def main():
         json.dump(up_cases, f, indent=2)
     print(f"   {up_json_path}")
 
+    # Snapshot of the cases this pair set was built from, for --incremental
+    write_snapshot(OUT_DIR, mp, up, build_meta)
+
     # Final statistics
     print("\n" + "=" * 60)
     print("Summary Statistics:")
@@ -361,8 +638,25 @@ def main():
     print(f"  Avg matches per UP: {len(pairs_df) / len(up):.1f}")
     print("=" * 60)
 
-    print("\nRecommendation: Start manual review with candidate_pairs_tier1.csv")
+    if export_csv:
+        print("\nRecommendation: Start manual review with candidate_pairs_tier1.csv")
+    else:
+        print("\nNext: python3 data-build/prioritize_matches.py (or rerun with --csv for CSV exports)")
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Generate prioritized candidate pairs')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for state blocks (default: 1, serial)')
+    parser.add_argument('--csv', action='store_true',
+                        help='Also export candidate_pairs*.csv files')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only regenerate pairs for cases changed since the last build')
+    parser.add_argument('--self-check', action='store_true',
+                        help='Only check the vectorized priority tiers against calculate_priority_tier')
+    args = parser.parse_args()
+    if args.self_check:
+        check_priority_tiers()
+        print("✓ priority_tiers() agrees with calculate_priority_tier() for all 32 flag combinations")
+    else:
+        main(workers=args.workers, export_csv=args.csv, incremental=args.incremental)
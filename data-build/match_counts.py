@@ -0,0 +1,353 @@
+"""
+Persistent match counts for the uniqueness boost and the <=15 filter.
+
+score_candidates.py has to count candidates per MP and per UP over the whole
+pair set before it can apply the uniqueness boost and the hard filter
+(ScoringEngine.count). Those counts are stored after every scoring run, so
+a later change to the pair set - e.g. a UP excluded in review_matches.py -
+can be applied as a delta: only the counts of cases touched by added or
+removed pairs change, and the boost and filter are recomputed for the pairs
+of those cases (their neighborhood) alone.
+
+    counts = MatchCounts.load(OUT_DIR)
+    update = counts.apply(removed_pairs, added_pairs)
+    neighborhood = counts.rescore(update, pairs_after)
+    print(threshold_flips(neighborhood))
+    counts.save(OUT_DIR)
+
+Counts cover the pairs the scorer counts: both cases in the masters and the
+UP not a definite infant. Other cases are stored as not counted and their
+pairs are ignored.
+
+    out/match_counts/scored_mp.parquet, out/match_counts/scored_up.parquet
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from adjacent_states import get_adjacent_states
+from pair_store import read_case_pairs, read_match_counts, write_match_counts
+from scoring_engine import MAX_MATCHES, vec_uniqueness_boost
+from state_normalizer import normalize_state
+
+COUNTS_PREFIX = 'scored_'
+
+# Count of a case the scorer ignores (unknown case or infant UP)
+NOT_COUNTED = -1
+
+
+@dataclass
+class CountUpdate:
+    """Counts before a MatchCounts.apply() call and the pair delta it applied."""
+    mp_before: np.ndarray
+    up_before: np.ndarray
+    mp_ids: np.ndarray  # case numbers whose count changed
+    up_ids: np.ndarray
+    mp_near: np.ndarray  # ... and that are within max_matches before or after
+    up_near: np.ndarray
+    removed: pd.DataFrame
+    added: pd.DataFrame
+
+
+def _pair_keys(mp_codes, up_codes):
+    return (np.asarray(mp_codes, dtype=np.int64) << 32) | np.asarray(up_codes, dtype=np.int64)
+
+
+def _empty_pairs():
+    return pd.DataFrame({'mp_id': np.zeros(0, np.int32), 'up_id': np.zeros(0, np.int32)})
+
+
+class MatchCounts:
+    """
+    Match counts per MP and UP as arrays indexed by case number.
+
+    Args:
+        mp_counts / up_counts: Counts by case number, NOT_COUNTED for cases
+            the scorer ignores
+        max_matches: Hard filter threshold
+    """
+
+    def __init__(self, mp_counts, up_counts, max_matches=MAX_MATCHES):
+        self.mp_counts = np.asarray(mp_counts, dtype=np.int64)
+        self.up_counts = np.asarray(up_counts, dtype=np.int64)
+        self.max_matches = max_matches
+
+    @classmethod
+    def from_engine(cls, engine):
+        """Counts of a ScoringEngine after its counting pass."""
+        if engine.mp_counts is None:
+            raise RuntimeError("Run count() over all pairs before taking its counts")
+        return cls(
+            np.where(engine.mp_known, engine.mp_counts, NOT_COUNTED),
+            np.where(engine.up_known & ~engine.up_infant, engine.up_counts, NOT_COUNTED),
+            max_matches=engine.max_matches,
+        )
+
+    def save(self, out_dir):
+        """Store the counts of every counted case (zero counts included)."""
+        series = []
+        for counts in (self.mp_counts, self.up_counts):
+            ids = np.flatnonzero(counts != NOT_COUNTED)
+            series.append(pd.Series(counts[ids], index=ids.astype(np.int32)))
+        write_match_counts(out_dir, *series, prefix=COUNTS_PREFIX, keep_zero=True)
+
+    @classmethod
+    def load(cls, out_dir, max_matches=MAX_MATCHES):
+        """Counts stored by the last scoring run, or None if there are none."""
+        stored = read_match_counts(out_dir, prefix=COUNTS_PREFIX)
+        if stored is None:
+            return None
+        arrays = []
+        for counts in stored:
+            array = np.full(int(counts.index.to_numpy().max(initial=0)) + 1, NOT_COUNTED, dtype=np.int64)
+            array[counts.index.to_numpy()] = counts.to_numpy()
+            arrays.append(array)
+        return cls(*arrays, max_matches=max_matches)
+
+    @staticmethod
+    def _lookup(counts, codes):
+        codes = np.asarray(codes, dtype=np.int64)
+        in_range = codes < len(counts)
+        return np.where(in_range, counts[np.where(in_range, codes, 0)], NOT_COUNTED)
+
+    def lookup(self, mp_codes, up_codes):
+        """(mp counts, up counts) for pairs of integer case numbers."""
+        return self._lookup(self.mp_counts, mp_codes), self._lookup(self.up_counts, up_codes)
+
+    def eligible(self, mp_codes, up_codes):
+        """Pairs that pass the hard filter: both sides counted and <= max_matches."""
+        mp_count, up_count = self.lookup(mp_codes, up_codes)
+        return ((mp_count != NOT_COUNTED) & (up_count != NOT_COUNTED) &
+                (mp_count <= self.max_matches) & (up_count <= self.max_matches))
+
+    def apply(self, removed=None, added=None):
+        """
+        Update the counts for pairs removed from and added to the pair set.
+
+        Pairs involving cases that are not counted are ignored, like in the
+        scorer's counting pass.
+
+        Args:
+            removed / added: DataFrames with integer mp_id/up_id
+
+        Returns:
+            CountUpdate
+        """
+        removed = _empty_pairs() if removed is None else removed[['mp_id', 'up_id']]
+        added = _empty_pairs() if added is None else added[['mp_id', 'up_id']]
+        counted = []
+        for pairs in (removed, added):
+            mp_count, up_count = self.lookup(pairs['mp_id'], pairs['up_id'])
+            counted.append((mp_count != NOT_COUNTED) & (up_count != NOT_COUNTED))
+
+        deltas = {}
+        for side, counts in (('mp', self.mp_counts), ('up', self.up_counts)):
+            delta = np.zeros(len(counts), dtype=np.int64)
+            for pairs, mask, sign in ((removed, counted[0], -1), (added, counted[1], 1)):
+                codes = pairs[f'{side}_id'].to_numpy(dtype=np.int64)[mask]
+                delta += sign * np.bincount(codes, minlength=len(counts))
+            deltas[side] = delta
+            if (counts[delta != 0] + delta[delta != 0] < 0).any():
+                raise ValueError("Removed pairs that were never counted; counts are out of date")
+
+        mp_before, up_before = self.mp_counts.copy(), self.up_counts.copy()
+        self.mp_counts += deltas['mp']
+        self.up_counts += deltas['up']
+
+        # Pairs of a case above the threshold before and after are filtered
+        # out either way, so only these cases' pairs can flip or change boost
+        changed, near = {}, {}
+        for side, before, after in (('mp', mp_before, self.mp_counts), ('up', up_before, self.up_counts)):
+            changed[side] = np.flatnonzero(deltas[side]).astype(np.int32)
+            within = (before[changed[side]] <= self.max_matches) | (after[changed[side]] <= self.max_matches)
+            near[side] = changed[side][within]
+        return CountUpdate(mp_before, up_before, changed['mp'], changed['up'],
+                           near['mp'], near['up'], removed, added)
+
+    def forget(self, mp_ids=(), up_ids=()):
+        """
+        Stop counting cases that left the pair set (e.g. excluded UPs), so
+        later deltas ignore their pairs like the scorer would. Their pairs
+        must already have been removed with apply().
+        """
+        for counts, ids in ((self.mp_counts, mp_ids), (self.up_counts, up_ids)):
+            ids = np.asarray(ids, dtype=np.int64)
+            ids = ids[ids < len(counts)]
+            if (counts[ids] > 0).any():
+                raise ValueError("Cases still have counted pairs; apply() their removal first")
+            counts[ids] = NOT_COUNTED
+
+    def rescore(self, update, pairs_after):
+        """
+        Recompute counts, hard filter and uniqueness boost for the pairs
+        whose boost or eligibility can have changed with an update: the
+        removed and added pairs and the pairs of changed cases that are
+        within max_matches before or after.
+
+        Args:
+            update: CountUpdate from apply()
+            pairs_after: Current pairs (integer ids) touching update.mp_near
+                or update.up_near, e.g. from neighborhood_pairs()
+
+        Returns:
+            DataFrame with one row per affected pair: mp_id, up_id,
+            mp/up_match_count_before/after, eligible_before/after and
+            uniqueness_boost_before/after (NaN when not eligible)
+        """
+        pairs_after = pd.concat([pairs_after[['mp_id', 'up_id']], update.added], ignore_index=True)
+        touching = (np.isin(pairs_after['mp_id'], update.mp_near) |
+                    np.isin(pairs_after['up_id'], update.up_near))
+        pairs = pd.concat([pairs_after[touching], update.added, update.removed], ignore_index=True)
+        pairs = pairs.drop_duplicates(ignore_index=True)
+        keys = _pair_keys(pairs['mp_id'], pairs['up_id'])
+
+        exists_after = np.isin(keys, _pair_keys(pairs_after['mp_id'], pairs_after['up_id']))
+        exists_before = (
+            (exists_after & ~np.isin(keys, _pair_keys(update.added['mp_id'], update.added['up_id']))) |
+            np.isin(keys, _pair_keys(update.removed['mp_id'], update.removed['up_id']))
+        )
+
+        mp_codes, up_codes = pairs['mp_id'].to_numpy(), pairs['up_id'].to_numpy()
+        before = MatchCounts(update.mp_before, update.up_before, self.max_matches)
+        for label, counts, exists in (('before', before, exists_before), ('after', self, exists_after)):
+            mp_count, up_count = counts.lookup(mp_codes, up_codes)
+            eligible = exists & counts.eligible(mp_codes, up_codes)
+            pairs[f'mp_match_count_{label}'] = mp_count
+            pairs[f'up_match_count_{label}'] = up_count
+            pairs[f'eligible_{label}'] = eligible
+            pairs[f'uniqueness_boost_{label}'] = np.where(
+                eligible, vec_uniqueness_boost(mp_count, up_count), np.nan
+            )
+        return pairs
+
+
+def threshold_flips(neighborhood):
+    """
+    Pairs of a MatchCounts.rescore() neighborhood that crossed the hard filter.
+
+    Returns:
+        Dict with 'entered' (now scored), 'left' (no longer scored) and
+        'boost_changed' (scored before and after, different boost)
+    """
+    before, after = neighborhood['eligible_before'], neighborhood['eligible_after']
+    still = before & after
+    boost_changed = still & (neighborhood['uniqueness_boost_before'] != neighborhood['uniqueness_boost_after'])
+    return {
+        'entered': int((after & ~before).sum()),
+        'left': int((before & ~after).sum()),
+        'boost_changed': int(boost_changed.sum()),
+    }
+
+
+def case_partitions(mp, up, mp_ids=(), up_ids=()):
+    """
+    Pair partitions (MP states) that can hold pairs of the given cases.
+
+    Args:
+        mp / up: Master DataFrames with 'id' and 'state'
+        mp_ids / up_ids: NamUs ids ('MP...'/'UP...')
+    """
+    states = set(mp.loc[mp['id'].isin(list(mp_ids)), 'state'].map(normalize_state))
+    for state in up.loc[up['id'].isin(list(up_ids)), 'state'].map(normalize_state):
+        states.add(state)
+        states.update(get_adjacent_states(state))
+    return states
+
+
+def neighborhood_pairs(out_dir, update, states=None):
+    """
+    Stored pairs rescore() needs: those touching changed cases within the
+    threshold. Nothing is read when no such case exists.
+    """
+    if len(update.mp_near) == 0 and len(update.up_near) == 0:
+        return _empty_pairs()
+    return read_case_pairs(out_dir, update.mp_near, update.up_near, states=states)
+
+
+def main():
+    """Check delta updates against a full recount of the stored pairs and benchmark both."""
+    import os
+    import time
+
+    from pair_store import read_pairs
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out_dir = os.environ.get('OUT_DIR', os.path.join(root, 'out'))
+    data_dir = os.path.join(root, 'data', 'clean')
+    mp = pd.read_csv(os.path.join(data_dir, 'MP_master.csv'), usecols=['id', 'state'])
+    up = pd.read_csv(os.path.join(data_dir, 'UP_master.csv'), usecols=['id', 'state'])
+
+    def recount(template):
+        """Full counting pass over every stored pair."""
+        pairs = read_pairs(out_dir, columns=['mp_id', 'up_id'], decode_ids=False)
+        mp_count, up_count = template.lookup(pairs['mp_id'], pairs['up_id'])
+        pairs = pairs[(mp_count != NOT_COUNTED) & (up_count != NOT_COUNTED)]
+        counts = []
+        for side, base in (('mp', template.mp_counts), ('up', template.up_counts)):
+            full = np.bincount(pairs[f'{side}_id'].to_numpy(dtype=np.int64), minlength=len(base))
+            counts.append(np.where(base == NOT_COUNTED, NOT_COUNTED, full[:len(base)]))
+        return MatchCounts(*counts, max_matches=template.max_matches), pairs
+
+    # Every case in the masters counted, so the check runs without a scoring pass
+    mp_codes = mp['id'].str[2:].astype(np.int64).to_numpy()
+    up_codes = up['id'].str[2:].astype(np.int64).to_numpy()
+    mp_all = np.full(mp_codes.max() + 1, NOT_COUNTED, np.int64)
+    up_all = np.full(up_codes.max() + 1, NOT_COUNTED, np.int64)
+    mp_all[mp_codes] = 0
+    up_all[up_codes] = 0
+
+    # The real threshold rarely flips on this data, so also check a loose one
+    for max_matches in (MAX_MATCHES, 300):
+        counts, pairs = recount(MatchCounts(mp_all, up_all, max_matches))
+
+        # Exclude 20 UPs with few candidates, as review_matches.py would
+        rng = np.random.default_rng(0)
+        low = np.flatnonzero((counts.up_counts > 0) & (counts.up_counts <= 40))
+        excluded = rng.choice(low, size=min(20, len(low)), replace=False)
+        removed = pairs[np.isin(pairs['up_id'], excluded)]
+        excluded_ids = [f'UP{code}' for code in excluded]
+
+        start = time.perf_counter()
+        update = counts.apply(removed=removed)
+        mp_ids = [f'MP{code}' for code in update.mp_near]
+        touching = neighborhood_pairs(out_dir, update, case_partitions(mp, up, mp_ids, excluded_ids))
+        neighborhood = counts.rescore(update, touching[~np.isin(touching['up_id'], excluded)])
+        flips = threshold_flips(neighborhood)
+        delta_time = time.perf_counter() - start
+
+        # Reference: recount everything without the excluded UPs
+        start = time.perf_counter()
+        up_without = up_all.copy()
+        up_without[excluded] = NOT_COUNTED
+        expected, remaining = recount(MatchCounts(mp_all, up_without, max_matches))
+        full_time = time.perf_counter() - start
+        expected.up_counts[excluded] = 0
+
+        before = MatchCounts(update.mp_before, update.up_before, max_matches)
+        kept_before = before.eligible(remaining['mp_id'], remaining['up_id'])
+        kept_after = expected.eligible(remaining['mp_id'], remaining['up_id'])
+        expected_flips = {
+            'entered': int((kept_after & ~kept_before).sum()),
+            'left': int((kept_before & ~kept_after).sum() +
+                        before.eligible(removed['mp_id'], removed['up_id']).sum()),
+        }
+
+        print(f"<={max_matches}: {len(pairs):,} pairs, {len(removed):,} removed with {len(excluded)} UPs")
+        print(f"  Delta update + neighborhood: {delta_time:.2f}s ({len(neighborhood):,} pairs), "
+              f"full recount: {full_time:.2f}s")
+        print(f"  Counts changed: {len(update.mp_ids):,} MPs, {len(update.up_ids):,} UPs "
+              f"({len(update.mp_near):,} / {len(update.up_near):,} within the threshold); "
+              f"{flips['entered']:,} pairs entered the filter, {flips['left']:,} left, "
+              f"{flips['boost_changed']:,} changed boost")
+        if (not np.array_equal(counts.mp_counts, expected.mp_counts) or
+                not np.array_equal(counts.up_counts, expected.up_counts) or
+                any(flips[k] != v for k, v in expected_flips.items())):
+            print("FAILED: delta update differs from a full recount")
+            raise SystemExit(1)
+    print("✓ Delta updates match a full recount")
+
+
+if __name__ == '__main__':
+    main()
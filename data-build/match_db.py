@@ -0,0 +1,162 @@
+"""
+DataFrame queries against the SQLite database built by export_sqlite.py.
+
+    from match_db import MatchDB
+
+    db = MatchDB()
+    db.pairs(state='OH', tier=1, max_mp_count=5, max_up_count=5)
+    db.candidates('UP12056')
+    db.case('MP9141')
+    db.query("SELECT state, COUNT(*) AS n FROM up_cases GROUP BY state")
+
+Connections are read-only, and every filter maps to an indexed column, so
+these return in milliseconds without loading any CSV.
+"""
+
+import os
+import sqlite3
+
+import pandas as pd
+
+from export_sqlite import DB_PATH
+
+# Tables export_sqlite.py skips when their CSV is missing -> script that writes it
+OPTIONAL_TABLES = {
+    'scored_matches': 'score_candidates.py',
+    'prioritized_pairs': 'prioritize_matches.py',
+}
+
+
+class MatchDB:
+    """
+    Read-only access to out/maria.db.
+
+    Args:
+        path: Database path (default: DB_PATH)
+
+    Raises:
+        FileNotFoundError: If the database has not been exported yet
+
+    Queries of a match table that was not exported (its CSV did not exist)
+    raise FileNotFoundError naming the script to run.
+    """
+
+    def __init__(self, path=DB_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found. Run data-build/export_sqlite.py first.")
+        self.path = path
+        self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def query(self, sql, params=()):
+        """Run a SELECT and return the rows as a DataFrame."""
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def tables(self):
+        """Names of the exported tables."""
+        rows = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        return [row[0] for row in rows]
+
+    def _select(self, table, filters, order_by, limit):
+        """SELECT * with 'column op ?' filters whose value is not None."""
+        if table in OPTIONAL_TABLES and table not in self.tables():
+            raise FileNotFoundError(
+                f"{self.path} has no {table} table. Run data-build/{OPTIONAL_TABLES[table]}, "
+                f"then data-build/export_sqlite.py.")
+        clauses, params = [], []
+        for clause, value in filters:
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = f"SELECT * FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self.query(sql, params)
+
+    def pairs(self, state=None, tier=None, max_mp_count=None, max_up_count=None, min_score=None, limit=None):
+        """
+        Prioritized candidate pairs, best first.
+
+        Args:
+            state: State of the MP
+            tier: priority_tier
+            max_mp_count: Highest mp_match_count to include
+            max_up_count: Highest up_match_count to include
+            min_score: Lowest priority_score to include
+            limit: Maximum rows
+        """
+        return self._select('prioritized_pairs', [
+            ('state = ?', state),
+            ('priority_tier = ?', tier),
+            ('mp_match_count <= ?', max_mp_count),
+            ('up_match_count <= ?', max_up_count),
+            ('priority_score >= ?', min_score),
+        ], 'priority_score DESC', limit)
+
+    def scored_matches(self, state=None, max_mp_count=None, max_up_count=None, min_score=None, limit=None):
+        """
+        Scored matches, best first.
+
+        Args:
+            state: State of the MP
+            max_mp_count: Highest mp_match_count to include
+            max_up_count: Highest up_match_count to include
+            min_score: Lowest final_score to include
+            limit: Maximum rows
+        """
+        return self._select('scored_matches', [
+            ('state_mp = ?', state),
+            ('mp_match_count <= ?', max_mp_count),
+            ('up_match_count <= ?', max_up_count),
+            ('final_score >= ?', min_score),
+        ], 'final_score DESC', limit)
+
+    def candidates(self, case_id, limit=None):
+        """Prioritized pairs of one MP or UP, best first."""
+        column = 'mp_id' if case_id.startswith('MP') else 'up_id'
+        return self._select('prioritized_pairs', [(f'{column} = ?', case_id)], 'priority_score DESC', limit)
+
+    def case(self, case_id):
+        """Master row of one case (empty if unknown)."""
+        table = 'mp_cases' if case_id.startswith('MP') else 'up_cases'
+        return self.query(f"SELECT * FROM {table} WHERE id = ?", (case_id,))
+
+    def reviews(self, action=None):
+        """Logged review actions, optionally of one kind ('viable', 'ruled_out', 'excluded')."""
+        return self._select('reviews', [('action = ?', action)], 'rowid', None)
+
+
+def main():
+    """Time a few typical questions against the exported database."""
+    import time
+
+    with MatchDB() as db:
+        print(f"{db.path}: {', '.join(db.tables())}")
+        questions = [
+            ("Tier-1 pairs in OH, both counts <= 5",
+             lambda: db.pairs(state='OH', tier=1, max_mp_count=5, max_up_count=5)),
+            ("Top 100 pairs", lambda: db.pairs(limit=100)),
+            ("Candidates of one UP", lambda: db.candidates(db.query("SELECT id FROM up_cases LIMIT 1")['id'][0])),
+            ("Scored matches, both counts <= 5", lambda: db.scored_matches(max_mp_count=5, max_up_count=5)),
+            ("Viable reviews", lambda: db.reviews('viable')),
+        ]
+        for label, run in questions:
+            start = time.perf_counter()
+            rows = len(run())
+            print(f"  {label}: {rows:,} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
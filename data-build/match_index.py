@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Pre-sorted, memory-mapped indexes over the prioritized candidate pairs.
+
+Built once from candidate_pairs_prioritized.csv into plain .npy arrays so a
+server can answer "candidates of this case" or "top pairs in this state"
+by binary search over memory-mapped files, reading only the pages of the
+rows it returns:
+
+    out/match_index/
+        meta.json            source signature, state codes, row count
+        mp_id.npy ...        pair columns, sorted by (mp_id, priority_score desc)
+        up_order.npy         row order by (up_id, priority_score desc)
+        up_sorted.npy        up_id in up_order, for searchsorted
+        state_order.npy      row order by (MP state, priority_score desc)
+        state_offsets.npy    start of each state's run in state_order
+
+Pair columns are stored compactly: int32 case numbers, float32 scores,
+int8 tiers and state codes. A missing days_gap is stored as
+DAYS_GAP_MISSING and served as None.
+
+Usage:
+    python3 data-build/match_index.py          # build (or rebuild) the index
+"""
+
+import os
+import json
+import time
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
+from tqdm import tqdm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, 'data', 'clean')
+OUT_DIR = os.environ.get('OUT_DIR', os.path.join(ROOT, 'out'))
+INDEX_DIR = 'match_index'
+SOURCE_FILE = 'candidate_pairs_prioritized.csv'
+
+# Bump when the index layout changes
+INDEX_VERSION = 1
+
+# Pair columns kept in the index and their on-disk dtypes
+COLUMNS = {
+    'mp_id': np.int32,
+    'up_id': np.int32,
+    'priority_score': np.float32,
+    'priority_tier': np.int8,
+    'mp_match_count': np.int32,
+    'up_match_count': np.int32,
+    'days_gap': np.int32,
+}
+ID_COLUMNS = {'mp_id': 'MP', 'up_id': 'UP'}
+
+# Stored for a missing (null) days_gap; records() returns None for it
+DAYS_GAP_MISSING = np.iinfo(np.int32).min
+NULL_VALUES = {'days_gap': DAYS_GAP_MISSING}
+
+
+def index_path(out_dir=OUT_DIR):
+    return os.path.join(out_dir, INDEX_DIR)
+
+
+def source_signature(path):
+    """Cheap identity of the source CSV (size and mtime), used for staleness and ETags."""
+    stat = os.stat(path)
+    return hashlib.sha256(f'{INDEX_VERSION}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+
+
+def read_prioritized(path):
+    """
+    Stream the prioritized CSV into compact numpy columns.
+
+    'MP...'/'UP...' ids are converted to int32 batch by batch, so memory
+    stays at the size of the compact columns.
+    """
+    reader = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=64 << 20),
+                            convert_options=pacsv.ConvertOptions(include_columns=list(COLUMNS)))
+    chunks = {col: [] for col in COLUMNS}
+    with tqdm(desc="   Reading pairs", unit=' rows', unit_scale=True) as progress:
+        for batch in reader:
+            for col, dtype in COLUMNS.items():
+                values = batch.column(col)
+                if col in ID_COLUMNS:
+                    values = pc.cast(pc.utf8_slice_codeunits(values, len(ID_COLUMNS[col])), pa.int32())
+                if col in NULL_VALUES:
+                    values = pc.fill_null(values, NULL_VALUES[col])
+                chunks[col].append(values.to_numpy(zero_copy_only=False).astype(dtype, copy=False))
+            progress.update(batch.num_rows)
+    return {col: np.concatenate(parts) if parts else np.empty(0, COLUMNS[col]) for col, parts in chunks.items()}
+
+
+def mp_state_codes(mp_ids, data_dir=DATA_DIR):
+    """
+    State code of each pair's MP.
+
+    Returns:
+        (int8 codes, list of state names; code i is states[i], -1 unknown)
+    """
+    mp = pd.read_csv(os.path.join(data_dir, 'MP_master.csv'), usecols=['id', 'state']).drop_duplicates('id')
+    mp = mp[mp['id'].str.fullmatch(r'MP\d+')]
+    states = sorted(mp['state'].dropna().unique())
+    lookup = np.full(int(mp['id'].str[2:].astype(np.int64).max()) + 1, -1, dtype=np.int8)
+    lookup[mp['id'].str[2:].astype(np.int64).to_numpy()] = (
+        pd.Categorical(mp['state'], categories=states).codes.astype(np.int8))
+    in_range = mp_ids < len(lookup)
+    codes = np.full(len(mp_ids), -1, dtype=np.int8)
+    codes[in_range] = lookup[mp_ids[in_range]]
+    return codes, states
+
+
+def build_match_index(out_dir=OUT_DIR, data_dir=DATA_DIR):
+    """
+    Build the index from the prioritized pairs CSV.
+
+    Raises:
+        FileNotFoundError: If prioritize_matches.py has not been run
+    """
+    source = os.path.join(out_dir, SOURCE_FILE)
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"{source} not found. Run prioritize_matches.py first.")
+    signature = source_signature(source)
+
+    columns = read_prioritized(source)
+    columns['state'], states = mp_state_codes(columns['mp_id'], data_dir)
+    neg_score = -columns['priority_score']
+
+    print("   Sorting...")
+    order = np.lexsort((neg_score, columns['mp_id']))
+    columns = {col: values[order] for col, values in columns.items()}
+    neg_score = neg_score[order]
+    up_order = np.lexsort((neg_score, columns['up_id'])).astype(np.int32)
+    state_order = np.lexsort((neg_score, columns['state'])).astype(np.int32)
+    state_offsets = np.searchsorted(columns['state'][state_order], np.arange(-1, len(states) + 1))
+
+    path = index_path(out_dir)
+    tmp_path = path + '.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    arrays = dict(columns, up_order=up_order, up_sorted=columns['up_id'][up_order],
+                  state_order=state_order, state_offsets=state_offsets.astype(np.int64))
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), values)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'source_signature': signature, 'rows': len(order),
+                   'states': states}, f, indent=2)
+
+    # Swap the finished index in
+    if os.path.exists(path):
+        old_path = path + '.old'
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        for name in os.listdir(old_path):
+            os.remove(os.path.join(old_path, name))
+        os.rmdir(old_path)
+    else:
+        os.replace(tmp_path, path)
+    return len(order)
+
+
+class MatchIndex:
+    """
+    Read-only view of a built index; arrays are memory-mapped.
+
+    Row selections return (rows, total): rows are positions in the
+    mp-sorted pair columns for one page, total the size of the full result.
+
+    Args:
+        out_dir: Directory holding match_index/
+
+    Raises:
+        FileNotFoundError: If the index has not been built
+    """
+
+    def __init__(self, out_dir=OUT_DIR):
+        path = index_path(out_dir)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"{path} not found. Run data-build/match_index.py first.")
+        with open(meta_path, encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.states = self.meta['states']
+        self.version = self.meta['source_signature']
+
+        def load(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+        self.columns = {col: load(col) for col in list(COLUMNS) + ['state']}
+        self.up_order = load('up_order')
+        self.up_sorted = load('up_sorted')
+        self.state_order = load('state_order')
+        self.state_offsets = np.asarray(load('state_offsets'))
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def is_stale(self, out_dir=OUT_DIR):
+        """True if the prioritized CSV changed since the index was built."""
+        source = os.path.join(out_dir, SOURCE_FILE)
+        return self.meta.get('version') != INDEX_VERSION or (
+            os.path.exists(source) and source_signature(source) != self.version)
+
+    def mp_rows(self, mp_number, offset=0, limit=50):
+        """Pairs of one MP, best first."""
+        start, end = np.searchsorted(self.columns['mp_id'], [mp_number, mp_number + 1])
+        return np.arange(start + offset, min(start + offset + limit, end)), int(end - start)
+
+    def up_rows(self, up_number, offset=0, limit=50):
+        """Pairs of one UP, best first."""
+        start, end = np.searchsorted(self.up_sorted, [up_number, up_number + 1])
+        return np.asarray(self.up_order[start + offset:min(start + offset + limit, end)]), int(end - start)
+
+    def state_range(self, state):
+        """(start, end) of a state's run in state_order, or None for an unknown state."""
+        if state not in self.states:
+            return None
+        code = self.states.index(state) + 1  # offsets start at code -1
+        return int(self.state_offsets[code]), int(self.state_offsets[code + 1])
+
+    def state_rows(self, state, offset=0, limit=50, k=None, min_score=None):
+        """
+        Pairs whose MP is in a state, best first.
+
+        Args:
+            k: Only the state's top k pairs
+            min_score: Only pairs with priority_score >= min_score
+        """
+        bounds = self.state_range(state)
+        if bounds is None:
+            return np.empty(0, dtype=np.int64), 0
+        start, end = bounds
+        if min_score is not None:
+            # Scores descend within the run, so the cut-off is one binary search
+            scores = self.columns['priority_score'][self.state_order[start:end]]
+            end = start + int(np.searchsorted(-scores, -np.float32(min_score), side='right'))
+        if k is not None:
+            end = min(end, start + k)
+        return np.asarray(self.state_order[start + offset:min(start + offset + limit, end)]), end - start
+
+    def records(self, rows):
+        """Pair dicts for row positions, with 'MP...'/'UP...' ids."""
+        rows = np.asarray(rows, dtype=np.int64)
+        values = {col: np.asarray(array[rows]).tolist() for col, array in self.columns.items()}
+        records = []
+        for i in range(len(rows)):
+            record = {col: values[col][i] for col in COLUMNS}
+            record['mp_id'] = f"MP{record['mp_id']}"
+            record['up_id'] = f"UP{record['up_id']}"
+            record['priority_score'] = round(record['priority_score'], 6)
+            if record['days_gap'] == DAYS_GAP_MISSING:
+                record['days_gap'] = None
+            code = values['state'][i]
+            record['state'] = self.states[code] if code >= 0 else None
+            records.append(record)
+        return records
+
+
+def main():
+    print("=" * 60)
+    print("Match Index")
+    print("=" * 60)
+    start = time.perf_counter()
+    print(f"\n1. Building {index_path()}...")
+    rows = build_match_index()
+    print(f"\n✓ Indexed {rows:,} pairs in {time.perf_counter() - start:.1f}s")
+
+    index = MatchIndex()
+    mp_number = int(index.columns['mp_id'][len(index) // 2])
+    start = time.perf_counter()
+    rows, total = index.mp_rows(mp_number, limit=20)
+    index.records(rows)
+    print(f"  MP{mp_number}: {total} candidates, first page in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
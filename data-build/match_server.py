@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Local HTTP API over the match index (standard library only).
+
+    GET /mp/{id}/candidates?offset=&limit=         pairs of one MP, best first
+    GET /up/{id}/candidates?offset=&limit=         pairs of one UP, best first
+    GET /state/{code}/top?k=&offset=&limit=        top k pairs whose MP is in a state
+    GET /graph?state=&min_score=&offset=&limit=    nodes + edges of a state's pairs with
+                                                   priority_score >= min_score (ragnet.json format)
+
+Lists are paginated ({"items" | "nodes"/"edges", "total", "offset",
+"limit", "next"}); limit defaults to 50 and is capped at MAX_LIMIT. Every
+response carries an ETag derived from the index version and the request,
+and a matching If-None-Match is answered with 304. Pairs come from the
+memory-mapped, pre-sorted arrays of match_index.py (built on start if
+missing or stale); case details for graph nodes come from the shared
+CaseStore. CORS is open so index.html can be served from anywhere.
+
+Usage:
+    python3 data-build/match_server.py [--port 8765]
+"""
+
+import json
+import hashlib
+import argparse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from case_store import CaseStore
+from match_index import OUT_DIR, MatchIndex, build_match_index
+
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+DEFAULT_TOP_K = 100
+
+
+class ApiError(Exception):
+    """Request error answered with a JSON body and the given status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def case_number(case_id, prefix):
+    """153255 from 'MP153255' (or '153255'); raises ApiError otherwise."""
+    number = case_id.upper()
+    if number.startswith(prefix):
+        number = number[len(prefix):]
+    if not number.isdigit():
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Expected an id like {prefix}12345, got {case_id!r}")
+    return int(number)
+
+
+def int_param(params, name, default, minimum=0, maximum=None):
+    value = params.get(name, [None])[0]
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+    if value < minimum:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{name}' must be >= {minimum}")
+    return min(value, maximum) if maximum is not None else value
+
+
+class MatchApi:
+    """
+    Routes requests to the match index; independent of the HTTP layer.
+
+    Args:
+        index: MatchIndex
+        cases: CaseStore for graph node details
+    """
+
+    def __init__(self, index, cases):
+        self.index = index
+        self.cases = cases
+
+    def handle(self, path, params):
+        """
+        Returns:
+            JSON-serializable response body
+
+        Raises:
+            ApiError: For unknown routes and bad parameters
+        """
+        parts = [part for part in path.split('/') if part]
+        offset = int_param(params, 'offset', 0)
+        limit = int_param(params, 'limit', DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT)
+
+        if len(parts) == 3 and parts[0] in ('mp', 'up') and parts[2] == 'candidates':
+            prefix = parts[0].upper()
+            number = case_number(parts[1], prefix)
+            lookup = self.index.mp_rows if prefix == 'MP' else self.index.up_rows
+            rows, total = lookup(number, offset, limit)
+            return self.page({'id': f'{prefix}{number}'}, 'items', self.index.records(rows),
+                             total, offset, limit, path, params)
+
+        if len(parts) == 3 and parts[0] == 'state' and parts[2] == 'top':
+            state = parts[1].upper()
+            self.require_state(state)
+            k = int_param(params, 'k', DEFAULT_TOP_K, minimum=1)
+            rows, total = self.index.state_rows(state, offset, limit, k=k)
+            return self.page({'state': state, 'k': k}, 'items', self.index.records(rows),
+                             total, offset, limit, path, params)
+
+        if parts == ['graph']:
+            return self.graph(params, offset, limit, path)
+
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown endpoint: {path}")
+
+    def require_state(self, state):
+        if self.index.state_range(state) is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No pairs for state {state!r}")
+
+    def graph(self, params, offset, limit, path):
+        """A page of edges plus the nodes they touch, in the ragnet.json shape."""
+        state = (params.get('state', [''])[0] or '').upper()
+        if not state:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'state' is required")
+        self.require_state(state)
+        try:
+            min_score = float(params.get('min_score', ['0'])[0] or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'min_score' must be a number")
+
+        rows, total = self.index.state_rows(state, offset, limit, min_score=min_score)
+        pairs = self.index.records(rows)
+        nodes = {}
+        for pair in pairs:
+            for case_id in (pair['mp_id'], pair['up_id']):
+                if case_id not in nodes:
+                    nodes[case_id] = self.node(case_id)
+        edges = [{'id': f"{pair['mp_id']}-{pair['up_id']}", 'source': pair['mp_id'], 'target': pair['up_id'],
+                  'score': pair['priority_score'], 'tier': pair['priority_tier']} for pair in pairs]
+        body = self.page({'state': state, 'min_score': min_score}, 'edges', edges,
+                         total, offset, limit, path, params)
+        body['nodes'] = list(nodes.values())
+        return body
+
+    def node(self, case_id):
+        info = self.cases.details(case_id) or {}
+        label = info.get('name') or info.get('mec') or case_id
+        return {
+            'id': case_id,
+            'type': case_id[:2],
+            'label': label if isinstance(label, str) else case_id,
+            'state': info.get('state') if isinstance(info.get('state'), str) else '',
+            'sex': info.get('sex') if isinstance(info.get('sex'), str) else '',
+        }
+
+    @staticmethod
+    def page(fields, key, items, total, offset, limit, path, params):
+        body = dict(fields)
+        body[key] = items
+        body.update({'total': int(total), 'offset': offset, 'limit': limit, 'next': None})
+        if offset + limit < total:
+            query = {name: values[0] for name, values in params.items()}
+            query.update(offset=offset + limit, limit=limit)
+            body['next'] = f"{path}?{urlencode(query)}"
+        return body
+
+
+class MatchRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for MatchApi (set as the server's .api)."""
+
+    server_version = 'MariaMatchAPI/1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        api = self.server.api
+        etag = '"' + hashlib.sha1(f'{api.index.version}:{url.path}?{url.query}'.encode()).hexdigest()[:20] + '"'
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        try:
+            body, status = api.handle(url.path, parse_qs(url.query)), HTTPStatus.OK
+        except ApiError as e:
+            body, status, etag = {'error': str(e)}, e.status, None
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')  # revalidate, then 304
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(index, cases, host='127.0.0.1', port=DEFAULT_PORT, quiet=False):
+    """ThreadingHTTPServer serving MatchApi(index, cases)."""
+    server = ThreadingHTTPServer((host, port), MatchRequestHandler)
+    server.api = MatchApi(index, cases)
+    server.quiet = quiet
+    return server
+
+
+def open_index(out_dir=OUT_DIR):
+    """Load the match index, building it first if it is missing or stale."""
+    try:
+        index = MatchIndex(out_dir)
+        if not index.is_stale(out_dir):
+            return index
+        print("Match index is out of date; rebuilding...")
+    except FileNotFoundError:
+        print("No match index yet; building...")
+    build_match_index(out_dir)
+    return MatchIndex(out_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve candidate matches over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--quiet', action='store_true', help="Do not log requests")
+    args = parser.parse_args()
+
+    index = open_index()
+    cases = CaseStore.load()
+    server = make_server(index, cases, args.host, args.port, args.quiet)
+    print(f"Serving {len(index):,} pairs on http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,105 +2,213 @@
 """
 Merge multiple partial NamUs CSV downloads into single compiled files.
 NamUs limits downloads to 10k records, so we need to merge multiple files.
+
+Files are streamed in chunks, twice, so memory stays flat however many
+partial downloads there are:
+
+    1. Every row's case number and Date Modified (only those two columns
+       are parsed, with pyarrow) go into LatestVersions,
+       arrays indexed by the numeric part of the case number; for each
+       case only the position of its latest version is kept (ties: the
+       first one seen).
+    2. The files are read again and only those rows are written to the
+       compiled file, chunk by chunk, in input order.
+
+Values are copied through as text (numbers are not reformatted).
 """
 
 import os
 import glob
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 RAW_DIR = os.path.join(ROOT, "data", "raw")
 COMPILED_DIR = os.path.join(ROOT, "data", "compiled")
-os.makedirs(COMPILED_DIR, exist_ok=True)
 
-print("=== Merging NamUs CSV Downloads ===\n")
-
-# Find all Missing Persons CSV files
-print("Finding Missing Persons files...")
-mp_pattern = os.path.join(RAW_DIR, "Missing", "*.csv")
-mp_files = sorted(glob.glob(mp_pattern))
-
-if not mp_files:
-    print(f"  ERROR: No CSV files found in {os.path.join(RAW_DIR, 'Missing')}")
-    print(f"  Pattern: {mp_pattern}")
-else:
-    print(f"  Found {len(mp_files)} file(s):")
-    for f in mp_files:
+# (label, raw subdirectory, case number column, compiled file)
+CATEGORIES = [
+    ("Missing Persons", "Missing", "Case Number", "missing_persons.csv"),
+    ("Unidentified Persons", "Unidentified", "Case", "unidentified_persons.csv"),
+]
+DATE_COLUMN = "Date Modified"
+
+# Rows per chunk when streaming the raw files
+CHUNK_ROWS = 20_000
+
+# Date Modified (in days) of rows without one; older than any real date
+NO_DATE = -(1 << 40)
+
+
+def read_chunks(path):
+    """Stream a raw export as text; empty and NA markers ('N/A', 'NULL', ...) are written back empty."""
+    return pd.read_csv(path, dtype=str, chunksize=CHUNK_ROWS)
+
+
+def read_keys(path, key_column):
+    """
+    Stream the case number and Date Modified of a raw export.
+
+    Yields:
+        (case numbers, Date Modified days) per batch, see case_numbers / modified_days
+    """
+    columns = [key_column, DATE_COLUMN]
+    reader = pacsv.open_csv(path, convert_options=pacsv.ConvertOptions(
+        include_columns=columns, include_missing_columns=True,
+        column_types={col: pa.string() for col in columns}))
+    for batch in reader:
+        yield case_numbers(batch.column(key_column)), modified_days(batch.column(DATE_COLUMN))
+
+
+def case_numbers(values):
+    """153255 for 'MP153255' / 'UP153255' / '153255'; -1 if there is no case number."""
+    digits = pc.struct_field(pc.extract_regex(values, r"^\s*[A-Za-z]*(?P<n>\d+)\s*$"), [0])
+    return pc.fill_null(pc.cast(digits, pa.int64()), -1).to_numpy(zero_copy_only=False)
+
+
+def modified_days(values):
+    """Date Modified as days since 1970-01-01 (NO_DATE when missing or unparseable)."""
+    dates = pc.strptime(values, format="%m/%d/%Y", unit="s", error_is_null=True)
+    days = pc.cast(pc.cast(dates, pa.date32()), pa.int32())
+    days = pc.fill_null(pc.cast(days, pa.int64()), NO_DATE).to_numpy(zero_copy_only=False).copy()
+
+    # Any other format: parse the few leftovers with pandas
+    text = pc.fill_null(pc.utf8_trim_whitespace(values), "").to_numpy(zero_copy_only=False)
+    other = np.flatnonzero((days == NO_DATE) & (text != ""))
+    if len(other):
+        parsed = pd.to_datetime(pd.Series(text[other]), format="mixed", errors="coerce")
+        days[other] = np.where(parsed.isna(), NO_DATE, parsed.to_numpy(dtype="datetime64[D]").astype(np.int64))
+    return days
+
+
+class LatestVersions:
+    """
+    Position of the latest version of each case in the stream of input rows.
+
+    Two arrays indexed by case number form the seen set: the best row's
+    Date Modified (days) and its position (-1 = case not seen yet), so
+    memory depends on the highest case number, not on the number of rows.
+    Rows without a case number cannot be deduplicated and are all kept.
+    """
+
+    def __init__(self):
+        self.days = np.empty(0, dtype=np.int64)
+        self.position = np.empty(0, dtype=np.int64)
+        self.unkeyed = []
+
+    def update(self, numbers, days, positions):
+        keyed = numbers >= 0
+        self.unkeyed.append(positions[~keyed])
+        numbers, days, positions = numbers[keyed], days[keyed], positions[keyed]
+        if not len(numbers):
+            return
+
+        # Best row per case within the chunk: latest date, then first seen
+        order = np.lexsort((positions, -days, numbers))
+        numbers, days, positions = numbers[order], days[order], positions[order]
+        first = np.r_[True, numbers[1:] != numbers[:-1]]
+        numbers, days, positions = numbers[first], days[first], positions[first]
+
+        if numbers[-1] >= len(self.position):
+            size = max(int(numbers[-1]) + 1, 2 * len(self.position))
+            self.days = np.concatenate([self.days, np.full(size - len(self.days), NO_DATE, dtype=np.int64)])
+            self.position = np.concatenate([self.position, np.full(size - len(self.position), -1, dtype=np.int64)])
+
+        newer = (self.position[numbers] < 0) | (days > self.days[numbers])
+        self.days[numbers[newer]] = days[newer]
+        self.position[numbers[newer]] = positions[newer]
+
+    def winners(self):
+        """Sorted positions of the rows to keep."""
+        return np.sort(np.concatenate([self.position[self.position >= 0]] + self.unkeyed))
+
+
+def merge_files(files, key_column, output_path):
+    """
+    Merge partial downloads into one file, keeping each case's latest version.
+
+    Returns:
+        (total input rows, rows written)
+    """
+    # Pass 1: find the latest version of every case
+    latest = LatestVersions()
+    columns = []
+    file_rows = []
+    total_rows = 0
+    for f in files:
+        columns += [col for col in pd.read_csv(f, nrows=0).columns if col not in columns]
+        start = total_rows
+        for numbers, days in read_keys(f, key_column):
+            latest.update(numbers, days, np.arange(total_rows, total_rows + len(numbers), dtype=np.int64))
+            total_rows += len(numbers)
+        file_rows.append(total_rows - start)
+        print(f"    {os.path.basename(f)}: {file_rows[-1]} rows")
+
+    # Pass 2: write those rows, chunk by chunk (files without any are skipped)
+    winners = latest.winners()
+    tmp_path = output_path + ".tmp"
+    start = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="") as out:
+        pd.DataFrame(columns=columns).to_csv(out, index=False)
+        for f, n_rows in zip(files, file_rows):
+            lo, hi = np.searchsorted(winners, [start, start + n_rows])
+            if lo == hi:
+                start += n_rows
+                continue
+            for chunk in read_chunks(f):
+                lo, hi = np.searchsorted(winners, [start, start + len(chunk)])
+                keep = chunk.iloc[winners[lo:hi] - start]
+                keep.reindex(columns=columns).to_csv(out, header=False, index=False)
+                start += len(chunk)
+    os.replace(tmp_path, output_path)
+    return total_rows, len(winners)
+
+
+def merge_category(label, subdir, key_column, output_name):
+    print(f"Finding {label} files...")
+    pattern = os.path.join(RAW_DIR, subdir, "*.csv")
+    files = sorted(glob.glob(pattern))
+
+    if not files:
+        print(f"  ERROR: No CSV files found in {os.path.join(RAW_DIR, subdir)}")
+        print(f"  Pattern: {pattern}")
+        return
+
+    print(f"  Found {len(files)} file(s):")
+    for f in files:
         print(f"    - {os.path.basename(f)}")
 
-    # Merge Missing Persons files
-    print("\n  Merging Missing Persons files...")
-    mp_dfs = []
-    total_rows = 0
-    for f in mp_files:
-        df = pd.read_csv(f)
-        mp_dfs.append(df)
-        total_rows += len(df)
-        print(f"    {os.path.basename(f)}: {len(df)} rows")
+    print(f"\n  Merging {label} files...")
+    output = os.path.join(COMPILED_DIR, output_name)
+    total_rows, unique = merge_files(files, key_column, output)
 
-    mp_merged = pd.concat(mp_dfs, ignore_index=True)
+    print(f"\n  Total rows: {total_rows}")
+    print(f"  After deduplication: {unique} unique cases")
+    if total_rows > unique:
+        print(f"  Removed {total_rows - unique} duplicates (older versions by {DATE_COLUMN})")
+    print(f"  ✓ Wrote: {output}")
 
-    # Remove duplicates based on Case Number
-    before_dedup = len(mp_merged)
-    mp_merged = mp_merged.drop_duplicates(subset=['Case Number'], keep='first')
-    after_dedup = len(mp_merged)
 
-    print(f"\n  Total rows: {total_rows}")
-    print(f"  After deduplication: {after_dedup} unique cases")
-    if before_dedup > after_dedup:
-        print(f"  Removed {before_dedup - after_dedup} duplicates")
-
-    # Save merged file
-    mp_output = os.path.join(COMPILED_DIR, "missing_persons.csv")
-    mp_merged.to_csv(mp_output, index=False)
-    print(f"  ✓ Wrote: {mp_output}")
-
-print("\n" + "="*50 + "\n")
-
-# Find all Unidentified Persons CSV files
-print("Finding Unidentified Persons files...")
-up_pattern = os.path.join(RAW_DIR, "Unidentified", "*.csv")
-up_files = sorted(glob.glob(up_pattern))
-
-if not up_files:
-    print(f"  ERROR: No CSV files found in {os.path.join(RAW_DIR, 'Unidentified')}")
-    print(f"  Pattern: {up_pattern}")
-else:
-    print(f"  Found {len(up_files)} file(s):")
-    for f in up_files:
-        print(f"    - {os.path.basename(f)}")
+def main():
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    print("=== Merging NamUs CSV Downloads ===\n")
 
-    # Merge Unidentified Persons files
-    print("\n  Merging Unidentified Persons files...")
-    up_dfs = []
-    total_rows = 0
-    for f in up_files:
-        df = pd.read_csv(f)
-        up_dfs.append(df)
-        total_rows += len(df)
-        print(f"    {os.path.basename(f)}: {len(df)} rows")
+    for i, category in enumerate(CATEGORIES):
+        if i:
+            print("\n" + "="*50 + "\n")
+        merge_category(*category)
 
-    up_merged = pd.concat(up_dfs, ignore_index=True)
+    print("\n" + "="*50)
+    print("\n✓ Merging complete!")
+    print(f"\nCompiled files are ready in: {COMPILED_DIR}")
+    print("\nNext step:")
+    print(f"  python3 data-build/process_namus_downloads.py \\")
+    print(f"    --mp data/compiled/missing_persons.csv \\")
+    print(f"    --up data/compiled/unidentified_persons.csv")
 
-    # Remove duplicates based on Case
-    before_dedup = len(up_merged)
-    up_merged = up_merged.drop_duplicates(subset=['Case'], keep='first')
-    after_dedup = len(up_merged)
 
-    print(f"\n  Total rows: {total_rows}")
-    print(f"  After deduplication: {after_dedup} unique cases")
-    if before_dedup > after_dedup:
-        print(f"  Removed {before_dedup - after_dedup} duplicates")
-
-    # Save merged file
-    up_output = os.path.join(COMPILED_DIR, "unidentified_persons.csv")
-    up_merged.to_csv(up_output, index=False)
-    print(f"  ✓ Wrote: {up_output}")
-
-print("\n" + "="*50)
-print("\n✓ Merging complete!")
-print(f"\nCompiled files are ready in: {COMPILED_DIR}")
-print("\nNext step:")
-print(f"  python3 data-build/process_namus_downloads.py \\")
-print(f"    --mp data/compiled/missing_persons.csv \\")
-print(f"    --up data/compiled/unidentified_persons.csv")
+if __name__ == "__main__":
+    main()
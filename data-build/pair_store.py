@@ -0,0 +1,343 @@
+"""
+Columnar storage for candidate pairs.
+
+candidate_pairs.csv used to be written with to_csv and parsed again by every
+downstream stage. Pairs are now stored as a Parquet dataset, one partition
+per MP state:
+
+    out/candidate_pairs/state=FL/part-0.parquet
+
+Columns are stored compactly:
+- mp_id / up_id: int32 NamUs case numbers (MP153255 -> 153255)
+- days_gap: int32
+- same_state / same_county / same_city: booleans (bit-packed by Arrow/Parquet)
+- priority_tier: int8
+- tier_reason: dictionary-encoded string
+
+read_pairs() loads only the requested columns (and optionally states) and
+turns the integer ids back into 'MP...'/'UP...' strings, so callers keep
+working with the ids used everywhere else.
+
+Per-case match counts (pairs per MP / UP) are stored next to the dataset
+and can be patched together with it when only some cases changed:
+
+    out/match_counts/mp.parquet, out/match_counts/up.parquet
+"""
+
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PAIRS_DATASET = 'candidate_pairs'
+MATCH_COUNTS_DIR = 'match_counts'
+PARTITION_COLUMN = 'state'
+
+ID_PREFIXES = {'mp_id': 'MP', 'up_id': 'UP'}
+
+# Default rows per batch when streaming pairs
+BATCH_ROWS = 1_000_000
+
+PAIR_SCHEMA = pa.schema([
+    ('mp_id', pa.int32()),
+    ('up_id', pa.int32()),
+    ('days_gap', pa.int32()),
+    ('same_state', pa.bool_()),
+    ('same_county', pa.bool_()),
+    ('same_city', pa.bool_()),
+    ('priority_tier', pa.int8()),
+    ('tier_reason', pa.dictionary(pa.int8(), pa.string())),
+])
+
+
+def encode_case_ids(ids, prefix):
+    """
+    Convert NamUs ids ('MP153255') to int32 case numbers.
+
+    Raises:
+        ValueError: If an id does not have the expected prefix
+    """
+    ids = pd.Series(ids, dtype=object)
+    valid = ids.str.fullmatch(prefix + r'\d+').fillna(False)
+    if not valid.all():
+        bad = ids[~valid].head(3).tolist()
+        raise ValueError(f"Case ids must look like '{prefix}<number>', got {bad}")
+    return ids.str[len(prefix):].astype(np.int64).to_numpy().astype(np.int32)
+
+
+def decode_case_ids(codes, prefix):
+    """Convert int case numbers back to NamUs id strings."""
+    uniques, inverse = np.unique(np.asarray(codes), return_inverse=True)
+    labels = np.array([f'{prefix}{code}' for code in uniques], dtype=object)
+    return labels[inverse]
+
+
+def pairs_path(out_dir):
+    """Location of the candidate pair dataset inside an output directory."""
+    return os.path.join(out_dir, PAIRS_DATASET)
+
+
+def pairs_exist(out_dir):
+    return os.path.isdir(pairs_path(out_dir))
+
+
+def write_pairs(pairs_df, out_dir):
+    """
+    Write candidate pairs as a Parquet dataset partitioned by MP state.
+
+    Any previous dataset is replaced.
+
+    Args:
+        pairs_df: DataFrame with the PAIR_SCHEMA columns (integer ids) and a
+            'state' column holding the partition key
+        out_dir: Output directory
+
+    Returns:
+        Path to the dataset directory
+    """
+    path = pairs_path(out_dir)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+    for state, part in pairs_df.groupby(PARTITION_COLUMN, sort=True, observed=True):
+        part_dir = os.path.join(path, f'{PARTITION_COLUMN}={state}')
+        os.makedirs(part_dir, exist_ok=True)
+        table = pa.Table.from_pandas(
+            part[PAIR_SCHEMA.names], schema=PAIR_SCHEMA, preserve_index=False
+        )
+        pq.write_table(table, os.path.join(part_dir, 'part-0.parquet'))
+
+    return path
+
+
+def patch_pairs(out_dir, drop_mp, drop_up, new_pairs_df):
+    """
+    Update the dataset in place: drop every pair touching the given cases,
+    then append new pairs.
+
+    Only the id columns of each partition are scanned; partitions with
+    nothing to drop or add are left untouched on disk.
+
+    Args:
+        out_dir: Output directory holding the dataset
+        drop_mp / drop_up: Integer case numbers whose pairs are removed
+        new_pairs_df: Pairs to add, with the columns write_pairs() expects
+
+    Returns:
+        DataFrame (mp_id, up_id) of the removed pairs
+    """
+    path = pairs_path(out_dir)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"{path} not found. Run generate_candidate_pairs_v2.py first.")
+
+    drop_mp = np.asarray(drop_mp, dtype=np.int32)
+    drop_up = np.asarray(drop_up, dtype=np.int32)
+    prefix = f'{PARTITION_COLUMN}='
+    existing = {name[len(prefix):] for name in os.listdir(path) if name.startswith(prefix)}
+    new_parts = {str(state): part for state, part in
+                 new_pairs_df.groupby(PARTITION_COLUMN, sort=True, observed=True)}
+
+    removed = [pd.DataFrame({'mp_id': np.zeros(0, np.int32), 'up_id': np.zeros(0, np.int32)})]
+    for state in sorted(existing | set(new_parts)):
+        part_dir = os.path.join(path, f'{prefix}{state}')
+        part_file = os.path.join(part_dir, 'part-0.parquet')
+        tables = []
+
+        if state in existing:
+            ids = pq.read_table(part_file, columns=['mp_id', 'up_id'])
+            mp_ids = ids['mp_id'].to_numpy()
+            up_ids = ids['up_id'].to_numpy()
+            drop = np.isin(mp_ids, drop_mp) | np.isin(up_ids, drop_up)
+            if not drop.any() and state not in new_parts:
+                continue
+            removed.append(pd.DataFrame({'mp_id': mp_ids[drop], 'up_id': up_ids[drop]}))
+            # Keep the file's pandas metadata so readers get the same dtypes back
+            kept = (pq.read_table(part_file, schema=PAIR_SCHEMA).filter(pa.array(~drop))
+                    .replace_schema_metadata(pq.read_schema(part_file).metadata))
+            if kept.num_rows:
+                tables.append(kept)
+
+        if state in new_parts:
+            tables.append(pa.Table.from_pandas(new_parts[state][PAIR_SCHEMA.names],
+                                               schema=PAIR_SCHEMA, preserve_index=False))
+
+        if not tables:
+            shutil.rmtree(part_dir, ignore_errors=True)
+            continue
+        os.makedirs(part_dir, exist_ok=True)
+        tmp_path = part_file + '.tmp'
+        pq.write_table(pa.concat_tables(tables).combine_chunks(), tmp_path)
+        os.replace(tmp_path, part_file)
+
+    return pd.concat(removed, ignore_index=True)
+
+
+def count_matches(codes):
+    """Pairs per case number as a Series indexed by the int case number."""
+    counts = pd.Series(np.asarray(codes)).value_counts(sort=False)
+    counts.index = counts.index.astype(np.int32)
+    return counts.astype(np.int32).sort_index()
+
+
+def write_match_counts(out_dir, mp_counts, up_counts, prefix='', keep_zero=False):
+    """
+    Store per-case match counts (Series indexed by int case number).
+
+    Args:
+        prefix: File name prefix, to keep several count tables side by side
+        keep_zero: Also store cases with no matches
+    """
+    path = os.path.join(out_dir, MATCH_COUNTS_DIR)
+    os.makedirs(path, exist_ok=True)
+    for side, counts in (('mp', mp_counts), ('up', up_counts)):
+        counts = (counts if keep_zero else counts[counts > 0]).sort_index()
+        table = pa.table({'id': counts.index.to_numpy(dtype=np.int32),
+                          'matches': counts.to_numpy(dtype=np.int32)})
+        tmp_path = os.path.join(path, f'{prefix}{side}.parquet.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(path, f'{prefix}{side}.parquet'))
+
+
+def read_match_counts(out_dir, prefix=''):
+    """
+    Load per-case match counts.
+
+    Returns:
+        (mp_counts, up_counts) int32 Series indexed by int case number, or
+        None if no counts are stored
+    """
+    path = os.path.join(out_dir, MATCH_COUNTS_DIR)
+    files = [os.path.join(path, f'{prefix}{side}.parquet') for side in ('mp', 'up')]
+    if not all(os.path.exists(f) for f in files):
+        return None
+    counts = []
+    for side_path in files:
+        table = pq.read_table(side_path).to_pandas()
+        counts.append(pd.Series(table['matches'].to_numpy(), index=table['id'].to_numpy()))
+    return tuple(counts)
+
+
+def update_match_counts(counts, removed_codes, added_codes):
+    """
+    Apply a pair delta to a match count Series; only the touched ids change.
+
+    Returns:
+        (updated counts, Index of affected case numbers)
+    """
+    delta = count_matches(added_codes).sub(count_matches(removed_codes), fill_value=0)
+    delta = delta[delta != 0]
+    updated = counts.add(delta, fill_value=0).astype(np.int32)
+    return updated[updated > 0], delta.index
+
+
+def _drop_excluded(df, exclusions):
+    """Drop pairs an exclusions.ExclusionIndex excludes (integer-coded ids)."""
+    if exclusions is None or len(exclusions) == 0:
+        return df
+    excluded = np.zeros(len(df), dtype=bool)
+    for col, side in (('mp_id', 'mp'), ('up_id', 'up')):
+        if col in df.columns:
+            excluded |= exclusions.mask(side, df[col].to_numpy())
+    return df[~excluded].reset_index(drop=True) if excluded.any() else df
+
+
+def read_pairs(out_dir, columns=None, states=None, decode_ids=True, exclusions=None):
+    """
+    Load candidate pairs, reading only the requested columns.
+
+    Args:
+        out_dir: Output directory holding the dataset
+        columns: Columns to load (default: all pair columns)
+        states: Optional list of MP states (partitions) to load
+        decode_ids: Return mp_id/up_id as 'MP...'/'UP...' strings
+        exclusions: Optional ExclusionIndex; pairs of excluded cases are dropped
+
+    Returns:
+        DataFrame of candidate pairs
+    """
+    path = pairs_path(out_dir)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"{path} not found. Run generate_candidate_pairs_v2.py first.")
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    columns = list(columns) if columns is not None else PAIR_SCHEMA.names
+
+    filter_expr = None
+    if states is not None:
+        filter_expr = ds.field(PARTITION_COLUMN).isin(list(states))
+
+    df = _drop_excluded(dataset.to_table(columns=columns, filter=filter_expr).to_pandas(), exclusions)
+
+    if decode_ids:
+        for col, prefix in ID_PREFIXES.items():
+            if col in df.columns:
+                df[col] = decode_case_ids(df[col].to_numpy(), prefix)
+    return df
+
+
+def read_case_pairs(out_dir, mp_ids=(), up_ids=(), states=None, columns=('mp_id', 'up_id')):
+    """
+    Load the pairs touching any of the given cases.
+
+    Args:
+        out_dir: Output directory holding the dataset
+        mp_ids / up_ids: Integer case numbers
+        states: Optional partitions to search; pairs of an MP live in its own
+            state's partition, pairs of a UP in its state's and the adjacent
+            states' partitions
+        columns: Columns to load
+
+    Returns:
+        DataFrame with integer-coded ids
+    """
+    path = pairs_path(out_dir)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"{path} not found. Run generate_candidate_pairs_v2.py first.")
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    filter_expr = (ds.field('mp_id').isin(pa.array(np.asarray(mp_ids, dtype=np.int32))) |
+                   ds.field('up_id').isin(pa.array(np.asarray(up_ids, dtype=np.int32))))
+    if states is not None:
+        filter_expr = filter_expr & ds.field(PARTITION_COLUMN).isin(list(states))
+    return dataset.to_table(columns=list(columns), filter=filter_expr).to_pandas()
+
+
+def iter_pair_batches(out_dir, columns=None, batch_size=BATCH_ROWS, decode_ids=False, exclusions=None):
+    """
+    Stream candidate pairs as DataFrames of at most batch_size rows.
+
+    Only the requested columns are read, so memory stays bounded by the
+    batch size rather than the dataset size. Ids stay integer-coded unless
+    decode_ids is set. Pairs of cases in the optional ExclusionIndex are
+    dropped.
+    """
+    path = pairs_path(out_dir)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"{path} not found. Run generate_candidate_pairs_v2.py first.")
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    columns = list(columns) if columns is not None else PAIR_SCHEMA.names
+
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+        if batch.num_rows == 0:
+            continue
+        df = _drop_excluded(batch.to_pandas(), exclusions)
+        if len(df) == 0:
+            continue
+        if decode_ids:
+            for col, prefix in ID_PREFIXES.items():
+                if col in df.columns:
+                    df[col] = decode_case_ids(df[col].to_numpy(), prefix)
+        yield df
+
+
+def export_pairs_csv(pairs_df, path):
+    """Write pairs with string ids in the original candidate_pairs.csv layout."""
+    out = pairs_df[PAIR_SCHEMA.names].copy()
+    for col, prefix in ID_PREFIXES.items():
+        out[col] = decode_case_ids(out[col].to_numpy(), prefix)
+    out['priority_tier'] = out['priority_tier'].astype(np.int64)
+    out.to_csv(path, index=False)
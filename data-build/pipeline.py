@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Run the data-build pipeline, skipping stages whose outputs are up to date.
+
+Stages and the files they read and write:
+
+    merge       data/raw/{Missing,Unidentified}/*.csv -> data/compiled/*.csv
+    process     data/compiled/*.csv                   -> data/clean/{MP,UP}_master.csv
+    pairs       masters, exclusions.csv, county edges -> out/candidate_pairs/, out/cases_*.json
+    score       masters, exclusions, candidate pairs  -> out/all_matches_scored.csv, ...
+    prioritize  masters, exclusions, candidate pairs  -> out/candidate_pairs_prioritized.csv, ...
+    sqlite      masters, match CSVs, review log       -> out/maria.db
+    index       MP master, prioritized CSV            -> out/match_index/ (for match_server.py)
+    graph       scored matches, candidate pairs       -> out/ragnet/ (for index.html)
+
+Each stage is fingerprinted from the content hashes of its inputs, the
+source of its script and the local modules it imports, and the parameters
+that change its outputs. A stage runs only when its fingerprint differs
+from the last successful run or an output is missing. Because inputs are
+hashed by content, a stage that reproduces identical outputs does not
+invalidate the stages after it, and e.g. editing data/exclusions.csv only
+re-runs pairs and the stages reading its outputs, never the merge. score
+and prioritize also mask excluded cases themselves, so '--only score
+prioritize' applies a new exclusion without regenerating pairs. The review
+log is an optional input of sqlite (there is none before the first review),
+so new decisions rebuild maria.db; 'export_sqlite.py --reviews-only'
+refreshes just the reviews table.
+
+A stage with a self-check (pairs: 'generate_candidate_pairs_v2.py
+--self-check') runs it before the stage whenever the stage's code changed
+since its last successful run; a failing check stops the pipeline.
+
+Usage:
+    python3 data-build/pipeline.py                 # run what is out of date
+    python3 data-build/pipeline.py --dry-run       # only show what would run
+    python3 data-build/pipeline.py --force score   # re-run score (and anything it invalidates)
+    python3 data-build/pipeline.py --only pairs prioritize
+    python3 data-build/pipeline.py --incremental   # after a NamUs refresh
+"""
+
+import os
+import ast
+import sys
+import glob
+import json
+import time
+import argparse
+import hashlib
+import subprocess
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_DIR = os.path.join(ROOT, 'data-build')
+OUT_DIR = os.environ.get('OUT_DIR', os.path.join(ROOT, 'out'))
+STATE_PATH = os.path.join(OUT_DIR, 'cache', 'pipeline_state.json')
+
+# Bump to invalidate every recorded fingerprint
+PIPELINE_VERSION = 1
+
+HASH_CHUNK = 1 << 20
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step.
+
+    inputs/outputs are paths or glob patterns relative to ROOT (outputs may
+    also use '{out}' for OUT_DIR); directories are hashed file by file.
+    optional_inputs are hashed when present but may be missing. params
+    returns the settings that change the stage's outputs, and args the
+    extra command line for the script. self_check is the command line of
+    the script's own consistency check, run before the stage whenever its
+    code changed since the last successful run.
+    """
+    name: str
+    script: str
+    inputs: List[str]
+    outputs: List[str]
+    optional_inputs: List[str] = field(default_factory=list)
+    self_check: List[str] = field(default_factory=list)
+    args: Callable[[argparse.Namespace], List[str]] = lambda options: []
+    params: Callable[[argparse.Namespace], Dict[str, str]] = lambda options: {}
+
+
+STAGES = [
+    Stage(
+        name='merge',
+        script='merge_raw_downloads.py',
+        inputs=['data/raw/Missing/*.csv', 'data/raw/Unidentified/*.csv'],
+        outputs=['data/compiled/missing_persons.csv', 'data/compiled/unidentified_persons.csv'],
+    ),
+    Stage(
+        name='process',
+        script='process_namus_downloads.py',
+        inputs=['data/compiled/missing_persons.csv', 'data/compiled/unidentified_persons.csv'],
+        outputs=['data/clean/MP_master.csv', 'data/clean/UP_master.csv'],
+        args=lambda options: ['--mp', os.path.join(ROOT, 'data', 'compiled', 'missing_persons.csv'),
+                              '--up', os.path.join(ROOT, 'data', 'compiled', 'unidentified_persons.csv')],
+    ),
+    Stage(
+        name='pairs',
+        script='generate_candidate_pairs_v2.py',
+        inputs=['data/clean/MP_master.csv', 'data/clean/UP_master.csv', 'data/exclusions.csv',
+                'data/county_adjacency.txt'],
+        outputs=['{out}/candidate_pairs', '{out}/cases_mp.json', '{out}/cases_up.json'],
+        # --workers and --incremental do not change the output, so they are not parameters
+        args=lambda options: (['--workers', str(options.workers)] + (['--csv'] if options.csv else []) +
+                              (['--incremental'] if options.incremental else [])),
+        params=lambda options: {'csv': str(options.csv)},
+        self_check=['--self-check'],
+    ),
+    Stage(
+        name='score',
+        script='score_candidates.py',
+        inputs=['data/clean/MP_master.csv', 'data/clean/UP_master.csv', 'data/exclusions.csv',
+                '{out}/candidate_pairs'],
+        outputs=['{out}/all_matches_scored.csv', '{out}/high_priority_matches.csv',
+                 '{out}/candidates.jsonl', 'TOP_MATCHES.md'],
+        params=lambda options: {name: os.environ.get(name, '') for name in
+                                ('SCORE_TOP_K', 'SCORE_TOP_K_SORT', 'SCORE_TOP_K_PER_UP')},
+    ),
+    Stage(
+        name='prioritize',
+        script='prioritize_matches.py',
+        inputs=['data/clean/MP_master.csv', 'data/clean/UP_master.csv', 'data/exclusions.csv',
+                '{out}/candidate_pairs'],
+        outputs=['{out}/candidate_pairs_prioritized.csv', '{out}/top_matches_for_review.csv',
+                 '{out}/best_match_per_up.csv'],
+    ),
+    Stage(
+        name='sqlite',
+        script='export_sqlite.py',
+        inputs=['data/clean/MP_master.csv', 'data/clean/UP_master.csv', '{out}/all_matches_scored.csv',
+                '{out}/candidate_pairs_prioritized.csv'],
+        outputs=['{out}/maria.db'],
+        optional_inputs=['{out}/review_log.jsonl'],
+    ),
+    Stage(
+        name='index',
+        script='match_index.py',
+        inputs=['data/clean/MP_master.csv', '{out}/candidate_pairs_prioritized.csv'],
+        outputs=['{out}/match_index'],
+    ),
+    Stage(
+        name='graph',
+        script='export_graph.py',
+        inputs=['{out}/all_matches_scored.csv', '{out}/candidate_pairs'],
+        outputs=['{out}/ragnet'],
+    ),
+]
+
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+
+def resolve(pattern):
+    """Expand '{out}' and make a stage path absolute."""
+    return os.path.join(ROOT, pattern.format(out=OUT_DIR))
+
+
+def expand_files(pattern):
+    """Files matched by a path, glob pattern or directory (sorted)."""
+    files = []
+    for path in sorted(glob.glob(resolve(pattern))):
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                files.extend(os.path.join(dirpath, name) for name in filenames)
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+class FileHasher:
+    """
+    SHA-256 of file contents, memoized by (size, mtime) across runs so
+    unchanged multi-hundred-MB inputs are not re-read every time.
+    """
+
+    def __init__(self, memo=None):
+        self.memo = memo or {}
+
+    def __call__(self, path):
+        stat = os.stat(path)
+        key = f'{stat.st_size}:{stat.st_mtime_ns}'
+        cached = self.memo.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+        self.memo[path] = [key, digest.hexdigest()]
+        return digest.hexdigest()
+
+
+def local_modules(script):
+    """The script plus every data-build module it imports, recursively."""
+    seen, pending = set(), [os.path.join(BUILD_DIR, script)]
+    while pending:
+        path = pending.pop()
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                top = name.split('.')[0]
+                module_path = os.path.join(BUILD_DIR, top + '.py')
+                package_dir = os.path.join(BUILD_DIR, top)
+                if os.path.exists(module_path):
+                    pending.append(module_path)
+                elif os.path.isdir(package_dir):
+                    pending.extend(glob.glob(os.path.join(package_dir, '*.py')))
+    return sorted(seen)
+
+
+def code_fingerprint(stage, hasher):
+    """Hash of a stage's script and the local modules it imports."""
+    digest = hashlib.sha256()
+    for path in local_modules(stage.script):
+        digest.update(f'code:{os.path.relpath(path, ROOT)}:{hasher(path)}'.encode())
+    return digest.hexdigest()
+
+
+def stage_fingerprint(stage, options, hasher):
+    """
+    Hash of everything that determines a stage's outputs.
+
+    Returns:
+        (fingerprint, missing_inputs)
+    """
+    digest = hashlib.sha256(f'pipeline-v{PIPELINE_VERSION}:{stage.name}'.encode())
+    missing = []
+
+    for pattern in stage.inputs + stage.optional_inputs:
+        files = expand_files(pattern)
+        if not files and pattern in stage.inputs:
+            missing.append(pattern)
+        for path in files:
+            digest.update(f'input:{os.path.relpath(path, ROOT)}:{hasher(path)}'.encode())
+
+    for path in local_modules(stage.script):
+        digest.update(f'code:{os.path.relpath(path, ROOT)}:{hasher(path)}'.encode())
+
+    digest.update(json.dumps(stage.params(options), sort_keys=True).encode())
+    return digest.hexdigest(), missing
+
+
+def outputs_present(stage):
+    return all(expand_files(pattern) for pattern in stage.outputs)
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {'stages': {}, 'hashes': {}}
+    with open(STATE_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def run_stage(stage, args):
+    """Run a stage script from ROOT; raises CalledProcessError on failure."""
+    command = [sys.executable, os.path.join(BUILD_DIR, stage.script)] + args
+    env = dict(os.environ, OUT_DIR=OUT_DIR)
+    subprocess.run(command, cwd=ROOT, env=env, check=True)
+
+
+def run_pipeline(options):
+    """
+    Run the selected stages in order, skipping up-to-date ones.
+
+    Returns:
+        Dict of stage name -> 'ran', 'up to date', 'would run' or 'skipped'
+    """
+    state = load_state()
+    hasher = FileHasher(state.get('hashes'))
+    selected = set(options.only or STAGE_NAMES)
+    results = {}
+    pending_outputs = set()  # outputs a dry run would have rebuilt
+
+    for stage in STAGES:
+        if stage.name not in selected:
+            results[stage.name] = 'skipped'
+            continue
+
+        # Inputs may be outputs of the stage before, so fingerprint just in time
+        fingerprint, missing = stage_fingerprint(stage, options, hasher)
+        recorded = state['stages'].get(stage.name, {})
+        stale = (
+            stage.name in (options.force or []) or
+            bool(pending_outputs.intersection(stage.inputs)) or
+            recorded.get('fingerprint') != fingerprint or
+            not outputs_present(stage)
+        )
+
+        if not stale:
+            print(f"✓ {stage.name}: up to date")
+            results[stage.name] = 'up to date'
+            continue
+        if options.dry_run:
+            print(f"• {stage.name}: would run {stage.script}")
+            results[stage.name] = 'would run'
+            pending_outputs.update(stage.outputs)
+            continue
+        if missing:
+            raise FileNotFoundError(f"Stage '{stage.name}' is missing inputs: {', '.join(missing)}")
+
+        code = code_fingerprint(stage, hasher)
+        if stage.self_check and recorded.get('code') != code:
+            print(f"\n▶ {stage.name}: {stage.script} {' '.join(stage.self_check)} (code changed)")
+            run_stage(stage, stage.self_check)
+
+        print(f"\n▶ {stage.name}: {stage.script} {' '.join(stage.args(options))}".rstrip())
+        start = time.perf_counter()
+        run_stage(stage, stage.args(options))
+        elapsed = time.perf_counter() - start
+
+        state['stages'][stage.name] = {
+            'fingerprint': fingerprint,
+            'code': code,
+            'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'seconds': round(elapsed, 1),
+        }
+        state['hashes'] = hasher.memo
+        save_state(state)
+        print(f"✓ {stage.name}: done in {elapsed:.1f}s")
+        results[stage.name] = 'ran'
+
+    state['hashes'] = hasher.memo
+    if not options.dry_run:
+        save_state(state)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the data-build pipeline with artifact caching")
+    parser.add_argument('--only', nargs='+', choices=STAGE_NAMES, metavar='STAGE',
+                        help=f"Run only these stages ({', '.join(STAGE_NAMES)})")
+    parser.add_argument('--force', nargs='+', choices=STAGE_NAMES, metavar='STAGE',
+                        help="Re-run these stages even if up to date")
+    parser.add_argument('--dry-run', action='store_true', help="Show what would run without running it")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for pair generation")
+    parser.add_argument('--csv', action='store_true', help="Also export candidate pairs as CSV")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Regenerate pairs only for cases changed since the last pair build")
+    options = parser.parse_args()
+
+    print("=" * 60)
+    print("Maria data-build pipeline")
+    print("=" * 60)
+
+    try:
+        run_pipeline(options)
+    except subprocess.CalledProcessError as e:
+        print(f"\nERROR: stage failed with exit code {e.returncode}")
+        sys.exit(e.returncode)
+    except FileNotFoundError as e:
+        print(f"\nERROR: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,8 @@ import os
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
+from exclusions import ExclusionIndex
+from pair_store import pairs_exist, pairs_path, read_pairs
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA_DIR = os.path.join(ROOT, 'data', 'clean')
@@ -70,12 +72,13 @@ def main():
 
     # Load data
     print("\n1. Loading data...")
-    pairs_path = os.path.join(OUT_DIR, 'candidate_pairs.csv')
-    if not os.path.exists(pairs_path):
-        print(f"   ERROR: {pairs_path} not found. Run generate_candidate_pairs_v2.py first.")
+    if not pairs_exist(OUT_DIR):
+        print(f"   ERROR: {pairs_path(OUT_DIR)} not found. Run generate_candidate_pairs_v2.py first.")
         return
 
-    pairs_df = pd.read_csv(pairs_path)
+    # Exclusions added since pair generation are masked out on read
+    exclusions = ExclusionIndex()
+    pairs_df = read_pairs(OUT_DIR, exclusions=exclusions)
     mp_df = pd.read_csv(os.path.join(DATA_DIR, 'MP_master.csv'))
     up_df = pd.read_csv(os.path.join(DATA_DIR, 'UP_master.csv'))
 
@@ -207,7 +210,7 @@ def main():
     print("\nRecommended review order:")
     print("  1. best_match_per_up.csv - UPs with few matches, high priority")
     print("  2. top_matches_for_review.csv - Top 1000 pairs overall")
-    print("  3. candidate_pairs_tier1.csv - All Tier 1 matches")
+    print("  3. candidate_pairs_tier1.csv - All Tier 1 matches (generate_candidate_pairs_v2.py --csv)")
 
 
 if __name__ == '__main__':
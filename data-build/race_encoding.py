@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Race bitmask encoding for candidate pair generation.
+
+Each case's race string is parsed once at load time into a small integer
+bitmask with one bit per normalized race category. Zero means the race is
+unknown/uncertain, which can never rule a match out. The race filter then
+becomes a vectorized bitwise test over NumPy arrays instead of re-parsing
+two race strings for every surviving pair.
+
+Run directly to check the bitmask filter against the set-based
+races_overlap() on every distinct race combination in the master files:
+
+    python3 data-build/race_encoding.py
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+# Values that carry no information and never rule a match out
+UNINFORMATIVE_RACES = ('UNCERTAIN', 'UNKNOWN', 'OTHER')
+
+MAX_RACE_CATEGORIES = 64
+
+
+def parse_races(race_str):
+    """Parse a race string into a set of normalized race categories."""
+    if pd.isna(race_str) or str(race_str).strip() == '':
+        return set()
+    # Split by comma and normalize each part
+    races = set()
+    for part in str(race_str).split(','):
+        normalized = part.strip().upper()
+        if normalized and normalized not in UNINFORMATIVE_RACES:
+            races.add(normalized)
+    return races
+
+
+def races_overlap(race_mp, race_up):
+    """Check if two race strings have any overlapping categories.
+
+    Returns True if:
+    - Either race is empty/unknown (can't rule out match)
+    - There's at least one common race category
+    """
+    races_mp = parse_races(race_mp)
+    races_up = parse_races(race_up)
+
+    # If either is empty/unknown, allow the match (can't rule it out)
+    if not races_mp or not races_up:
+        return True
+
+    # Check for any overlap
+    return bool(races_mp & races_up)
+
+
+def build_race_bits(*race_columns):
+    """
+    Assign one bit to every normalized race category seen in the given columns.
+
+    Args:
+        race_columns: Race Series (e.g. mp['race'], up['race'])
+
+    Returns:
+        Dict mapping category -> bit value
+    """
+    categories = set()
+    for column in race_columns:
+        for value in pd.Series(column).dropna().unique():
+            categories |= parse_races(value)
+
+    if len(categories) > MAX_RACE_CATEGORIES:
+        raise ValueError(f"Too many race categories for a 64-bit mask: {len(categories)}")
+
+    return {race: np.uint64(1) << np.uint64(i) for i, race in enumerate(sorted(categories))}
+
+
+def encode_races(races, race_bits):
+    """
+    Encode a race Series as uint64 bitmasks (0 = unknown/permissive).
+
+    Each distinct string is parsed once; categories missing from race_bits
+    raise KeyError rather than silently becoming permissive.
+    """
+    codes, uniques = pd.factorize(pd.Series(races))
+    table = np.zeros(len(uniques) + 1, dtype=np.uint64)  # last slot: missing
+    for i, value in enumerate(uniques):
+        for race in parse_races(value):
+            table[i] |= race_bits[race]
+
+    return table[codes]
+
+
+def races_overlap_mask(mask_mp, mask_up):
+    """Vectorized races_overlap() over two arrays of race bitmasks."""
+    mask_mp = np.asarray(mask_mp, dtype=np.uint64)
+    mask_up = np.asarray(mask_up, dtype=np.uint64)
+    return ((mask_mp & mask_up) != 0) | (mask_mp == 0) | (mask_up == 0)
+
+
+def main():
+    """Check bitmask semantics against races_overlap() on the master files."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_dir = os.path.join(root, 'data', 'clean')
+
+    mp = pd.read_csv(os.path.join(data_dir, 'MP_master.csv'))
+    up = pd.read_csv(os.path.join(data_dir, 'UP_master.csv'))
+
+    race_bits = build_race_bits(mp['race'], up['race'])
+    print(f"Race categories ({len(race_bits)}):")
+    for race, bit in race_bits.items():
+        print(f"  {int(bit):>4}  {race}")
+
+    # Every (MP race, UP race) combination that can occur in a pair
+    mp_races = pd.Series(mp['race'].unique())
+    up_races = pd.Series(up['race'].unique())
+    combos = pd.merge(mp_races.rename('race_mp'), up_races.rename('race_up'), how='cross')
+
+    expected = combos.apply(lambda r: races_overlap(r['race_mp'], r['race_up']), axis=1).to_numpy()
+    actual = races_overlap_mask(
+        encode_races(combos['race_mp'], race_bits),
+        encode_races(combos['race_up'], race_bits),
+    )
+
+    mismatches = combos[expected != actual]
+    print(f"\nChecked {len(combos):,} distinct race combinations "
+          f"({len(mp_races)} MP x {len(up_races)} UP)")
+    if len(mismatches) > 0:
+        print(f"FAILED: {len(mismatches)} combinations disagree with races_overlap()")
+        print(mismatches.head(10).to_string())
+        raise SystemExit(1)
+    print("✓ Bitmask race filter matches races_overlap() on all combinations")
+
+
+if __name__ == '__main__':
+    main()
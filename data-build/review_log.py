@@ -0,0 +1,242 @@
+"""
+Append-only review log with a persistent (mp_id, up_id) index.
+
+Each review action is one JSON line in out/review_log.jsonl:
+
+    {"mp_id": "MP153255", "up_id": "UP75929", "date": "2026-04-20", "action": "viable", "notes": ""}
+
+Saving an action appends one line; the log is never rewritten. A later
+line for the same pair supersedes the earlier one. The index maps each
+reviewed pair (packed into one int64 key) to the byte offset of its latest
+line and is stored next to the log with the offset it covers, so opening
+the log only parses lines appended since the index was saved:
+
+    out/review_log.jsonl
+    out/review_log_index.npz
+
+Marking reviewed pairs is one vectorized anti-join:
+
+    log = ReviewLog()
+    unreviewed = pairs[~log.reviewed_mask(pairs['mp_id'], pairs['up_id'])]
+"""
+
+import os
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from pair_store import encode_case_ids
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.environ.get('OUT_DIR', os.path.join(ROOT, 'out'))
+REVIEW_LOG_PATH = os.path.join(OUT_DIR, 'review_log.jsonl')
+
+# review_matches.py wrote this CSV (rewritten on every action) before the JSONL log
+LEGACY_CSV_PATH = os.path.join(OUT_DIR, 'review_log.csv')
+
+COLUMNS = ['mp_id', 'up_id', 'date', 'action', 'notes']
+
+# Bump when the index file layout changes
+INDEX_VERSION = 1
+
+
+def pair_keys(mp_ids, up_ids):
+    """Pack NamUs id pairs ('MP...', 'UP...') into int64 keys."""
+    mp = encode_case_ids(mp_ids, 'MP').astype(np.int64)
+    up = encode_case_ids(up_ids, 'UP').astype(np.int64)
+    return (mp << 32) | up
+
+
+def pair_key(mp_id, up_id):
+    """pair_keys() for a single pair, without the array overhead."""
+    mp_id, up_id = str(mp_id), str(up_id)
+    if not (mp_id.startswith('MP') and mp_id[2:].isdigit() and
+            up_id.startswith('UP') and up_id[2:].isdigit()):
+        return int(pair_keys([mp_id], [up_id])[0])  # raises the usual ValueError
+    return (int(mp_id[2:]) << 32) | int(up_id[2:])
+
+
+def index_path_for(path):
+    return os.path.splitext(path)[0] + '_index.npz'
+
+
+class ReviewLog:
+    """
+    Review decisions keyed by (mp_id, up_id).
+
+    Args:
+        path: JSONL log (default: REVIEW_LOG_PATH); created on first append
+    """
+
+    def __init__(self, path=REVIEW_LOG_PATH):
+        self.path = path
+        self.index_path = index_path_for(path)
+        self._offsets = {}  # pair key -> byte offset of its latest line
+        self._end = 0  # log bytes covered by _offsets
+        self._keys = None  # sorted key array, rebuilt lazily after appends
+        self._load()
+
+    def _load(self):
+        """Load the saved index and catch up on lines appended after it."""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if os.path.exists(self.index_path):
+            saved = np.load(self.index_path)
+            if int(saved['version']) == INDEX_VERSION and int(saved['end']) <= size:
+                self._offsets = dict(zip(saved['keys'].tolist(), saved['offsets'].tolist()))
+                self._end = int(saved['end'])
+        if size > self._end:
+            self._scan(self._end)
+            self.save_index()
+
+    def _scan(self, start):
+        """Index the lines from byte offset start on; a partial last line is left out."""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        lines, offsets, position = [], [], start
+        for line in data[:end].splitlines(keepends=True):
+            if line.strip():
+                record = json.loads(line)
+                lines.append((record['mp_id'], record['up_id']))
+                offsets.append(position)
+            position += len(line)
+        if lines:
+            mp_ids, up_ids = zip(*lines)
+            self._offsets.update(zip(pair_keys(mp_ids, up_ids).tolist(), offsets))
+        self._end = start + end
+        self._keys = None
+
+    def save_index(self):
+        """Persist the pair index (written to a temp file, then renamed)."""
+        keys = np.fromiter(self._offsets, dtype=np.int64, count=len(self._offsets))
+        offsets = np.fromiter(self._offsets.values(), dtype=np.int64, count=len(self._offsets))
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        tmp_path = self.index_path + '.tmp.npz'
+        np.savez(tmp_path, version=INDEX_VERSION, end=self._end, keys=keys, offsets=offsets)
+        os.replace(tmp_path, self.index_path)
+
+    def append(self, mp_id, up_id, action, notes=''):
+        """
+        Record one review action (O(1): one appended line, one index entry).
+
+        Returns:
+            The record written
+        """
+        record = {'mp_id': mp_id, 'up_id': up_id, 'date': date.today().isoformat(),
+                  'action': action, 'notes': notes}
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(line)
+        if offset > self._end:
+            # Another session appended since we last indexed: index its
+            # lines (and ours) before moving _end past them
+            self._scan(self._end)
+        key = pair_key(mp_id, up_id)
+        if key not in self._offsets:
+            self._keys = None
+        self._offsets[key] = offset
+        self._end = max(self._end, offset + len(line))
+        return record
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, pair):
+        return pair_key(*pair) in self._offsets
+
+    def get(self, mp_id, up_id):
+        """Latest review record of a pair, or None if it was never reviewed."""
+        offset = self._offsets.get(pair_key(mp_id, up_id))
+        if offset is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def reviewed_mask(self, mp_ids, up_ids):
+        """Boolean array: which (mp_id, up_id) pairs have a review record."""
+        if not self._offsets:
+            return np.zeros(len(mp_ids), dtype=bool)
+        if self._keys is None:
+            self._keys = np.sort(np.fromiter(self._offsets, dtype=np.int64, count=len(self._offsets)))
+        return np.isin(pair_keys(mp_ids, up_ids), self._keys, assume_unique=False)
+
+    def to_frame(self):
+        """Every logged action, oldest first."""
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.read_json(self.path, lines=True, dtype=False)[COLUMNS]
+
+
+def import_csv_log(csv_path=LEGACY_CSV_PATH, path=REVIEW_LOG_PATH):
+    """
+    Convert a review_log.csv from before the JSONL log, once.
+
+    Returns:
+        Number of actions imported (0 if there was nothing to convert)
+    """
+    if os.path.exists(path) or not os.path.exists(csv_path):
+        return 0
+    legacy = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        for record in legacy.reindex(columns=COLUMNS, fill_value='').to_dict('records'):
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+    return len(legacy)
+
+
+def main():
+    """Benchmark appends, reopening and the reviewed-pair anti-join on a scratch log."""
+    import time
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    n_log, n_pairs = 50_000, 1_000_000
+    mp_ids = np.char.add('MP', rng.integers(1, 160_000, n_pairs).astype(str))
+    up_ids = np.char.add('UP', rng.integers(1, 160_000, n_pairs).astype(str))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'review_log.jsonl')
+
+        log = ReviewLog(path)
+        start = time.perf_counter()
+        for mp_id, up_id in zip(mp_ids[:n_log], up_ids[:n_log]):
+            log.append(mp_id, up_id, 'ruled_out')
+        elapsed = time.perf_counter() - start
+        print(f"{n_log:,} appends: {elapsed:.2f}s ({elapsed / n_log * 1e6:.0f} µs each)")
+        log.save_index()
+
+        log.append(mp_ids[0], up_ids[0], 'viable', 'second look')
+        start = time.perf_counter()
+        log = ReviewLog(path)
+        print(f"Reopen with saved index: {(time.perf_counter() - start) * 1000:.1f} ms ({len(log):,} pairs)")
+        assert log.get(mp_ids[0], up_ids[0])['action'] == 'viable'
+
+        os.remove(index_path_for(path))
+        start = time.perf_counter()
+        rebuilt = ReviewLog(path)
+        print(f"Reopen rebuilding index: {(time.perf_counter() - start) * 1000:.1f} ms")
+        assert rebuilt._offsets == log._offsets
+
+        start = time.perf_counter()
+        reviewed = log.reviewed_mask(mp_ids, up_ids)
+        print(f"Anti-join over {n_pairs:,} pairs: {time.perf_counter() - start:.2f}s "
+              f"({reviewed.sum():,} reviewed)")
+        assert reviewed[:n_log].all()
+
+        frame = pd.DataFrame({'mp_id': mp_ids, 'up_id': up_ids})
+        start = time.perf_counter()
+        seen = set(zip(log.to_frame()['mp_id'], log.to_frame()['up_id']))
+        old = frame.apply(lambda r: (r['mp_id'], r['up_id']) in seen, axis=1).to_numpy()
+        print(f"Previous row-wise apply: {time.perf_counter() - start:.2f}s")
+        assert (old == reviewed).all()
+
+
+if __name__ == '__main__':
+    main()
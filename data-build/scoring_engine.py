@@ -0,0 +1,349 @@
+"""
+Streaming scoring engine for candidate pairs.
+
+Scores MP <-> UP candidate pairs batch by batch instead of loading and
+merging every pair at once:
+
+1. Counting pass: match counts per MP/UP are tallied from the id columns
+   only (after the infant filter), which is all the uniqueness boost and
+   the <=15 hard filter need.
+2. Scoring pass: each batch is filtered on those counts first, and only the
+   surviving pairs are merged with case attributes and scored.
+
+Peak memory is bounded by the batch size plus the (small) set of surviving
+pairs, not by the size of the candidate pair set.
+
+Usage:
+    engine = ScoringEngine(mp, up)
+    engine.count(iter_pair_batches(OUT_DIR, columns=['mp_id', 'up_id']))
+    for scored in engine.score_batches(iter_pair_batches(OUT_DIR, columns=['mp_id', 'up_id'])):
+        ...
+
+Batches are DataFrames with integer-coded mp_id/up_id columns as stored by
+pair_store. Case attributes are integer-coded once per case
+(case_encoding.build_dimension_tables), so scoring compares codes looked up
+by row; the string columns are only attached to the scored output.
+"""
+
+import numpy as np
+import pandas as pd
+
+from case_encoding import EMPTY_CODE, build_dimension_tables
+from pair_store import ID_PREFIXES, decode_case_ids, encode_case_ids
+from rarity_scoring import calculate_combined_rarity_boosts, calculate_rarity_scores
+
+WEIGHTS = {'sex': 2.0, 'age': 1.5, 'geography': 2.0, 'race': 0.8, 'temporal': 1.2}
+
+# HARD FILTER: only keep matches where BOTH sides have <= this many candidates
+MAX_MATCHES = 15
+
+MP_COLUMNS = ['id', 'sex', 'age_min', 'race', 'state', 'county', 'city',
+              'last_seen_days', 'last_seen_date', 'first_name', 'last_name']
+UP_COLUMNS = ['id', 'sex', 'age_min', 'age_max', 'race', 'state', 'county', 'city',
+              'found_days', 'mec_case']
+
+
+def _same(mp_code, up_code):
+    """Code equality; missing codes (-1) never match."""
+    return (mp_code == up_code) & (mp_code >= 0)
+
+
+# Component 1: Sex Match Score (sex codes; unknown_code is the code of 'Unknown')
+def vec_sex_score(mp_sex, up_sex, unknown_code):
+    result = np.where(_same(mp_sex, up_sex), 1.0, 0.0)
+    result = np.where((mp_sex == unknown_code) | (up_sex == unknown_code), 0.5, result)
+    return result
+
+
+# Component 2: Age Similarity (with projection)
+def vec_age_score(mp_age, up_min, up_max, years_between):
+    # Project MP age forward
+    mp_projected = np.where(
+        pd.notna(years_between) & (years_between >= 0),
+        mp_age + years_between,
+        mp_age
+    )
+
+    # MP range (±2 years)
+    mp_min = mp_projected - 2
+    mp_max = mp_projected + 2
+
+    # Calculate overlap
+    overlap_start = np.maximum(mp_min, up_min)
+    overlap_end = np.minimum(mp_max, up_max)
+    overlap = np.maximum(0, overlap_end - overlap_start + 1)
+
+    # Normalize by range size
+    mp_range = mp_max - mp_min + 1
+    up_range = up_max - up_min + 1
+    avg_range = (mp_range + up_range) / 2.0
+
+    score = np.minimum(1.0, overlap / avg_range)
+
+    # Handle no overlap with exponential decay
+    gap = np.minimum(np.abs(mp_min - up_max), np.abs(up_min - mp_max))
+    no_overlap_score = np.maximum(0, 0.5 * np.exp(-gap / 5.0))
+
+    result = np.where(overlap > 0, score, no_overlap_score)
+
+    # Default to 0.5 if data missing
+    result = np.where(pd.isna(mp_age) | pd.isna(up_min) | pd.isna(up_max), 0.5, result)
+
+    return result
+
+
+# Component 3: Geographic Score (dimension codes; county codes are per state)
+def vec_geo_score(mp_state, mp_county, mp_city, up_state, up_county, up_city):
+    state_match = _same(mp_state, up_state)
+    county_match = state_match & _same(mp_county, up_county)
+
+    # Same city + county
+    same_city_county = county_match & _same(mp_city, up_city) & (mp_city != EMPTY_CODE)
+
+    # Same county
+    same_county = county_match & (mp_county != EMPTY_CODE)
+
+    # Same state
+    same_state = state_match & (mp_state != EMPTY_CODE)
+
+    score = np.where(same_city_county, 1.0,
+            np.where(same_county, 0.85,
+            np.where(same_state, 0.3, 0.0)))
+
+    return score
+
+
+# Component 4: Race Match (race codes)
+def vec_race_score(mp_race, up_race):
+    result = np.where(_same(mp_race, up_race), 1.0, 0.3)
+    result = np.where((mp_race == EMPTY_CODE) | (up_race == EMPTY_CODE), 0.5, result)
+
+    return result
+
+
+# Component 5: Temporal Score
+def vec_temporal_score(days_gap):
+    result = np.where(days_gap <= 30, 1.0,
+            np.where(days_gap <= 180, 0.8,
+            np.where(days_gap <= 365, 0.6,
+            np.where(days_gap <= 1825, 0.4,
+            0.4 * np.exp(-(days_gap - 1825) / 3650)))))
+
+    result = np.where(pd.isna(days_gap), 0.5, result)
+
+    return result
+
+
+def vec_uniqueness_boost(mp_count, up_count):
+    # Much more aggressive boost for truly unique matches
+    boost = np.zeros(len(mp_count))
+    # MP side: 1-2 matches = 0.25, 3-5 = 0.15, 6-10 = 0.08, 11-15 = 0.03
+    boost += np.where(mp_count <= 2, 0.25, np.where(mp_count <= 5, 0.15, np.where(mp_count <= 10, 0.08, 0.03)))
+    # UP side: 1-2 matches = 0.25, 3-5 = 0.15, 6-10 = 0.08, 11-15 = 0.03
+    boost += np.where(up_count <= 2, 0.25, np.where(up_count <= 5, 0.15, np.where(up_count <= 10, 0.08, 0.03)))
+    return boost
+
+
+def vec_era_boost(last_seen_date):
+    # Parse dates and extract year
+    dates = pd.to_datetime(last_seen_date, errors='coerce')
+    years = dates.dt.year
+
+    # Boost for 1980-2006 era (better data quality, active investigation period)
+    boost = np.where((years >= 1980) & (years <= 2006), 0.10, 0.0)
+
+    return boost
+
+
+class ScoringEngine:
+    """
+    Scores candidate pair batches against the MP/UP master data.
+
+    Args:
+        mp: MP master DataFrame with last_seen_days
+        up: UP master DataFrame with found_days
+        max_matches: Hard filter on match counts for both sides
+        weights: Component weights (defaults to WEIGHTS)
+    """
+
+    def __init__(self, mp, up, max_matches=MAX_MATCHES, weights=None):
+        self.max_matches = max_matches
+        self.weights = dict(WEIGHTS, **(weights or {}))
+
+        self.mp = mp[MP_COLUMNS].rename(
+            columns={'sex': 'sex_mp', 'age_min': 'age_min_mp', 'race': 'race_mp',
+                     'state': 'state_mp', 'county': 'county_mp', 'city': 'city_mp'}
+        )
+        self.up = up[UP_COLUMNS].rename(
+            columns={'sex': 'sex_up', 'age_min': 'age_min_up', 'age_max': 'age_max_up', 'race': 'race_up',
+                     'state': 'state_up', 'county': 'county_up', 'city': 'city_up'}
+        )
+
+        # Per-case lookups indexed by NamUs case number (row -1: unknown case)
+        mp_codes = encode_case_ids(mp['id'], ID_PREFIXES['mp_id'])
+        up_codes = encode_case_ids(up['id'], ID_PREFIXES['up_id'])
+        self.mp_row = np.full(int(mp_codes.max(initial=0)) + 1, -1, dtype=np.int32)
+        self.mp_row[mp_codes] = np.arange(len(mp), dtype=np.int32)
+        self.up_row = np.full(int(up_codes.max(initial=0)) + 1, -1, dtype=np.int32)
+        self.up_row[up_codes] = np.arange(len(up), dtype=np.int32)
+        self.mp_known = self.mp_row >= 0
+        self.up_known = self.up_row >= 0
+
+        # Integer-coded attributes by row
+        self.mp_dims, self.up_dims, self.dimensions = build_dimension_tables(mp, up)
+        sex_values = self.dimensions['sex']
+        self.unknown_sex = sex_values.get_loc('Unknown') if 'Unknown' in sex_values else -2
+        self.mp_age = pd.to_numeric(mp['age_min'], errors='coerce').to_numpy(dtype=float)
+        self.up_age_min = pd.to_numeric(up['age_min'], errors='coerce').to_numpy(dtype=float)
+        self.up_age_max = pd.to_numeric(up['age_max'], errors='coerce').to_numpy(dtype=float)
+        self.mp_days = pd.to_numeric(mp['last_seen_days'], errors='coerce').to_numpy()
+        self.up_days = pd.to_numeric(up['found_days'], errors='coerce').to_numpy()
+
+        # Definite infants (age 0-1) are removed before counting
+        self.up_infant = np.zeros(len(self.up_known), dtype=bool)
+        age_max = up['age_max'].to_numpy(dtype=float)
+        self.up_infant[up_codes] = ~np.isnan(age_max) & (age_max <= 1)
+        self.up_missing_age = np.zeros(len(self.up_known), dtype=bool)
+        self.up_missing_age[up_codes] = up['age_min'].isna().to_numpy() | up['age_max'].isna().to_numpy()
+
+        self.mp_rarity = calculate_rarity_scores(mp, 'MP').reindex(mp['id']).fillna(0).to_numpy()
+        self.up_rarity = calculate_rarity_scores(up, 'UP').reindex(up['id']).fillna(0).to_numpy()
+        self.mp_era = vec_era_boost(mp['last_seen_date'])
+
+        self.mp_counts = None
+        self.up_counts = None
+        self.stats = {}
+
+    @staticmethod
+    def _lookup(table, codes):
+        """Index a per-case table, treating out-of-range case numbers as False."""
+        in_range = codes < len(table)
+        return in_range & table[np.where(in_range, codes, 0)]
+
+    def _valid_pairs(self, mp_codes, up_codes):
+        """Pairs whose cases both exist in the master data."""
+        return self._lookup(self.mp_known, mp_codes) & self._lookup(self.up_known, up_codes)
+
+    def count(self, batches):
+        """
+        Counting pass: tally matches per MP and UP across all batches.
+
+        Args:
+            batches: Iterable of DataFrames with integer mp_id/up_id
+
+        Returns:
+            (mp_counts, up_counts) arrays indexed by case number
+        """
+        mp_counts = np.zeros(len(self.mp_known), dtype=np.int64)
+        up_counts = np.zeros(len(self.up_known), dtype=np.int64)
+        stats = {'pairs': 0, 'infants': 0, 'needs_age_review': 0}
+
+        for batch in batches:
+            mp_codes = batch['mp_id'].to_numpy(dtype=np.int64)
+            up_codes = batch['up_id'].to_numpy(dtype=np.int64)
+
+            valid = self._valid_pairs(mp_codes, up_codes)
+            mp_codes, up_codes = mp_codes[valid], up_codes[valid]
+            infant = self.up_infant[up_codes]
+
+            stats['pairs'] += len(up_codes)
+            stats['infants'] += int(infant.sum())
+            stats['needs_age_review'] += int(self.up_missing_age[up_codes].sum())
+
+            mp_counts += np.bincount(mp_codes[~infant], minlength=len(mp_counts))
+            up_counts += np.bincount(up_codes[~infant], minlength=len(up_counts))
+
+        self.mp_counts, self.up_counts = mp_counts, up_counts
+        self.stats = stats
+        return mp_counts, up_counts
+
+    def score_batch(self, batch):
+        """
+        Score one batch of pairs, dropping infants and pairs over max_matches.
+
+        Returns:
+            DataFrame of scored pairs (string ids), possibly empty
+        """
+        if self.mp_counts is None:
+            raise RuntimeError("Run count() over all pairs before scoring")
+
+        mp_codes = batch['mp_id'].to_numpy(dtype=np.int64)
+        up_codes = batch['up_id'].to_numpy(dtype=np.int64)
+
+        keep = self._valid_pairs(mp_codes, up_codes)
+        mp_codes, up_codes = mp_codes[keep], up_codes[keep]
+        keep = (
+            ~self.up_infant[up_codes] &
+            (self.mp_counts[mp_codes] <= self.max_matches) &
+            (self.up_counts[up_codes] <= self.max_matches)
+        )
+        mp_codes, up_codes = mp_codes[keep], up_codes[keep]
+        mp_rows, up_rows = self.mp_row[mp_codes], self.up_row[up_codes]
+        mp_dims = {col: codes[mp_rows] for col, codes in self.mp_dims.items()}
+        up_dims = {col: codes[up_rows] for col, codes in self.up_dims.items()}
+
+        # Human-facing string columns are joined back by row position
+        pairs = pd.concat([
+            pd.DataFrame({
+                'mp_id': decode_case_ids(mp_codes, ID_PREFIXES['mp_id']),
+                'up_id': decode_case_ids(up_codes, ID_PREFIXES['up_id']),
+            }),
+            self.mp.iloc[mp_rows].drop(columns=['id']).reset_index(drop=True),
+            self.up.iloc[up_rows].drop(columns=['id']).reset_index(drop=True),
+        ], axis=1)
+
+        up_age_min, up_age_max = self.up_age_min[up_rows], self.up_age_max[up_rows]
+        pairs['needs_age_review'] = np.isnan(up_age_min) | np.isnan(up_age_max)
+
+        # Temporal gap in days and years
+        days_gap = self.up_days[up_rows] - self.mp_days[mp_rows]
+        pairs['days_gap'] = days_gap
+        pairs['years_between'] = days_gap / 365.25
+
+        pairs['sex_score'] = vec_sex_score(mp_dims['sex'], up_dims['sex'], self.unknown_sex)
+        pairs['age_score'] = vec_age_score(
+            self.mp_age[mp_rows], up_age_min, up_age_max, pairs['years_between'].to_numpy()
+        )
+        pairs['geo_score'] = vec_geo_score(
+            mp_dims['state'], mp_dims['county'], mp_dims['city'],
+            up_dims['state'], up_dims['county'], up_dims['city']
+        )
+        pairs['race_score'] = vec_race_score(mp_dims['race'], up_dims['race'])
+        pairs['temporal_score'] = vec_temporal_score(days_gap)
+
+        # Weighted average
+        weights = self.weights
+        pairs['weighted_sum'] = (
+            pairs['sex_score'] * weights['sex'] +
+            pairs['age_score'] * weights['age'] +
+            pairs['geo_score'] * weights['geography'] +
+            pairs['race_score'] * weights['race'] +
+            pairs['temporal_score'] * weights['temporal']
+        )
+        pairs['base_score'] = (pairs['weighted_sum'] / sum(weights.values())).clip(0, 1)
+
+        # Uniqueness boost
+        pairs['mp_match_count'] = self.mp_counts[mp_codes]
+        pairs['up_match_count'] = self.up_counts[up_codes]
+        pairs['uniqueness_boost'] = vec_uniqueness_boost(pairs['mp_match_count'], pairs['up_match_count'])
+
+        # Rarity boost
+        pairs['mp_rarity'] = self.mp_rarity[mp_rows]
+        pairs['up_rarity'] = self.up_rarity[up_rows]
+        pairs['rarity_boost'] = calculate_combined_rarity_boosts(pairs['mp_rarity'], pairs['up_rarity'])
+
+        # Era boost (1980-2006 priority)
+        pairs['era_boost'] = self.mp_era[mp_rows]
+
+        pairs['final_score'] = (
+            pairs['base_score'] + pairs['uniqueness_boost'] + pairs['rarity_boost'] + pairs['era_boost']
+        ).clip(0, 1)
+
+        return pairs
+
+    def score_batches(self, batches):
+        """Yield scored DataFrames for each non-empty batch."""
+        for batch in batches:
+            scored = self.score_batch(batch)
+            if len(scored) > 0:
+                yield scored
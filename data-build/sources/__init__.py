@@ -14,17 +14,19 @@ Usage:
     from sources import NamusSource, UnifiedSchema
 
     source = NamusSource()
-    mp_cases = source.load_missing_persons('path/to/namus_mp.csv')
+    mp_cases = source.load_missing_persons('path/to/namus_mp.csv')    # CaseTable
     up_cases = source.load_unidentified_persons('path/to/namus_up.csv')
+    case = mp_cases[0]                                                # UnifiedCase
 """
 
-from .base import DataSource, UnifiedCase, CaseType, ValidationResult
+from .base import DataSource, UnifiedCase, CaseTable, CaseType, ValidationResult
 from .namus import NamusSource
 from .schema import UnifiedSchema
 
 __all__ = [
     'DataSource',
     'UnifiedCase',
+    'CaseTable',
     'CaseType',
     'ValidationResult',
     'NamusSource',
@@ -5,13 +5,28 @@ Defines the abstract DataSource interface and unified data schema
 that all data sources must conform to.
 """
 
+import io
+import sys
+import csv
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import date
 from enum import Enum
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Any, Union
+import numpy as np
 import pandas as pd
 
+from .schema import UnifiedSchema
+
+
+# Columns of the unified-schema DataFrame (UnifiedCase.to_dict order)
+UNIFIED_COLUMNS = [
+    'id', 'source_id', 'source', 'case_type', 'sex', 'race', 'age_min', 'age_max',
+    'city', 'county', 'state', 'country', 'event_date', 'first_name', 'last_name',
+    'mec_case', 'date_modified',
+]
+
 
 class CaseType(Enum):
     """Type of case in the system."""
@@ -26,13 +41,14 @@ class Sex(Enum):
     UNKNOWN = "Unknown"
 
 
-@dataclass
+@dataclass(slots=True)
 class UnifiedCase:
     """
     Unified case representation across all data sources.
 
     All data sources must map their data to this schema to enable
-    cross-source matching and analysis.
+    cross-source matching and analysis. Loaded cases are stored in a
+    CaseTable; a UnifiedCase is built when a row is accessed.
     """
     # Identifiers
     source_id: str              # Original ID from source (e.g., "12345")
@@ -62,7 +78,9 @@ class UnifiedCase:
 
     # Metadata
     date_modified: Optional[date] = None
-    raw_data: Dict[str, Any] = field(default_factory=dict)
+    raw_data: Optional[Dict[str, Any]] = None  # Source row, if kept in memory
+    raw_path: Optional[str] = None             # Or: source file and byte offset of the row
+    raw_offset: Optional[int] = None
 
     def __post_init__(self):
         """Generate unified_id if not provided."""
@@ -88,6 +106,57 @@ class UnifiedCase:
         parts = [p for p in [self.city, self.county, self.state] if p]
         return ", ".join(parts)
 
+    @classmethod
+    def from_record(cls, record: Dict[str, Any], raw_data: Optional[Dict[str, Any]] = None) -> 'UnifiedCase':
+        """
+        Build a case from one row of a unified-schema DataFrame.
+
+        Args:
+            record: Row dict with UNIFIED_COLUMNS keys (missing values as NaN/NaT/None)
+            raw_data: Original source row, if kept
+
+        Returns:
+            UnifiedCase object
+        """
+        def value(name, default=None):
+            v = record.get(name, default)
+            return default if v is None or (not isinstance(v, str) and pd.isna(v)) else v
+
+        def as_date(name):
+            v = value(name)
+            return pd.Timestamp(v).date() if v is not None else None
+
+        def as_int(name):
+            v = value(name)
+            return int(v) if v is not None else None
+
+        return cls(
+            source_id=value('source_id', ''),
+            source_name=value('source', ''),
+            case_type=CaseType(record['case_type']),
+            unified_id=value('id', ''),
+            sex=value('sex', 'Unknown'),
+            race=value('race', ''),
+            age_min=as_int('age_min'),
+            age_max=as_int('age_max'),
+            city=value('city', ''),
+            county=value('county', ''),
+            state=value('state', ''),
+            country=value('country', 'US'),
+            event_date=as_date('event_date'),
+            first_name=value('first_name', ''),
+            last_name=value('last_name', ''),
+            mec_case=value('mec_case', ''),
+            date_modified=as_date('date_modified'),
+            raw_data=raw_data,
+        )
+
+    def load_raw_data(self) -> Optional[Dict[str, Any]]:
+        """Source row: raw_data, or read from raw_path at raw_offset (None if not kept)."""
+        if self.raw_data is None and self.raw_path and self.raw_offset is not None:
+            return read_csv_record(self.raw_path, self.raw_offset)
+        return self.raw_data
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for DataFrame creation."""
         return {
@@ -111,6 +180,226 @@ class UnifiedCase:
         }
 
 
+def csv_record_offsets(path: str) -> np.ndarray:
+    """
+    Byte offset of every data record in a CSV file (header excluded).
+
+    Record boundaries are newlines outside quoted fields, found with one
+    pass over the bytes; blank lines are skipped, as pandas does.
+
+    Args:
+        path: Path to CSV file
+
+    Returns:
+        int64 array, one offset per row pandas.read_csv would return
+    """
+    with open(path, 'rb') as f:
+        data = np.frombuffer(f.read(), dtype=np.uint8)
+    newlines = np.flatnonzero(data == ord('\n'))
+    in_quotes = np.cumsum(data == ord('"'))[newlines] % 2 == 1
+    starts = np.concatenate([[0], newlines[~in_quotes] + 1])
+    starts = starts[starts < len(data)]
+    starts = starts[(data[starts] != ord('\n')) & (data[starts] != ord('\r'))]
+    return starts[1:].astype(np.int64)
+
+
+@lru_cache(maxsize=32)
+def _csv_header(path: str) -> tuple:
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return tuple(next(csv.reader(f)))
+
+
+def read_csv_record(path: str, offset: int) -> Dict[str, str]:
+    """
+    Read one CSV record starting at a byte offset (see csv_record_offsets).
+
+    Returns:
+        Dict of header column -> value ('' when empty)
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        values = next(csv.reader(io.TextIOWrapper(f, encoding='utf-8', newline='')))
+    return dict(zip(_csv_header(path), values))
+
+
+class CaseTable:
+    """
+    Collection of cases stored as parallel typed arrays, one per field.
+
+    Repeated text (source, sex, race, city, county, state, ...) is held as
+    pandas Categoricals, ages as int16 (AGE_MISSING when unknown) and
+    dates as datetime64[D] (NaT when unknown). Source rows are not kept;
+    a table loaded with keep_raw records each row's file and byte offset
+    instead. Indexing with an int returns a UnifiedCase for that row;
+    slices and boolean masks return a CaseTable.
+    """
+
+    CATEGORY_COLUMNS = ['source', 'case_type', 'sex', 'race', 'city', 'county', 'state', 'country', 'raw_path']
+    TEXT_COLUMNS = ['id', 'source_id', 'first_name', 'last_name', 'mec_case']
+    AGE_COLUMNS = ['age_min', 'age_max']
+    DATE_COLUMNS = ['event_date', 'date_modified']
+    AGE_MISSING = -1
+
+    def __init__(self, columns: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            columns: Field name -> array, as built by from_frame (empty table if not provided)
+        """
+        if columns is None:
+            columns = CaseTable.from_frame(pd.DataFrame(columns=UNIFIED_COLUMNS))._columns
+        self._columns = columns
+
+    @classmethod
+    def from_frame(
+        cls,
+        frame: pd.DataFrame,
+        raw_path: Optional[str] = None,
+        raw_offsets: Optional[np.ndarray] = None
+    ) -> 'CaseTable':
+        """
+        Build a table from a unified-schema DataFrame.
+
+        Args:
+            frame: DataFrame with UNIFIED_COLUMNS (ages numeric, dates as
+                datetimes or ISO strings)
+            raw_path: Source file the rows came from (or one path per row)
+            raw_offsets: Byte offset of each row in raw_path
+
+        Returns:
+            CaseTable
+        """
+        n = len(frame)
+        columns = {}
+        for name in cls.CATEGORY_COLUMNS + cls.TEXT_COLUMNS:
+            if name == 'raw_path':
+                values = np.asarray(raw_path if raw_path is not None else '', dtype=object)
+                values = np.broadcast_to(values, (n,)) if values.ndim == 0 else values
+            else:
+                values = frame[name].fillna('').to_numpy(dtype=object)
+            columns[name] = pd.Categorical(values) if name in cls.CATEGORY_COLUMNS else values
+        for name in cls.AGE_COLUMNS:
+            ages = pd.to_numeric(frame[name], errors='coerce')
+            columns[name] = ages.fillna(cls.AGE_MISSING).to_numpy().astype(np.int16)
+        for name in cls.DATE_COLUMNS:
+            dates = pd.to_datetime(frame[name], errors='coerce')
+            columns[name] = dates.to_numpy().astype('datetime64[D]')
+        columns['raw_offset'] = (np.asarray(raw_offsets, dtype=np.int64) if raw_offsets is not None
+                                 else np.full(n, -1, dtype=np.int64))
+        return cls(columns)
+
+    @classmethod
+    def from_cases(cls, cases: Iterable[UnifiedCase]) -> 'CaseTable':
+        """Build a table from UnifiedCase objects (raw_data dicts are not kept)."""
+        cases = list(cases)
+        frame = pd.DataFrame([c.to_dict() for c in cases], columns=UNIFIED_COLUMNS)
+        offsets = [c.raw_offset if c.raw_offset is not None else -1 for c in cases]
+        return cls.from_frame(frame, [c.raw_path or '' for c in cases], offsets)
+
+    @classmethod
+    def concat(cls, tables: Iterable['CaseTable']) -> 'CaseTable':
+        """Concatenate tables, merging their categories."""
+        tables = list(tables)
+        if not tables:
+            return cls()
+        columns = {}
+        for name, first in tables[0]._columns.items():
+            parts = [t._columns[name] for t in tables]
+            if isinstance(first, pd.Categorical):
+                columns[name] = pd.api.types.union_categoricals(parts)
+            else:
+                columns[name] = np.concatenate(parts)
+        return cls(columns)
+
+    def extend(self, other: 'CaseTable'):
+        """Append the rows of another table."""
+        self._columns = CaseTable.concat([self, other])._columns
+
+    def __len__(self) -> int:
+        return len(self._columns['id'])
+
+    def __iter__(self):
+        # Convert each column to Python values once, not per row
+        columns = {name: np.asarray(values).tolist() for name, values in self._columns.items()}
+        for i in range(len(self)):
+            yield self._make_case({name: values[i] for name, values in columns.items()})
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self.case(key)
+        return CaseTable({name: values[key] for name, values in self._columns.items()})
+
+    def column(self, name: str) -> Union[np.ndarray, pd.Categorical]:
+        """The array holding one field."""
+        return self._columns[name]
+
+    def case(self, i: int) -> UnifiedCase:
+        """Row i as a UnifiedCase."""
+        return self._make_case({name: np.asarray(values[i]).item() if not isinstance(values, pd.Categorical)
+                                else values[i] for name, values in self._columns.items()})
+
+    def _make_case(self, row: Dict[str, Any]) -> UnifiedCase:
+        """UnifiedCase from one row of column values (dates as date/None)."""
+        def age(name):
+            return row[name] if row[name] != self.AGE_MISSING else None
+
+        return UnifiedCase(
+            source_id=row['source_id'],
+            source_name=row['source'],
+            case_type=CaseType(row['case_type']),
+            unified_id=row['id'],
+            sex=row['sex'],
+            race=row['race'],
+            age_min=age('age_min'),
+            age_max=age('age_max'),
+            city=row['city'],
+            county=row['county'],
+            state=row['state'],
+            country=row['country'],
+            event_date=row['event_date'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            mec_case=row['mec_case'],
+            date_modified=row['date_modified'],
+            raw_path=row['raw_path'] or None,
+            raw_offset=row['raw_offset'] if row['raw_offset'] >= 0 else None,
+        )
+
+    def raw_data(self, i: int) -> Optional[Dict[str, str]]:
+        """Source row of case i, read from its file (None if not kept)."""
+        return self.case(i).load_raw_data()
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Unified-schema DataFrame: text as str, ages as Int64, dates as
+        datetime64 (the layout of the load_*_frame methods).
+        """
+        c = self._columns
+        data = {}
+        for name in UNIFIED_COLUMNS:
+            values = c[name]
+            if name in self.AGE_COLUMNS:
+                data[name] = pd.array(values, dtype='Int64')
+                data[name][values == self.AGE_MISSING] = pd.NA
+            elif name in self.DATE_COLUMNS:
+                data[name] = values.astype('datetime64[ns]')
+            else:
+                data[name] = np.asarray(values, dtype=object)
+        return pd.DataFrame(data, columns=UNIFIED_COLUMNS)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays, including the str objects."""
+        total = 0
+        for name, values in self._columns.items():
+            if isinstance(values, pd.Categorical):
+                total += values.codes.nbytes + sum(sys.getsizeof(v) for v in values.categories)
+            elif values.dtype == object:
+                total += values.nbytes + sum(sys.getsizeof(v) for v in values)
+            else:
+                total += values.nbytes
+        return total
+
+
 @dataclass
 class ValidationResult:
     """Result of validating a case."""
@@ -147,7 +436,7 @@ class DataSource(ABC):
             name: Human-readable name of the data source
         """
         self.name = name
-        self._cases: List[UnifiedCase] = []
+        self._cases = CaseTable()
 
     @property
     def source_name(self) -> str:
@@ -155,28 +444,30 @@ class DataSource(ABC):
         return self.name.upper().replace(" ", "_")
 
     @abstractmethod
-    def load_missing_persons(self, path: str) -> List[UnifiedCase]:
+    def load_missing_persons(self, path: str, keep_raw: bool = False) -> CaseTable:
         """
         Load missing persons data from source.
 
         Args:
             path: Path to data file
+            keep_raw: Record each case's source row location (see UnifiedCase.load_raw_data)
 
         Returns:
-            List of UnifiedCase objects
+            CaseTable of the loaded cases
         """
         pass
 
     @abstractmethod
-    def load_unidentified_persons(self, path: str) -> List[UnifiedCase]:
+    def load_unidentified_persons(self, path: str, keep_raw: bool = False) -> CaseTable:
         """
         Load unidentified persons data from source.
 
         Args:
             path: Path to data file
+            keep_raw: Record each case's source row location (see UnifiedCase.load_raw_data)
 
         Returns:
-            List of UnifiedCase objects
+            CaseTable of the loaded cases
         """
         pass
 
@@ -194,10 +485,35 @@ class DataSource(ABC):
         """
         pass
 
+    def cases_from_frame(self, frame: pd.DataFrame) -> CaseTable:
+        """
+        Wrap a unified-schema DataFrame as a CaseTable; UnifiedCase
+        objects are built only for the rows accessed.
+
+        Args:
+            frame: DataFrame as returned by a load_*_frame method
+
+        Returns:
+            CaseTable
+        """
+        return CaseTable.from_frame(frame)
+
+    def _as_table(self, cases) -> CaseTable:
+        """CaseTable for a table, DataFrame or list of cases (self._cases if None)."""
+        if cases is None:
+            return self._cases
+        if isinstance(cases, CaseTable):
+            return cases
+        if isinstance(cases, pd.DataFrame):
+            return CaseTable.from_frame(cases)
+        return CaseTable.from_cases(cases)
+
     def validate_case(self, case: UnifiedCase) -> ValidationResult:
         """
         Validate a case meets minimum quality requirements.
 
+        For many cases use validate_cases, which checks whole columns.
+
         Args:
             case: Case to validate
 
@@ -227,55 +543,56 @@ class DataSource(ABC):
 
         return result
 
-    def to_dataframe(self, cases: Optional[List[UnifiedCase]] = None) -> pd.DataFrame:
+    def validate_cases(self, cases: Optional[Union[CaseTable, List[UnifiedCase]]] = None) -> pd.DataFrame:
         """
-        Convert cases to pandas DataFrame.
+        Validate all cases at once against the unified schema.
 
         Args:
-            cases: List of cases (uses self._cases if not provided)
+            cases: CaseTable or list of cases (uses self._cases if not provided)
 
         Returns:
-            DataFrame with unified schema
+            Violation table (row, field, code) from UnifiedSchema.find_violations;
+            UnifiedSchema.error_mask tells errors from warnings
         """
-        if cases is None:
-            cases = self._cases
+        return UnifiedSchema.find_violations(self._as_table(cases).to_frame())
 
-        if not cases:
-            return pd.DataFrame()
+    def to_dataframe(self, cases: Optional[Union[CaseTable, List[UnifiedCase]]] = None) -> pd.DataFrame:
+        """
+        Convert cases to pandas DataFrame.
+
+        Args:
+            cases: CaseTable or list of cases (uses self._cases if not provided)
 
-        return pd.DataFrame([c.to_dict() for c in cases])
+        Returns:
+            DataFrame with unified schema (see CaseTable.to_frame)
+        """
+        return self._as_table(cases).to_frame()
 
-    def get_statistics(self, cases: Optional[List[UnifiedCase]] = None) -> Dict[str, Any]:
+    def get_statistics(self, cases: Optional[Union[CaseTable, List[UnifiedCase]]] = None) -> Dict[str, Any]:
         """
         Get summary statistics for loaded cases.
 
         Args:
-            cases: List of cases (uses self._cases if not provided)
+            cases: CaseTable or list of cases (uses self._cases if not provided)
 
         Returns:
             Dict with statistics
         """
-        if cases is None:
-            cases = self._cases
+        table = self._as_table(cases)
 
-        if not cases:
+        if not len(table):
             return {'count': 0}
 
-        mp_cases = [c for c in cases if c.case_type == CaseType.MISSING_PERSON]
-        up_cases = [c for c in cases if c.case_type == CaseType.UNIDENTIFIED_PERSON]
-
-        # State distribution
-        states = {}
-        for c in cases:
-            states[c.state] = states.get(c.state, 0) + 1
+        case_type = np.asarray(table.column('case_type'))
+        states = pd.Series(np.asarray(table.column('state'))).value_counts()
 
         return {
             'source': self.name,
-            'total_cases': len(cases),
-            'missing_persons': len(mp_cases),
-            'unidentified_persons': len(up_cases),
+            'total_cases': len(table),
+            'missing_persons': int((case_type == CaseType.MISSING_PERSON.value).sum()),
+            'unidentified_persons': int((case_type == CaseType.UNIDENTIFIED_PERSON.value).sum()),
             'states_covered': len(states),
-            'top_states': dict(sorted(states.items(), key=lambda x: -x[1])[:5]),
-            'has_dates': sum(1 for c in cases if c.event_date),
-            'has_age': sum(1 for c in cases if c.age_min is not None),
+            'top_states': {state: int(n) for state, n in states.head(5).items()},
+            'has_dates': int((~np.isnat(table.column('event_date'))).sum()),
+            'has_age': int((table.column('age_min') != CaseTable.AGE_MISSING).sum()),
         }
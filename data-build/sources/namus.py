@@ -7,10 +7,13 @@ Unidentified Persons System (NamUs).
 
 import os
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
+import numpy as np
 import pandas as pd
 
-from .base import DataSource, UnifiedCase, CaseType, ValidationResult
+from .base import (UNIFIED_COLUMNS, CaseTable, DataSource, UnifiedCase, CaseType, ValidationResult,
+                   csv_record_offsets)
+from .schema import UnifiedSchema
 
 
 class NamusSource(DataSource):
@@ -56,56 +59,172 @@ class NamusSource(DataSource):
         'Date Modified': 'date_modified',
     }
 
+    # Full state names as they appear in NamUs exports
+    STATE_NAME_MAP = {
+        'ALABAMA': 'AL', 'ALASKA': 'AK', 'ARIZONA': 'AZ', 'ARKANSAS': 'AR',
+        'CALIFORNIA': 'CA', 'COLORADO': 'CO', 'CONNECTICUT': 'CT',
+        'DELAWARE': 'DE', 'FLORIDA': 'FL', 'GEORGIA': 'GA', 'HAWAII': 'HI',
+        'IDAHO': 'ID', 'ILLINOIS': 'IL', 'INDIANA': 'IN', 'IOWA': 'IA',
+        'KANSAS': 'KS', 'KENTUCKY': 'KY', 'LOUISIANA': 'LA', 'MAINE': 'ME',
+        'MARYLAND': 'MD', 'MASSACHUSETTS': 'MA', 'MICHIGAN': 'MI',
+        'MINNESOTA': 'MN', 'MISSISSIPPI': 'MS', 'MISSOURI': 'MO',
+        'MONTANA': 'MT', 'NEBRASKA': 'NE', 'NEVADA': 'NV',
+        'NEW HAMPSHIRE': 'NH', 'NEW JERSEY': 'NJ', 'NEW MEXICO': 'NM',
+        'NEW YORK': 'NY', 'NORTH CAROLINA': 'NC', 'NORTH DAKOTA': 'ND',
+        'OHIO': 'OH', 'OKLAHOMA': 'OK', 'OREGON': 'OR', 'PENNSYLVANIA': 'PA',
+        'RHODE ISLAND': 'RI', 'SOUTH CAROLINA': 'SC', 'SOUTH DAKOTA': 'SD',
+        'TENNESSEE': 'TN', 'TEXAS': 'TX', 'UTAH': 'UT', 'VERMONT': 'VT',
+        'VIRGINIA': 'VA', 'WASHINGTON': 'WA', 'WEST VIRGINIA': 'WV',
+        'WISCONSIN': 'WI', 'WYOMING': 'WY', 'DISTRICT OF COLUMBIA': 'DC',
+        'PUERTO RICO': 'PR', 'GUAM': 'GU', 'VIRGIN ISLANDS': 'VI',
+    }
+
+    # Date formats tried in order
+    DATE_FORMATS = [
+        '%m/%d/%Y',
+        '%Y-%m-%d',
+        '%m-%d-%Y',
+        '%d/%m/%Y',
+        '%Y/%m/%d',
+    ]
+
+    # Columns of the Maria master CSVs (event_date is written as last_seen_date / found_date)
+    MP_MASTER_COLUMNS = ['id', 'first_name', 'last_name', 'sex', 'race', 'age_min', 'age_max',
+                         'last_seen_date', 'city', 'county', 'state', 'date_modified']
+    UP_MASTER_COLUMNS = ['id', 'mec_case', 'sex', 'race', 'age_min', 'age_max',
+                         'found_date', 'city', 'county', 'state', 'date_modified']
+
     def __init__(self):
         """Initialize NamUs data source."""
         super().__init__("NamUs")
 
-    def load_missing_persons(self, path: str) -> List[UnifiedCase]:
+    def load_missing_persons_frame(self, path: str) -> pd.DataFrame:
         """
-        Load missing persons data from NamUs CSV export.
+        Load missing persons data from NamUs CSV export as a DataFrame.
 
         Args:
             path: Path to NamUs MP CSV file
 
         Returns:
-            List of UnifiedCase objects
+            DataFrame with unified schema columns (see normalize_frame)
         """
-        df = pd.read_csv(path)
-        cases = []
+        return self.normalize_frame(self._read_csv(path), CaseType.MISSING_PERSON)
 
-        for _, row in df.iterrows():
-            try:
-                case = self.parse_row(row.to_dict(), CaseType.MISSING_PERSON)
-                cases.append(case)
-            except Exception as e:
-                print(f"Warning: Failed to parse MP row {row.get('Case Number', '?')}: {e}")
+    def load_unidentified_persons_frame(self, path: str) -> pd.DataFrame:
+        """
+        Load unidentified persons data from NamUs CSV export as a DataFrame.
 
-        self._cases.extend(cases)
-        return cases
+        Args:
+            path: Path to NamUs UP CSV file
 
-    def load_unidentified_persons(self, path: str) -> List[UnifiedCase]:
+        Returns:
+            DataFrame with unified schema columns (see normalize_frame)
         """
-        Load unidentified persons data from NamUs CSV export.
+        return self.normalize_frame(self._read_csv(path), CaseType.UNIDENTIFIED_PERSON)
+
+    def load_missing_persons(self, path: str, keep_raw: bool = False) -> CaseTable:
+        """
+        Load missing persons data from NamUs CSV export.
 
         Args:
-            path: Path to NamUs UP CSV file
+            path: Path to NamUs MP CSV file
+            keep_raw: Record each case's byte offset in the file so its
+                source row can be read back (UnifiedCase.load_raw_data)
 
         Returns:
-            List of UnifiedCase objects
+            CaseTable of the loaded cases
         """
-        df = pd.read_csv(path)
-        cases = []
+        return self._load_table(path, CaseType.MISSING_PERSON, keep_raw)
 
-        for _, row in df.iterrows():
-            try:
-                case = self.parse_row(row.to_dict(), CaseType.UNIDENTIFIED_PERSON)
-                cases.append(case)
-            except Exception as e:
-                print(f"Warning: Failed to parse UP row {row.get('Case Number', '?')}: {e}")
+    def load_unidentified_persons(self, path: str, keep_raw: bool = False) -> CaseTable:
+        """
+        Load unidentified persons data from NamUs CSV export.
 
+        Args:
+            path: Path to NamUs UP CSV file
+            keep_raw: Record each case's byte offset in the file so its
+                source row can be read back (UnifiedCase.load_raw_data)
+
+        Returns:
+            CaseTable of the loaded cases
+        """
+        return self._load_table(path, CaseType.UNIDENTIFIED_PERSON, keep_raw)
+
+    def _load_table(self, path: str, case_type: CaseType, keep_raw: bool) -> CaseTable:
+        """Load an export into a CaseTable and add it to the loaded cases."""
+        frame = self.normalize_frame(self._read_csv(path), case_type)
+        raw_path, raw_offsets = None, None
+        if keep_raw:
+            raw_offsets = csv_record_offsets(path)
+            if len(raw_offsets) == len(frame):
+                raw_path = path
+            else:
+                print(f"Warning: Could not locate rows in {path}; source rows not kept")
+                raw_offsets = None
+        cases = CaseTable.from_frame(frame, raw_path, raw_offsets)
         self._cases.extend(cases)
         return cases
 
+    def _read_csv(self, path: str) -> pd.DataFrame:
+        """Read a NamUs export with every column as text (NaN when empty)."""
+        return pd.read_csv(path, dtype=str, encoding='utf-8-sig')
+
+    def normalize_frame(self, df: pd.DataFrame, case_type: CaseType) -> pd.DataFrame:
+        """
+        Map a NamUs export to the unified schema, one column at a time.
+
+        Applies the same normalization as parse_row to whole columns:
+        sex to M/F/Unknown, states to 2-letter codes, dates parsed with
+        DATE_FORMATS, ages expanded by ±2 years. Missing text is ''.
+
+        Args:
+            df: NamUs export as read by _read_csv
+            case_type: Type of case (MP or UP)
+
+        Returns:
+            DataFrame with UNIFIED_COLUMNS: ages as Int64, event_date and
+            date_modified as datetime64 (NaT when missing), the rest as str
+        """
+        is_mp = case_type == CaseType.MISSING_PERSON
+        col_map = self.MP_COLUMN_MAP if is_mp else self.UP_COLUMN_MAP
+        source_columns = {field: col for col, field in col_map.items()}
+
+        def column(field):
+            col = source_columns.get(field)
+            if col is None or col not in df.columns:
+                return pd.Series(pd.NA, index=df.index, dtype=object)
+            return df[col]
+
+        def text(field):
+            return column(field).fillna('').astype(str).str.strip()
+
+        source_id = text('source_id')
+        age_min = self._parse_int_column(column('age_min'))
+        age_max = self._parse_int_column(column('age_max'))
+        blank = pd.Series('', index=df.index, dtype=object)
+
+        frame = pd.DataFrame({
+            'id': f"{self.source_name.upper()}-{case_type.value}-" + source_id,
+            'source_id': source_id,
+            'source': self.source_name,
+            'case_type': case_type.value,
+            'sex': self._normalize_sex_column(column('sex')),
+            'race': text('race'),
+            # Expand age range by ±2 years for estimation error
+            'age_min': (age_min - 2).clip(lower=0),
+            'age_max': age_max + 2,
+            'city': text('city'),
+            'county': text('county'),
+            'state': self._normalize_state_column(column('state')),
+            'country': 'US',
+            'event_date': self._parse_date_column(column('event_date')),
+            'first_name': text('first_name') if is_mp else blank,
+            'last_name': text('last_name') if is_mp else blank,
+            'mec_case': blank if is_mp else text('mec_case'),
+            'date_modified': self._parse_date_column(column('date_modified')),
+        }, index=df.index)
+        return frame[UNIFIED_COLUMNS].reset_index(drop=True)
+
     def parse_row(self, row: Dict[str, Any], case_type: CaseType) -> UnifiedCase:
         """
         Parse a single NamUs row into a UnifiedCase.
@@ -196,31 +315,11 @@ class NamusSource(DataSource):
 
         v = str(value).strip().upper()
 
-        # Handle common state name variations
-        state_map = {
-            'ALABAMA': 'AL', 'ALASKA': 'AK', 'ARIZONA': 'AZ', 'ARKANSAS': 'AR',
-            'CALIFORNIA': 'CA', 'COLORADO': 'CO', 'CONNECTICUT': 'CT',
-            'DELAWARE': 'DE', 'FLORIDA': 'FL', 'GEORGIA': 'GA', 'HAWAII': 'HI',
-            'IDAHO': 'ID', 'ILLINOIS': 'IL', 'INDIANA': 'IN', 'IOWA': 'IA',
-            'KANSAS': 'KS', 'KENTUCKY': 'KY', 'LOUISIANA': 'LA', 'MAINE': 'ME',
-            'MARYLAND': 'MD', 'MASSACHUSETTS': 'MA', 'MICHIGAN': 'MI',
-            'MINNESOTA': 'MN', 'MISSISSIPPI': 'MS', 'MISSOURI': 'MO',
-            'MONTANA': 'MT', 'NEBRASKA': 'NE', 'NEVADA': 'NV',
-            'NEW HAMPSHIRE': 'NH', 'NEW JERSEY': 'NJ', 'NEW MEXICO': 'NM',
-            'NEW YORK': 'NY', 'NORTH CAROLINA': 'NC', 'NORTH DAKOTA': 'ND',
-            'OHIO': 'OH', 'OKLAHOMA': 'OK', 'OREGON': 'OR', 'PENNSYLVANIA': 'PA',
-            'RHODE ISLAND': 'RI', 'SOUTH CAROLINA': 'SC', 'SOUTH DAKOTA': 'SD',
-            'TENNESSEE': 'TN', 'TEXAS': 'TX', 'UTAH': 'UT', 'VERMONT': 'VT',
-            'VIRGINIA': 'VA', 'WASHINGTON': 'WA', 'WEST VIRGINIA': 'WV',
-            'WISCONSIN': 'WI', 'WYOMING': 'WY', 'DISTRICT OF COLUMBIA': 'DC',
-            'PUERTO RICO': 'PR', 'GUAM': 'GU', 'VIRGIN ISLANDS': 'VI',
-        }
-
         # If already a 2-letter code
         if len(v) == 2 and v.isalpha():
             return v
 
-        return state_map.get(v, v[:2] if len(v) >= 2 else '')
+        return self.STATE_NAME_MAP.get(v, v[:2] if len(v) >= 2 else '')
 
     def _parse_date(self, value: Any) -> Optional[datetime]:
         """Parse date value to datetime object."""
@@ -231,16 +330,7 @@ class NamusSource(DataSource):
         if not v:
             return None
 
-        # Try common date formats
-        formats = [
-            '%m/%d/%Y',
-            '%Y-%m-%d',
-            '%m-%d-%Y',
-            '%d/%m/%Y',
-            '%Y/%m/%d',
-        ]
-
-        for fmt in formats:
+        for fmt in self.DATE_FORMATS:
             try:
                 return datetime.strptime(v, fmt).date()
             except ValueError:
@@ -258,79 +348,90 @@ class NamusSource(DataSource):
         except (ValueError, TypeError):
             return None
 
+    def _normalize_sex_column(self, values: pd.Series) -> pd.Series:
+        """Column version of _normalize_sex."""
+        v = values.fillna('').astype(str).str.strip().str.upper()
+        return v.map({'M': 'M', 'MALE': 'M', 'F': 'F', 'FEMALE': 'F'}).fillna('Unknown')
+
+    def _normalize_state_column(self, values: pd.Series) -> pd.Series:
+        """Column version of _normalize_state."""
+        v = values.fillna('').astype(str).str.strip().str.upper()
+        fallback = v.str[:2].where(v.str.len() >= 2, '')
+        return v.map(self.STATE_NAME_MAP).fillna(fallback)
+
+    def _parse_date_column(self, values: pd.Series) -> pd.Series:
+        """
+        Column version of _parse_date: each of DATE_FORMATS is tried, in
+        order, on the values no earlier format matched.
+        """
+        v = values.fillna('').astype(str).str.strip()
+        parsed = pd.Series(pd.NaT, index=v.index, dtype='datetime64[ns]')
+        pending = v != ''
+        for fmt in self.DATE_FORMATS:
+            if not pending.any():
+                break
+            attempt = pd.to_datetime(v[pending], format=fmt, errors='coerce')
+            parsed[attempt.index] = attempt
+            pending &= parsed.isna()
+        return parsed
+
+    def _parse_int_column(self, values: pd.Series) -> pd.Series:
+        """Column version of _parse_int (Int64, <NA> when not numeric)."""
+        numbers = pd.to_numeric(values, errors='coerce')
+        return pd.Series(np.trunc(numbers), index=values.index).astype('Int64')
+
     def export_to_master_csv(
         self,
         output_dir: str,
-        cases: Optional[List[UnifiedCase]] = None
+        cases: Optional[Union[CaseTable, List[UnifiedCase], pd.DataFrame]] = None
     ) -> Dict[str, str]:
         """
         Export cases to Maria master CSV format.
 
         Args:
             output_dir: Directory to write CSV files
-            cases: List of cases (uses self._cases if not provided)
+            cases: CaseTable, list of cases or a unified-schema DataFrame
+                from a load_*_frame method (uses self._cases if not provided)
 
         Returns:
             Dict with paths to created files
         """
-        if cases is None:
-            cases = self._cases
+        frame = cases if isinstance(cases, pd.DataFrame) else self.to_dataframe(cases)
 
         os.makedirs(output_dir, exist_ok=True)
-
-        # Split by case type
-        mp_cases = [c for c in cases if c.case_type == CaseType.MISSING_PERSON]
-        up_cases = [c for c in cases if c.case_type == CaseType.UNIDENTIFIED_PERSON]
-
         paths = {}
-
-        # Export MP
-        if mp_cases:
-            mp_df = pd.DataFrame([{
-                'id': c.unified_id,
-                'first_name': c.first_name,
-                'last_name': c.last_name,
-                'sex': c.sex,
-                'race': c.race,
-                'age_min': c.age_min,
-                'age_max': c.age_max,
-                'last_seen_date': c.event_date.isoformat() if c.event_date else '',
-                'city': c.city,
-                'county': c.county,
-                'state': c.state,
-                'date_modified': c.date_modified.isoformat() if c.date_modified else '',
-            } for c in mp_cases])
-
-            mp_path = os.path.join(output_dir, 'MP_master.csv')
-            mp_df.to_csv(mp_path, index=False)
-            paths['mp'] = mp_path
-
-        # Export UP
-        if up_cases:
-            up_df = pd.DataFrame([{
-                'id': c.unified_id,
-                'mec_case': c.mec_case,
-                'sex': c.sex,
-                'race': c.race,
-                'age_min': c.age_min,
-                'age_max': c.age_max,
-                'found_date': c.event_date.isoformat() if c.event_date else '',
-                'city': c.city,
-                'county': c.county,
-                'state': c.state,
-                'date_modified': c.date_modified.isoformat() if c.date_modified else '',
-            } for c in up_cases])
-
-            up_path = os.path.join(output_dir, 'UP_master.csv')
-            up_df.to_csv(up_path, index=False)
-            paths['up'] = up_path
+        if frame.empty:
+            return paths
+
+        master = frame.assign(
+            age_min=frame['age_min'].astype('Int64'),
+            age_max=frame['age_max'].astype('Int64'),
+            event_date=self._iso_dates(frame['event_date']),
+            date_modified=self._iso_dates(frame['date_modified']),
+        )
+        outputs = [
+            ('mp', CaseType.MISSING_PERSON, 'MP_master.csv', 'last_seen_date', self.MP_MASTER_COLUMNS),
+            ('up', CaseType.UNIDENTIFIED_PERSON, 'UP_master.csv', 'found_date', self.UP_MASTER_COLUMNS),
+        ]
+        for key, case_type, filename, date_column, columns in outputs:
+            rows = master[master['case_type'] == case_type.value]
+            if rows.empty:
+                continue
+            path = os.path.join(output_dir, filename)
+            rows.rename(columns={'event_date': date_column})[columns].to_csv(path, index=False)
+            paths[key] = path
 
         return paths
 
+    @staticmethod
+    def _iso_dates(values: pd.Series) -> pd.Series:
+        """YYYY-MM-DD strings ('' when missing) from dates, datetimes or ISO strings."""
+        return pd.to_datetime(values, errors='coerce').dt.strftime('%Y-%m-%d').fillna('')
+
 
 def main():
     """Test NamUs source loading."""
-    import os
+    import time
 
     ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
     RAW_DIR = os.path.join(ROOT, 'data', 'raw')
@@ -350,31 +451,38 @@ def main():
 
     if mp_file:
         print(f"Loading MP from: {mp_file}")
+        start = time.perf_counter()
         mp_cases = source.load_missing_persons(mp_file)
-        print(f"  Loaded {len(mp_cases)} missing persons")
+        print(f"  Loaded {len(mp_cases)} missing persons in {time.perf_counter() - start:.2f}s")
 
     if up_file:
         print(f"Loading UP from: {up_file}")
+        start = time.perf_counter()
         up_cases = source.load_unidentified_persons(up_file)
-        print(f"  Loaded {len(up_cases)} unidentified persons")
+        print(f"  Loaded {len(up_cases)} unidentified persons in {time.perf_counter() - start:.2f}s")
 
     # Show statistics
     stats = source.get_statistics()
     print("\nStatistics:")
     for k, v in stats.items():
         print(f"  {k}: {v}")
-
-    # Validate sample cases
-    print("\nValidating sample cases...")
-    for case in source._cases[:5]:
-        result = source.validate_case(case)
-        status = "Valid" if result.is_valid else "Invalid"
-        print(f"  {case.unified_id}: {status}")
-        for err in result.errors:
-            print(f"    ERROR: {err}")
-        for warn in result.warnings:
-            print(f"    WARNING: {warn}")
-
+    print(f"  memory: {source._cases.nbytes / 1e6:.1f} MB")
+
+    # Validate all cases
+    print("\nValidating cases...")
+    start = time.perf_counter()
+    violations = source.validate_cases()
+    elapsed = time.perf_counter() - start
+    errors = UnifiedSchema.error_mask(violations)
+    print(f"  {len(source._cases)} cases in {elapsed * 1000:.0f} ms: "
+          f"{errors.sum()} errors, {(~errors).sum()} warnings")
+    for (field, code), n in violations.groupby(['field', 'code'], observed=True).size().items():
+        print(f"    {field}: {code} x{n}")
+    table_errors = violations[errors & (violations['row'] < 0)]
+    for field in table_errors['field']:
+        print(f"  ERROR: {field} column missing")
+    for row in violations['row'][errors & (violations['row'] >= 0)].unique()[:5]:
+        print(f"  ERROR: {source._cases[int(row)].unified_id}")
 
 if __name__ == '__main__':
     main()
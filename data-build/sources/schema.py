@@ -7,6 +7,7 @@ utilities for schema validation and transformation.
 
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Any, Set
+import numpy as np
 import pandas as pd
 
 
@@ -76,6 +77,28 @@ class UnifiedSchema:
         FieldDefinition('mec_case', 'string', False, 'Medical examiner case number'),
     ]
 
+    # Cross-field orderings: (lower field, upper field, violation code)
+    ORDERINGS = [
+        ('age_min', 'age_max', 'age_order'),
+        ('event_date', 'date_modified', 'date_order'),
+    ]
+
+    # Violation codes reported by find_violations
+    VIOLATION_CODES = {
+        'missing_column': 'required column absent',
+        'required': 'required value empty',
+        'invalid_type': 'value does not parse as the field type',
+        'not_allowed': 'value not in allowed values',
+        'below_min': 'value below minimum',
+        'above_max': 'value above maximum',
+        'age_order': 'age_min greater than age_max',
+        'date_order': 'event_date after date_modified',
+    }
+
+    # Codes that make a row invalid; the rest are warnings. 'required' is
+    # an error only for identity fields (as in DataSource.validate_case).
+    ERROR_CODES = {'missing_column', 'below_min', 'age_order'}
+
     @classmethod
     def all_fields(cls) -> List[FieldDefinition]:
         """Get all field definitions."""
@@ -93,6 +116,83 @@ class UnifiedSchema:
         """Get all field names."""
         return [f.name for f in cls.all_fields()]
 
+    @classmethod
+    def find_violations(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Check every field constraint over whole columns.
+
+        Each constraint is one boolean mask over the frame: required
+        values, parseable int/date values, allowed values, min/max and
+        the ORDERINGS. Text fields count None/NaN and '' as empty; date
+        fields may hold datetimes or ISO strings.
+
+        Args:
+            df: DataFrame with unified schema columns
+
+        Returns:
+            DataFrame with one row per violation, sorted by row:
+            row (position in df, -1 for a missing column), field, code
+            (categoricals over field_names() and VIOLATION_CODES)
+        """
+        found = []  # (row positions, field, code)
+
+        def add(mask, field_name, code):
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                found.append((rows, field_name, code))
+
+        typed = {}
+        for field in cls.all_fields():
+            if field.name not in df.columns:
+                if field.required:
+                    found.append((np.array([-1]), field.name, 'missing_column'))
+                continue
+
+            col = df[field.name]
+            missing = col.isna().to_numpy()
+            if col.dtype == object:
+                missing |= col.to_numpy() == ''
+
+            if field.required:
+                add(missing, field.name, 'required')
+
+            if field.data_type in ('int', 'float'):
+                values = pd.to_numeric(col, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+                add(np.isnan(values) & ~missing, field.name, 'invalid_type')
+            elif field.data_type == 'date':
+                values = pd.to_datetime(col.where(~missing), errors='coerce', format='ISO8601').to_numpy()
+                add(np.isnat(values) & ~missing, field.name, 'invalid_type')
+            else:
+                values = col.to_numpy()
+            typed[field.name] = values
+
+            if field.allowed_values:
+                add(~col.isin(field.allowed_values).to_numpy() & ~missing, field.name, 'not_allowed')
+            if field.min_value is not None:
+                add(values < field.min_value, field.name, 'below_min')
+            if field.max_value is not None:
+                add(values > field.max_value, field.name, 'above_max')
+
+        # NaN/NaT compare False, so rows missing either side are skipped
+        for lower, upper, code in cls.ORDERINGS:
+            if lower in typed and upper in typed:
+                add(typed[lower] > typed[upper], lower, code)
+
+        sizes = [len(rows) for rows, _, _ in found]
+        violations = pd.DataFrame({
+            'row': np.concatenate([rows for rows, _, _ in found]) if found else np.empty(0, dtype=np.int64),
+            'field': pd.Categorical(np.repeat([f for _, f, _ in found], sizes), categories=cls.field_names()),
+            'code': pd.Categorical(np.repeat([c for _, _, c in found], sizes), categories=list(cls.VIOLATION_CODES)),
+        })
+        return violations.sort_values('row', kind='stable').reset_index(drop=True)
+
+    @classmethod
+    def error_mask(cls, violations: pd.DataFrame) -> pd.Series:
+        """True for the violations (from find_violations) that are errors rather than warnings."""
+        id_fields = [f.name for f in cls.ID_FIELDS]
+        return (violations['code'].isin(cls.ERROR_CODES) |
+                ((violations['code'] == 'required') & violations['field'].isin(id_fields)))
+
     @classmethod
     def validate_dataframe(cls, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -102,16 +202,15 @@ class UnifiedSchema:
             df: DataFrame to validate
 
         Returns:
-            Dict with validation results
+            Dict with validation results; 'violations' holds the full
+            table from find_violations, 'errors' and 'warnings' one
+            summary line per field and code
         """
+        violations = cls.find_violations(df)
+        is_error = cls.error_mask(violations)
         errors = []
         warnings = []
 
-        # Check required columns exist
-        for field_name in cls.required_fields():
-            if field_name not in df.columns:
-                errors.append(f"Missing required column: {field_name}")
-
         # Check for unexpected columns
         expected_cols = set(cls.field_names())
         actual_cols = set(df.columns)
@@ -119,36 +218,13 @@ class UnifiedSchema:
         if unexpected:
             warnings.append(f"Unexpected columns: {unexpected}")
 
-        # Validate field constraints
-        for field in cls.all_fields():
-            if field.name not in df.columns:
-                continue
-
-            col = df[field.name]
-
-            # Check allowed values
-            if field.allowed_values:
-                invalid = col[~col.isin(field.allowed_values + [None, ''])]
-                if len(invalid) > 0:
-                    sample = invalid.head(3).tolist()
-                    warnings.append(
-                        f"{field.name}: {len(invalid)} invalid values (e.g., {sample})"
-                    )
-
-            # Check numeric ranges
-            if field.min_value is not None and pd.api.types.is_numeric_dtype(col):
-                below_min = col[col < field.min_value]
-                if len(below_min) > 0:
-                    errors.append(
-                        f"{field.name}: {len(below_min)} values below minimum {field.min_value}"
-                    )
-
-            if field.max_value is not None and pd.api.types.is_numeric_dtype(col):
-                above_max = col[col > field.max_value]
-                if len(above_max) > 0:
-                    warnings.append(
-                        f"{field.name}: {len(above_max)} values above maximum {field.max_value}"
-                    )
+        counts = violations.assign(error=is_error).groupby(['field', 'code', 'error'], observed=True).size()
+        for (field_name, code, error), n in counts.items():
+            if code == 'missing_column':
+                message = f"Missing required column: {field_name}"
+            else:
+                message = f"{field_name}: {n} rows with {cls.VIOLATION_CODES[code]}"
+            (errors if error else warnings).append(message)
 
         return {
             'is_valid': len(errors) == 0,
@@ -156,6 +232,7 @@ class UnifiedSchema:
             'warnings': warnings,
             'rows': len(df),
             'columns': list(df.columns),
+            'violations': violations,
         }
 
     @classmethod
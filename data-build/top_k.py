@@ -0,0 +1,148 @@
+"""
+Grouped top-k selection for scored candidate pairs.
+
+candidates.jsonl used to be built by scanning every scored pair once per MP
+(pairs[pairs['mp_id'] == mp_id].head(20)), which is quadratic in the number
+of MPs. Here the pairs are sorted once by the score and cut with a single
+groupby().head(k), then written group by group as JSON lines.
+
+Groups appear in the order of their best pair and candidates within a
+group in score order, the same layout as the per-MP loop. The per-UP
+variant is the same call grouped on up_id:
+
+    top = grouped_top_k(pairs, 'up_id', k=20)
+    write_top_k_jsonl(top, 'out/candidates_by_up.jsonl', 'up_id', ['mp_id', 'final_score'])
+"""
+
+import json
+import numpy as np
+import pandas as pd
+
+TOP_K = 20
+
+# Columns written per candidate in candidates.jsonl
+MP_CANDIDATE_COLUMNS = [
+    'up_id', 'final_score', 'base_score', 'uniqueness_boost', 'rarity_boost', 'era_boost',
+    'mp_match_count', 'up_match_count', 'days_gap'
+]
+UP_CANDIDATE_COLUMNS = [
+    'mp_id', 'final_score', 'base_score', 'uniqueness_boost', 'rarity_boost', 'era_boost',
+    'mp_match_count', 'up_match_count', 'days_gap'
+]
+
+# Groups converted to records per write, bounds memory while streaming
+WRITE_BATCH_GROUPS = 10_000
+
+
+def grouped_top_k(pairs, group_col, k=TOP_K, sort_key='final_score', ascending=False):
+    """
+    Best k pairs of every group with one sort.
+
+    Args:
+        pairs: Scored pairs DataFrame
+        group_col: Column to group on ('mp_id' or 'up_id')
+        k: Pairs kept per group
+        sort_key: Column (or list of columns) ranking pairs within a group;
+            None keeps the current row order
+        ascending: Sort direction for sort_key
+
+    Returns:
+        DataFrame with at most k rows per group, groups contiguous and
+        ordered by their best pair, rows within a group in rank order
+    """
+    # Stable, so ties keep their current order (an already sorted frame is unchanged)
+    ranked = pairs if sort_key is None else pairs.sort_values(sort_key, ascending=ascending, kind='stable')
+    top = ranked.groupby(group_col, sort=False, observed=True).head(k)
+
+    group_codes, _ = pd.factorize(top[group_col])
+    return top.iloc[np.argsort(group_codes, kind='stable')]
+
+
+def iter_top_k_groups(top, group_col, columns, batch_groups=WRITE_BATCH_GROUPS):
+    """
+    Yield (group value, list of candidate records) from grouped_top_k output.
+
+    Records are built for batch_groups groups at a time rather than for the
+    whole frame at once.
+    """
+    keys = top[group_col].to_numpy()
+    if len(keys) == 0:
+        return
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    bounds = np.r_[starts, len(keys)]
+
+    for first in range(0, len(starts), batch_groups):
+        last = min(first + batch_groups, len(starts))
+        offset = bounds[first]
+        records = top.iloc[offset:bounds[last]][columns].to_dict(orient='records')
+        for g in range(first, last):
+            yield keys[bounds[g]], records[bounds[g] - offset:bounds[g + 1] - offset]
+
+
+def write_top_k_jsonl(top, path, group_col, columns, batch_groups=WRITE_BATCH_GROUPS):
+    """
+    Stream grouped top-k pairs to a JSON lines file.
+
+    Each line is {group_col: <id>, 'candidates': [<record>, ...]}.
+
+    Returns:
+        Number of lines written
+    """
+    lines = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for key, candidates in iter_top_k_groups(top, group_col, columns, batch_groups):
+            f.write(json.dumps({group_col: key, 'candidates': candidates}) + '\n')
+            lines += 1
+    return lines
+
+
+def top_k_per_mp_reference(pairs, k=TOP_K, columns=MP_CANDIDATE_COLUMNS):
+    """Original per-MP scan (pairs sorted by score); kept to check grouped_top_k()."""
+    top_per_mp = {}
+    for mp_id in pairs['mp_id'].unique():
+        matches = pairs[pairs['mp_id'] == mp_id].head(k)
+        top_per_mp[mp_id] = matches[columns].to_dict(orient='records')
+    return top_per_mp
+
+
+def main():
+    """Check grouped_top_k() against the per-MP scan and benchmark both."""
+    import time
+
+    rng = np.random.default_rng(0)
+    n_pairs, n_mps = 50_000, 5_000
+    pairs = pd.DataFrame({
+        'mp_id': np.char.add('MP', rng.integers(0, n_mps, n_pairs).astype(str)).astype(object),
+        'up_id': np.char.add('UP', rng.integers(0, 4_000, n_pairs).astype(str)).astype(object),
+        'final_score': rng.integers(0, 1000, n_pairs) / 1000,  # plenty of ties
+        'base_score': rng.random(n_pairs),
+        'uniqueness_boost': rng.random(n_pairs),
+        'rarity_boost': rng.random(n_pairs),
+        'era_boost': rng.random(n_pairs),
+        'mp_match_count': rng.integers(1, 16, n_pairs),
+        'up_match_count': rng.integers(1, 16, n_pairs),
+        'days_gap': rng.integers(0, 20_000, n_pairs),
+    }).sort_values('final_score', ascending=False)
+
+    start = time.perf_counter()
+    expected = top_k_per_mp_reference(pairs)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top = grouped_top_k(pairs, 'mp_id')
+    got = dict(iter_top_k_groups(top, 'mp_id', MP_CANDIDATE_COLUMNS))
+    grouped_time = time.perf_counter() - start
+
+    print(f"{n_pairs:,} pairs, {len(expected):,} MPs: per-MP scan {loop_time:.2f}s, "
+          f"grouped top-k {grouped_time:.3f}s")
+    if list(got) != list(expected) or json.dumps(got) != json.dumps(expected):
+        print("FAILED: grouped top-k differs from the per-MP scan")
+        raise SystemExit(1)
+    print("✓ Grouped top-k matches the per-MP scan")
+
+    by_up = grouped_top_k(pairs, 'up_id', k=5)
+    print(f"  Per-UP variant (k=5): {by_up['up_id'].nunique():,} UPs, {len(by_up):,} candidates")
+
+
+if __name__ == '__main__':
+    main()
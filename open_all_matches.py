@@ -9,6 +9,9 @@ import time
 import sys
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-build'))
+from case_store import case_url
+
 # Load from all_matches_scored.csv (updated with infant filter)
 if os.path.exists('out/all_matches_scored.csv'):
     tracker = pd.read_csv('out/all_matches_scored.csv')
@@ -29,17 +32,10 @@ else:
     print("Error: No match files found!")
     sys.exit(1)
 
-def extract_case_number(case_id):
-    """Extract numeric case number from ID like MP89129 or UP11054"""
-    return case_id.replace('MP', '').replace('UP', '')
-
 def open_match(row):
     """Open both MP and UP cases in browser"""
-    mp_num = extract_case_number(row['MP'])
-    up_num = extract_case_number(row['UP'])
-
-    mp_url = f"https://www.namus.gov/MissingPersons/Case#/{mp_num}"
-    up_url = f"https://www.namus.gov/UnidentifiedPersons/Case#/{up_num}/details?nav"
+    mp_url = case_url(row['MP'])
+    up_url = case_url(row['UP'])
 
     print(f"  Match #{row['ID']}: {row['Name']} (Score: {row['Score']}, MP:{row['MP_Cnt']}, UP:{row['UP_Cnt']})")
 
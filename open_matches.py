@@ -7,21 +7,18 @@ import pandas as pd
 import webbrowser
 import time
 import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-build'))
+from case_store import case_url
 
 # Load tracker
 tracker = pd.read_csv('out/match_investigation_tracker.csv')
 
-def extract_case_number(case_id):
-    """Extract numeric case number from ID like MP89129 or UP11054"""
-    return case_id.replace('MP', '').replace('UP', '')
-
 def open_match(row):
     """Open both MP and UP cases in browser"""
-    mp_num = extract_case_number(row['MP'])
-    up_num = extract_case_number(row['UP'])
-
-    mp_url = f"https://www.namus.gov/MissingPersons/Case#/{mp_num}"
-    up_url = f"https://www.namus.gov/UnidentifiedPersons/Case#/{up_num}/details?nav"
+    mp_url = case_url(row['MP'])
+    up_url = case_url(row['UP'])
 
     print(f"\nMatch #{row['ID']}: {row['Name']}")
     print(f"  Score: {row['Score']} | MP matches: {row['MP_Cnt']} | UP matches: {row['UP_Cnt']}")
@@ -14,24 +14,16 @@ if [ -d ".venv" ]; then
     source .venv/bin/activate
 fi
 
-echo ""
-echo "Step 1: Generate candidate pairs (v2 - with improvements)"
-echo "------------------------------------------"
-python3 data-build/generate_candidate_pairs_v2.py
-
-echo ""
-echo "Step 2: Prioritize matches for review"
-echo "------------------------------------------"
-python3 data-build/prioritize_matches.py
+# Generate candidate pairs (v2) and prioritize them for review; stages that
+# are already up to date are skipped (add --force pairs prioritize to redo)
+python3 data-build/pipeline.py --only pairs prioritize "$@"
 
 echo ""
 echo "=========================================="
 echo "Build complete!"
 echo ""
 echo "Output files in out/:"
-echo "  - candidate_pairs.csv (all pairs)"
-echo "  - candidate_pairs_high_priority.csv (Tier 1-2)"
-echo "  - candidate_pairs_tier1.csv (Tier 1 only)"
+echo "  - candidate_pairs/ (all pairs, Parquet partitioned by state)"
 echo "  - candidate_pairs_prioritized.csv (scored and sorted)"
 echo "  - best_match_per_up.csv (recommended for review)"
 echo "  - top_matches_for_review.csv (top 1000)"
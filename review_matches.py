@@ -14,84 +14,68 @@ import webbrowser
 import time
 import sys
 import os
-from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-build'))
+from case_store import CaseStore, case_url
+from exclusions import ExclusionIndex, append_exclusion
+from match_counts import MatchCounts, case_partitions, neighborhood_pairs, threshold_flips
+from pair_store import ID_PREFIXES, decode_case_ids, pairs_exist, read_case_pairs, read_pairs
+from review_log import ReviewLog, import_csv_log
 
 OUT_DIR = 'out'
 DATA_DIR = 'data/clean'
 EXCLUSIONS_PATH = 'data/exclusions.csv'
-REVIEW_LOG_PATH = 'out/review_log.csv'
+REVIEW_LOG_PATH = 'out/review_log.jsonl'
+
+# Matches ahead of the current one whose case details are loaded in the background
+PREFETCH_MATCHES = 5
 
 
 def load_data():
     """Load all necessary data files."""
-    # Try prioritized file first, fall back to regular
+    # Try prioritized file first, fall back to the Tier 1 candidate pairs
     prioritized_path = os.path.join(OUT_DIR, 'best_match_per_up.csv')
     if os.path.exists(prioritized_path):
         pairs = pd.read_csv(prioritized_path)
         print(f"Loaded: {prioritized_path} ({len(pairs)} pairs)")
+    elif pairs_exist(OUT_DIR):
+        pairs = read_pairs(OUT_DIR, decode_ids=False)
+        pairs = pairs[pairs['priority_tier'] == 1].reset_index(drop=True)
+        for col, prefix in ID_PREFIXES.items():
+            pairs[col] = decode_case_ids(pairs[col].to_numpy(), prefix)
+        print(f"Loaded: Tier 1 pairs from {os.path.join(OUT_DIR, 'candidate_pairs')}/ ({len(pairs)} pairs)")
     else:
-        pairs_path = os.path.join(OUT_DIR, 'candidate_pairs_tier1.csv')
-        if os.path.exists(pairs_path):
-            pairs = pd.read_csv(pairs_path)
-            print(f"Loaded: {pairs_path} ({len(pairs)} pairs)")
-        else:
-            print("ERROR: No prioritized match file found. Run prioritize_matches.py first.")
-            sys.exit(1)
+        print("ERROR: No prioritized match file found. Run prioritize_matches.py first.")
+        sys.exit(1)
+
+    # Drop pairs excluded since the file was generated
+    exclusions = ExclusionIndex(EXCLUSIONS_PATH)
+    excluded = exclusions.pair_mask(pairs['mp_id'], pairs['up_id'])
+    if excluded.any():
+        pairs = pairs[~excluded]
+        print(f"Skipping {excluded.sum()} pairs of excluded cases")
 
     mp = pd.read_csv(os.path.join(DATA_DIR, 'MP_master.csv'))
     up = pd.read_csv(os.path.join(DATA_DIR, 'UP_master.csv'))
 
-    # Load review log if exists
-    if os.path.exists(REVIEW_LOG_PATH):
-        review_log = pd.read_csv(REVIEW_LOG_PATH)
-    else:
-        review_log = pd.DataFrame(columns=['mp_id', 'up_id', 'date', 'action', 'notes'])
-
-    return pairs, mp, up, review_log
-
-
-def get_case_details(case_id, mp_df, up_df):
-    """Get detailed info for a case."""
-    if case_id.startswith('MP'):
-        row = mp_df[mp_df['id'] == case_id]
-        if len(row) == 0:
-            return None
-        row = row.iloc[0]
-        return {
-            'type': 'MP',
-            'id': case_id,
-            'name': f"{row.get('first_name', '')} {row.get('last_name', '')}".strip(),
-            'sex': row.get('sex', 'Unknown'),
-            'race': row.get('race', 'Unknown'),
-            'age': f"{row.get('age_min', '?')}-{row.get('age_max', '?')}",
-            'date': row.get('last_seen_date', 'Unknown'),
-            'city': row.get('city', ''),
-            'county': row.get('county', ''),
-            'state': row.get('state', ''),
-        }
-    else:  # UP
-        row = up_df[up_df['id'] == case_id]
-        if len(row) == 0:
-            return None
-        row = row.iloc[0]
-        return {
-            'type': 'UP',
-            'id': case_id,
-            'mec': row.get('mec_case', ''),
-            'sex': row.get('sex', 'Unknown'),
-            'race': row.get('race', 'Unknown'),
-            'age': f"{row.get('age_min', '?')}-{row.get('age_max', '?')}",
-            'date': row.get('found_date', 'Unknown'),
-            'city': row.get('city', ''),
-            'county': row.get('county', ''),
-            'state': row.get('state', ''),
-        }
-
-
-def print_match_details(mp_id, up_id, pair_row, mp_df, up_df):
+    # Load review log (converting the old CSV log the first time)
+    imported = import_csv_log(os.path.join(OUT_DIR, 'review_log.csv'), REVIEW_LOG_PATH)
+    if imported:
+        print(f"Converted {imported} actions from review_log.csv to {REVIEW_LOG_PATH}")
+    review_log = ReviewLog(REVIEW_LOG_PATH)
+
+    return pairs, mp, up, review_log, exclusions
+
+
+def get_case_details(case_id, cases):
+    """Get detailed info for a case (indexed lookup in the shared case store)."""
+    return cases.details(case_id)
+
+
+def print_match_details(mp_id, up_id, pair_row, cases):
     """Print detailed comparison of MP and UP."""
-    mp_info = get_case_details(mp_id, mp_df, up_df)
-    up_info = get_case_details(up_id, mp_df, up_df)
+    mp_info = get_case_details(mp_id, cases)
+    up_info = get_case_details(up_id, cases)
 
     if not mp_info or not up_info:
         print("  ERROR: Could not load case details")
@@ -128,11 +112,8 @@ def print_match_details(mp_id, up_id, pair_row, mp_df, up_df):
 
 def open_cases(mp_id, up_id):
     """Open both cases in browser."""
-    mp_num = mp_id.replace('MP', '')
-    up_num = up_id.replace('UP', '')
-
-    mp_url = f"https://www.namus.gov/MissingPersons/Case#/{mp_num}"
-    up_url = f"https://www.namus.gov/UnidentifiedPersons/Case#/{up_num}/details?nav"
+    mp_url = case_url(mp_id)
+    up_url = case_url(up_id)
 
     print(f"\nOpening {mp_id} and {up_id} in browser...")
     webbrowser.open(mp_url)
@@ -140,46 +121,55 @@ def open_cases(mp_id, up_id):
     webbrowser.open(up_url)
 
 
-def add_exclusion(up_id, reason, notes):
-    """Add UP to exclusions file."""
-    today = date.today().isoformat()
+def add_exclusion(up_id, reason, notes, exclusions):
+    """Append UP to the exclusions file and refresh the exclusion index."""
+    # Check if already excluded (possibly from another session)
+    exclusions.reload()
+    if up_id in exclusions:
+        print(f"  {up_id} is already excluded")
+        return False
+
+    append_exclusion(up_id, reason, notes, EXCLUSIONS_PATH)
+    exclusions.reload()
+    print(f"  Added {up_id} to exclusions ({reason})")
+    return True
 
-    # Load existing exclusions
-    if os.path.exists(EXCLUSIONS_PATH):
-        exclusions = pd.read_csv(EXCLUSIONS_PATH)
-    else:
-        exclusions = pd.DataFrame(columns=['id', 'type', 'reason', 'date_added', 'notes'])
 
-    # Check if already excluded
-    if up_id in exclusions['id'].values:
-        print(f"  {up_id} is already excluded")
+def update_match_counts(up_id, mp_df, up_df):
+    """
+    Drop an excluded UP's pairs from the stored match counts and report how
+    many scored pairs cross the match-count filter as a result.
+
+    Only the pairs of the UP and of its MPs near the threshold are read;
+    the pair set itself is patched by the next pair generation run.
+    """
+    counts = MatchCounts.load(OUT_DIR)
+    if counts is None or not pairs_exist(OUT_DIR):
         return
 
-    # Add new exclusion
-    new_row = pd.DataFrame([{
-        'id': up_id,
-        'type': 'UP',
-        'reason': reason,
-        'date_added': today,
-        'notes': notes
-    }])
-    exclusions = pd.concat([exclusions, new_row], ignore_index=True)
-    exclusions.to_csv(EXCLUSIONS_PATH, index=False)
-    print(f"  Added {up_id} to exclusions ({reason})")
+    up_code = int(up_id[len('UP'):])
+    removed = read_case_pairs(OUT_DIR, up_ids=[up_code], states=case_partitions(mp_df, up_df, up_ids=[up_id]))
+    try:
+        update = counts.apply(removed=removed)
+    except ValueError as e:
+        # Counts saved before the last pair generation; leave them untouched
+        print(f"  Warning: match counts not updated ({e}); re-run score_candidates.py")
+        return
+    counts.forget(up_ids=[up_code])
+
+    mp_ids = [f'MP{code}' for code in update.mp_near]
+    touching = neighborhood_pairs(OUT_DIR, update, case_partitions(mp_df, up_df, mp_ids, [up_id]))
+    flips = threshold_flips(counts.rescore(update, touching[touching['up_id'] != up_code]))
+    counts.save(OUT_DIR)
+
+    print(f"  Match counts updated for {len(update.mp_ids)} MPs: "
+          f"{flips['entered']} pairs now within ≤{counts.max_matches} matches, "
+          f"{flips['left']} dropped, {flips['boost_changed']} with a new uniqueness boost")
 
 
 def log_review(mp_id, up_id, action, notes, review_log):
-    """Log a review action."""
-    today = date.today().isoformat()
-    new_row = pd.DataFrame([{
-        'mp_id': mp_id,
-        'up_id': up_id,
-        'date': today,
-        'action': action,
-        'notes': notes
-    }])
-    review_log = pd.concat([review_log, new_row], ignore_index=True)
-    review_log.to_csv(REVIEW_LOG_PATH, index=False)
+    """Log a review action (appends one line to the review log)."""
+    review_log.append(mp_id, up_id, action, notes)
     return review_log
 
 
@@ -188,13 +178,11 @@ def main():
     print("Interactive Match Review Helper")
     print("=" * 70)
 
-    pairs, mp_df, up_df, review_log = load_data()
+    pairs, mp_df, up_df, review_log, exclusions = load_data()
+    cases = CaseStore(mp_df, up_df)
 
     # Filter out already reviewed pairs
-    reviewed_pairs = set(zip(review_log['mp_id'], review_log['up_id']))
-    pairs['reviewed'] = pairs.apply(
-        lambda r: (r['mp_id'], r['up_id']) in reviewed_pairs, axis=1
-    )
+    pairs['reviewed'] = review_log.reviewed_mask(pairs['mp_id'], pairs['up_id'])
     unreviewed = pairs[~pairs['reviewed']]
 
     print(f"Total pairs: {len(pairs)}")
@@ -217,8 +205,17 @@ def main():
         mp_id = row['mp_id']
         up_id = row['up_id']
 
+        # Exclusions added during this session (or in another one) apply right away
+        exclusions.reload()
+        if mp_id in exclusions or up_id in exclusions:
+            continue
+
+        # Load the next matches' details while this one is on screen
+        ahead = unreviewed.iloc[idx + 1:idx + 1 + PREFETCH_MATCHES]
+        cases.prefetch(list(ahead['mp_id']) + list(ahead['up_id']))
+
         print(f"\n\n>>> Match {idx + 1}/{len(unreviewed)} <<<")
-        print_match_details(mp_id, up_id, row, mp_df, up_df)
+        print_match_details(mp_id, up_id, row, cases)
 
         while True:
             cmd = input("\nAction ([Enter]=open, s=skip, x=exclude, v=viable, r=ruled out, q=quit): ").strip().lower()
@@ -243,8 +240,10 @@ def main():
                 reason = reasons.get(reason_choice, 'OTHER')
 
                 notes = input("Notes (optional): ").strip()
-                add_exclusion(up_id, reason, notes)
+                excluded = add_exclusion(up_id, reason, notes, exclusions)
                 review_log = log_review(mp_id, up_id, 'excluded', f"{reason}: {notes}", review_log)
+                if excluded:
+                    update_match_counts(up_id, mp_df, up_df)
                 break
 
             elif cmd == 'v':
@@ -260,6 +259,8 @@ def main():
                 break
 
             elif cmd == 'q':
+                review_log.save_index()
+                cases.close()
                 print("\nReview session ended.")
                 print(f"Progress saved to {REVIEW_LOG_PATH}")
                 return
@@ -267,6 +268,8 @@ def main():
             else:
                 print("  Unknown command. Try again.")
 
+    review_log.save_index()
+    cases.close()
     print("\n" + "=" * 70)
     print("Review session complete!")
     print(f"Progress saved to {REVIEW_LOG_PATH}")
@@ -1,35 +1,27 @@
 #!/bin/bash
 # Run the complete Maria matching pipeline
+#
+# Stages whose inputs, code and parameters are unchanged since their last
+# run are skipped (see data-build/pipeline.py). Extra arguments are passed
+# through, e.g. ./run_pipeline.sh --workers 4 or ./run_pipeline.sh --force pairs
 
 set -e  # Exit on error
 
+cd "$(dirname "$0")"
+
 echo "=== Maria Matching Pipeline ==="
 echo ""
 
 # Check if raw data files exist
-if [ ! -f "data/raw/missing_persons.csv" ] || [ ! -f "data/raw/unidentified_persons.csv" ]; then
+if ! ls data/raw/Missing/*.csv >/dev/null 2>&1 || ! ls data/raw/Unidentified/*.csv >/dev/null 2>&1; then
     echo "ERROR: Missing raw data files!"
-    echo "Please download NamUs exports and place them in data/raw/ as:"
-    echo "  - data/raw/missing_persons.csv"
-    echo "  - data/raw/unidentified_persons.csv"
-    echo ""
-    echo "Or run with custom paths:"
-    echo "  python3 data-build/process_namus_downloads.py --mp /path/to/mp.csv --up /path/to/up.csv"
+    echo "Please download NamUs exports and place them in:"
+    echo "  - data/raw/Missing/*.csv"
+    echo "  - data/raw/Unidentified/*.csv"
     exit 1
 fi
 
-echo "Step 1: Processing NamUs downloads..."
-python3 data-build/process_namus_downloads.py \
-    --mp data/raw/missing_persons.csv \
-    --up data/raw/unidentified_persons.csv
-
-echo ""
-echo "Step 2: Generating candidate pairs..."
-python3 data-build/build_graph_artifacts_simple.py
-
-echo ""
-echo "Step 3: Scoring matches with uniqueness boost..."
-python3 data-build/build_candidates_simple.py
+python3 data-build/pipeline.py "$@"
 
 echo ""
 echo "=== Pipeline Complete! ==="
@@ -38,4 +30,6 @@ echo "Output files:"
 echo "  - out/high_priority_matches.csv  (START HERE - best matches!)"
 echo "  - out/all_matches_scored.csv     (all valid matches)"
 echo "  - out/candidates.jsonl           (top 20 per MP)"
+echo "  - out/best_match_per_up.csv      (recommended for review)"
+echo "  - out/maria.db                   (SQLite; query with data-build/match_db.py)"
 echo ""